@@ -1,5 +1,7 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import click
 import mysql.connector
 from mysql.connector import Error
 import os
@@ -8,9 +10,41 @@ import json
 from decimal import Decimal
 from datetime import datetime, date, timedelta
 from flask import send_file
+from mysql.connector.errors import PoolError
+from mysql.connector.constants import FieldType
+import threading
+import time
+import atexit
+from array import array
+from collections import OrderedDict, deque
+import base64
+import csv
+import io
+import gzip
+import functools
+import itertools
+import mmap
+import struct
+import zlib
+import uuid
+import random
+import socket
+import bisect
+import re
+import queue
+import sqlite3
+import hashlib
+import heapq
+import math
+import unicodedata
+
+try:
+    import numpy as np
+except ImportError:  # opcional: só o motor de rating precisa
+    np = None
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'Idempotent-Replayed'])
 
 # Configuração da base de dados
 DB_CONFIG = {
@@ -19,18 +53,1060 @@ DB_CONFIG = {
     'user': os.getenv('DB_USER', 'sql7789028'),
     'password': os.getenv('DB_PASSWORD', '85kWJyl3js'),
     'charset': 'utf8mb4',
-    'use_unicode': True
+    'use_unicode': True,
+    # Driver em Python puro: com workers gevent as consultas cedem o controlo aos outros pedidos
+    'use_pure': os.getenv('DB_USE_PURE', '0') == '1'
+}
+
+def _tamanho_pool_default():
+    """Tamanho do pool por worker: DB_MAX_CONNECTIONS repartido pelos workers gunicorn"""
+    max_conexoes = os.getenv('DB_MAX_CONNECTIONS')
+    if max_conexoes:
+        workers = int(os.getenv('WEB_CONCURRENCY', 1))
+        return max(1, int(max_conexoes) // max(1, workers))
+    return 5
+
+# Configuração do pool de conexões (valores por processo/worker)
+DB_POOL_CONFIG = {
+    'size': int(os.getenv('DB_POOL_SIZE', _tamanho_pool_default())),
+    'prewarm': int(os.getenv('DB_POOL_PREWARM', 1)),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+    'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+    'ping_idle': float(os.getenv('DB_POOL_PING_IDLE', 1))
+}
+
+# ==================== MÉTRICAS ====================
+
+class Histogram:
+    """Histograma cumulativo (formato Prometheus) com limites fixos, por combinação de etiquetas"""
+
+    def __init__(self, name, help, labelnames, buckets):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # etiquetas -> [contagem por intervalo..., +Inf, soma]
+
+    def observe(self, labels, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: list(series) for labels, series in self._series.items()}
+
+_BUCKETS_TEMPO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_BUCKETS_LINHAS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+class Metrics:
+    """Métricas por rota: latência, conexão, consultas, linhas, conversão e serialização.
+
+    Os tempos de conversão de linhas e de serialização são acumulados durante o
+    pedido e observados uma vez no fim, para manter o custo por linha baixo.
+    Trabalho fora de um pedido (threads de fundo, respostas em streaming) fica
+    com route="background". Com METRICS_DIR cada worker grava periodicamente o
+    seu estado em <dir>/<pid>.json e /api/metrics soma todos os workers.
+    """
+
+    def __init__(self, enabled=True, directory=None, flush_interval=5.0):
+        self.enabled = enabled
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self.request_duration = Histogram(
+            'minigolf_http_request_duration_seconds', 'Duração dos pedidos HTTP',
+            ('route', 'method', 'status'), _BUCKETS_TEMPO)
+        self.db_acquire = Histogram(
+            'minigolf_db_connection_acquire_seconds', 'Tempo para obter uma conexão do pool',
+            ('route',), _BUCKETS_TEMPO)
+        self.db_query = Histogram(
+            'minigolf_db_query_duration_seconds', 'Duração de cada consulta SQL',
+            ('route',), _BUCKETS_TEMPO)
+        self.db_time = Histogram(
+            'minigolf_db_time_seconds', 'Tempo total de consultas SQL por pedido',
+            ('route',), _BUCKETS_TEMPO)
+        self.db_rows = Histogram(
+            'minigolf_db_rows', 'Linhas lidas da base de dados por pedido',
+            ('route',), _BUCKETS_LINHAS)
+        self.row_conversion = Histogram(
+            'minigolf_row_conversion_seconds', 'Tempo de conversão de linhas em dicionários por pedido',
+            ('route',), _BUCKETS_TEMPO)
+        self.json_serialization = Histogram(
+            'minigolf_json_serialization_seconds', 'Tempo de serialização JSON (jsonify) por pedido',
+            ('route',), _BUCKETS_TEMPO)
+        self.histograms = (self.request_duration, self.db_acquire, self.db_query, self.db_time,
+                           self.db_rows, self.row_conversion, self.json_serialization)
+
+    def rota(self):
+        return getattr(self._local, 'rota', None) or 'background'
+
+    def begin(self, rota):
+        self._local.rota = rota
+        self._local.acumulado = {}
+
+    def acumular(self, histogram, value):
+        """Somar ao total do pedido atual (ou observar já, fora de um pedido)"""
+        if not self.enabled:
+            return
+        acumulado = getattr(self._local, 'acumulado', None)
+        if acumulado is None:
+            histogram.observe(('background',), value)
+        else:
+            acumulado[histogram] = acumulado.get(histogram, 0) + value
+
+    def observe(self, histogram, value):
+        if self.enabled:
+            histogram.observe((self.rota(),), value)
+
+    def consulta(self, seconds):
+        self.observe(self.db_query, seconds)
+        self.acumular(self.db_time, seconds)
+
+    def end(self, method, status, duration):
+        rota = self.rota()
+        acumulado = getattr(self._local, 'acumulado', None) or {}
+        self._local.rota = None
+        self._local.acumulado = None
+        for histogram, total in acumulado.items():
+            histogram.observe((rota,), total)
+        self.request_duration.observe((rota, method, str(status)), duration)
+        if self.directory and time.monotonic() - self._last_flush > self.flush_interval:
+            self.flush()
+
+    def snapshot(self):
+        return {h.name: h.snapshot() for h in self.histograms}
+
+    def flush(self):
+        """Gravar o estado deste worker em METRICS_DIR (escrita atómica)"""
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            data = {name: [[list(labels), series] for labels, series in snapshot.items()]
+                    for name, snapshot in self.snapshot().items()}
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f'{os.getpid()}.json')
+            with open(path + '.tmp', 'w') as f:
+                json.dump(data, f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"Erro ao gravar métricas: {e}")
+        finally:
+            self._flush_lock.release()
+
+    def _merged(self):
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        merged = {h.name: {} for h in self.histograms}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for metric, series_list in data.items():
+                target = merged.get(metric)
+                if target is None:
+                    continue
+                for labels, series in series_list:
+                    labels = tuple(labels)
+                    current = target.get(labels)
+                    target[labels] = series if current is None else [a + b for a, b in zip(current, series)]
+        return merged
+
+    def render(self):
+        """Exportar no formato de texto do Prometheus"""
+        def escape(value):
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        
+        merged = self._merged()
+        lines = []
+        for h in self.histograms:
+            lines.append(f'# HELP {h.name} {h.help}')
+            lines.append(f'# TYPE {h.name} histogram')
+            for labels, series in sorted(merged[h.name].items()):
+                base = ','.join(f'{n}="{escape(v)}"' for n, v in zip(h.labelnames, labels))
+                cumulative = 0
+                for bound, count in zip(h.buckets + ('+Inf',), series[:-1]):
+                    cumulative += count
+                    lines.append(f'{h.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+                lines.append(f'{h.name}_sum{{{base}}} {series[-1]}')
+                lines.append(f'{h.name}_count{{{base}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics(
+    enabled=os.getenv('METRICS_ENABLED', '1') != '0',
+    directory=os.getenv('METRICS_DIR'),
+    flush_interval=float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+)
+
+if metrics.directory:
+    atexit.register(metrics.flush)
+
+class InstrumentedCursor:
+    """Cursor que regista a duração de cada consulta e as linhas lidas"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, kind, method, operation, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(operation, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            metrics.consulta(duration)
+            if query_profiler.enabled and duration * 1000 >= query_profiler.threshold_ms:
+                params = args[0] if args else next(iter(kwargs.values()), None)
+                query_profiler.record(kind, operation, params, duration, self._cursor)
+
+    def execute(self, *args, **kwargs):
+        return self._timed('execute', self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._timed('executemany', self._cursor.executemany, *args, **kwargs)
+
+    def callproc(self, *args, **kwargs):
+        return self._timed('callproc', self._cursor.callproc, *args, **kwargs)
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        metrics.acumular(metrics.db_rows, len(rows))
+        return rows
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        metrics.acumular(metrics.db_rows, len(rows))
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            metrics.acumular(metrics.db_rows, 1)
+        return row
+
+class QueryProfiler:
+    """Registo de consultas lentas (opcional, SLOW_QUERY_MS) com plano EXPLAIN.
+
+    Cada instrução é identificada pelo SQL normalizado (literais e %s trocados por ?,
+    listas IN/VALUES colapsadas). O EXPLAIN é capturado uma vez por instrução numa
+    thread própria com outra conexão, para não atrasar o pedido nem colidir com
+    resultados ainda por ler no cursor original. As linhas examinadas são a
+    estimativa do EXPLAIN (soma da coluna rows). Valores por worker.
+    """
+
+    _EXPLICAVEIS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+    def __init__(self, threshold_ms=None, top_k=20, max_statements=500, explain=True):
+        self.enabled = threshold_ms is not None
+        self.threshold_ms = threshold_ms if threshold_ms is not None else float('inf')
+        self.top_k = top_k
+        self.max_statements = max_statements
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._explained = set()
+        self._queue = queue.Queue(maxsize=100)
+        self._thread = None
+        self._pid = None
+
+    @staticmethod
+    def normalize(sql):
+        """SQL normalizado: sem literais nem espaços redundantes"""
+        sql = re.sub(r"'(?:[^'\\]|\\.)*'", '?', sql)
+        sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+        sql = sql.replace('%s', '?')
+        sql = re.sub(r'\s+', ' ', sql).strip()
+        sql = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(...)', sql)
+        sql = re.sub(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+', '(...)', sql)
+        return sql
+
+    @staticmethod
+    def params_shape(params):
+        """Forma dos parâmetros (tipos), sem os valores"""
+        if params is None:
+            return None
+        if isinstance(params, dict):
+            return {key: type(value).__name__ for key, value in params.items()}
+        tipos = [type(value).__name__ for value in params]
+        if len(tipos) > 8:
+            return f"{len(tipos)} x {'/'.join(sorted(set(tipos)))}"
+        return tipos
+
+    def record(self, kind, operation, params, duration, cursor):
+        if threading.current_thread() is self._thread:
+            return
+        sql = operation.decode('utf-8') if isinstance(operation, bytes) else str(operation)
+        normalized = self.normalize(sql)
+        fingerprint = format(zlib.crc32(normalized.encode('utf-8')), '08x')
+        shape = self.params_shape(params) if kind != 'executemany' else f"{len(params)} linhas"
+        rows = cursor.rowcount if getattr(cursor, 'rowcount', -1) >= 0 else None
+        rota = metrics.rota()
+        
+        with self._lock:
+            entry = self._statements.get(fingerprint)
+            if entry is None:
+                if len(self._statements) >= self.max_statements:
+                    menor = min(self._statements, key=lambda fp: self._statements[fp]['tempo_total'])
+                    del self._statements[menor]
+                entry = self._statements[fingerprint] = {
+                    'fingerprint': fingerprint, 'sql': normalized, 'tipo': kind,
+                    'execucoes': 0, 'tempo_total': 0.0, 'tempo_max': 0.0,
+                    'linhas_examinadas_estimadas': None, 'plano': None
+                }
+            entry['execucoes'] += 1
+            entry['tempo_total'] += duration
+            entry['tempo_max'] = max(entry['tempo_max'], duration)
+            entry['params'] = shape
+            entry['linhas'] = rows
+            entry['rota'] = rota
+            entry['ultima_ocorrencia'] = datetime.now().isoformat(timespec='seconds')
+            explicar = (self.explain and kind == 'execute' and fingerprint not in self._explained
+                        and normalized.split(' ', 1)[0].upper() in self._EXPLICAVEIS)
+            if explicar:
+                self._explained.add(fingerprint)
+        
+        print(f"Consulta lenta ({duration * 1000:.1f} ms, {rota}) [{fingerprint}]: {normalized} "
+              f"params={shape} linhas={rows}")
+        if explicar:
+            self._ensure_thread()
+            try:
+                self._queue.put_nowait((fingerprint, sql, params))
+            except queue.Full:
+                with self._lock:
+                    self._explained.discard(fingerprint)
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._loop, name='query-profiler', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            fingerprint, sql, params = self._queue.get()
+            plano = self._explain(sql, params)
+            with self._lock:
+                entry = self._statements.get(fingerprint)
+                if entry is not None:
+                    entry['plano'] = plano
+                    if isinstance(plano, list):
+                        entry['linhas_examinadas_estimadas'] = sum(int(linha.get('rows') or 0) for linha in plano)
+            print(f"EXPLAIN [{fingerprint}]: {json.dumps(plano, default=serialize_data)}")
+
+    def _explain(self, sql, params):
+        connection = get_db_connection()
+        if not connection:
+            return {'error': 'Erro de conexão com a base de dados'}
+        try:
+            cursor = connection.cursor()
+            cursor.execute('EXPLAIN ' + sql, params)
+            return fetchall_dicts(cursor)
+        except Error as e:
+            return {'error': str(e)}
+        finally:
+            if connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    def top(self, limit=None, ordem='total'):
+        """As instruções mais lentas, por tempo total, máximo ou número de execuções"""
+        chave = {'total': 'tempo_total', 'max': 'tempo_max', 'execucoes': 'execucoes'}.get(ordem, 'tempo_total')
+        with self._lock:
+            entries = sorted(self._statements.values(), key=lambda e: e[chave], reverse=True)
+            entries = [dict(e) for e in entries[:limit or self.top_k]]
+        for entry in entries:
+            entry['tempo_total_ms'] = round(entry.pop('tempo_total') * 1000, 3)
+            entry['tempo_max_ms'] = round(entry.pop('tempo_max') * 1000, 3)
+            entry['tempo_medio_ms'] = round(entry['tempo_total_ms'] / entry['execucoes'], 3)
+        return entries
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._explained.clear()
+
+query_profiler = QueryProfiler(
+    threshold_ms=float(os.getenv('SLOW_QUERY_MS')) if os.getenv('SLOW_QUERY_MS') else None,
+    top_k=int(os.getenv('SLOW_QUERY_TOP', 20)),
+    max_statements=int(os.getenv('SLOW_QUERY_MAX_STATEMENTS', 500)),
+    explain=os.getenv('SLOW_QUERY_EXPLAIN', '1') != '0'
+)
+
+class MetricsJSONProvider(DefaultJSONProvider):
+    """Provider JSON do Flask que mede o tempo de jsonify"""
+
+    def response(self, *args, **kwargs):
+        if not metrics.enabled:
+            return super().response(*args, **kwargs)
+        start = time.perf_counter()
+        response = super().response(*args, **kwargs)
+        metrics.acumular(metrics.json_serialization, time.perf_counter() - start)
+        return response
+
+app.json = MetricsJSONProvider(app)
+
+@app.before_request
+def _iniciar_metricas():
+    if metrics.enabled:
+        request.environ['minigolf.inicio'] = time.perf_counter()
+        metrics.begin(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@app.after_request
+def _registar_metricas(response):
+    inicio = request.environ.get('minigolf.inicio')
+    if inicio is not None:
+        metrics.end(request.method, response.status_code, time.perf_counter() - inicio)
+    return response
+
+class PooledConnection:
+    """Conexão emprestada pelo pool; close() devolve-a em vez de a fechar"""
+
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._connection.cursor(*args, **kwargs)
+        return InstrumentedCursor(cursor) if metrics.enabled or query_profiler.enabled else cursor
+
+    def is_connected(self):
+        return self._connection is not None and self._connection.is_connected()
+
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection, self._created_at)
+
+    def discard(self):
+        """Fechar a conexão de vez (ex.: resultado por ler a meio de um streaming)"""
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection, self._created_at, reusable=False)
+
+    def __del__(self):
+        # Garantir que a vaga volta ao pool mesmo quando a rota não chama close()
+        # (ex.: is_connected() falso no finally)
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """Pool de conexões MySQL por processo, com ping, reciclagem e timeout"""
+
+    def __init__(self, config, size=5, prewarm=1, timeout=10.0, max_lifetime=1800.0, ping_idle=1.0,
+                 connect=mysql.connector.connect):
+        self.config = config
+        self.connect = connect
+        self.size = size
+        self.prewarm_count = min(prewarm, size)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_idle = ping_idle
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = []  # (conexão, criada_em, devolvida_em)
+        self._open = 0
+        self._in_use = 0
+        self._counters = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0
+        }
+
+    def _check_fork(self):
+        # Após o fork do gunicorn cada worker tem de abrir as suas próprias conexões
+        if os.getpid() != self._pid:
+            self._reset()
+
+    def _connect(self):
+        connection = self.connect(**self.config)
+        with self._cond:
+            self._counters['created'] += 1
+        return connection, time.monotonic()
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def acquire(self):
+        """Obter uma conexão, esperando no máximo `timeout` segundos"""
+        self._check_fork()
+        start = time.monotonic()
+        deadline = start + self.timeout
+        entry = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolError(f"Pool esgotado: {self.size} conexões em uso há mais de {self.timeout}s")
+                self._cond.wait(remaining)
+            self._in_use += 1
+            waited = time.monotonic() - start
+            self._counters['checkouts'] += 1
+            if waited > 0.001:
+                self._counters['waits'] += 1
+            self._counters['wait_time_total'] += waited
+            self._counters['wait_time_max'] = max(self._counters['wait_time_max'], waited)
+
+        try:
+            connection = None
+            if entry is not None:
+                connection, created_at, returned_at = entry
+                now = time.monotonic()
+                if now - created_at > self.max_lifetime:
+                    self._discard(connection)
+                    connection = None
+                    with self._cond:
+                        self._counters['recycled'] += 1
+                elif now - returned_at > self.ping_idle:
+                    try:
+                        connection.ping(reconnect=False)
+                    except Error:
+                        self._discard(connection)
+                        connection = None
+                        with self._cond:
+                            self._counters['ping_failures'] += 1
+            if connection is None:
+                connection, created_at = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, connection, created_at)
+
+    def release(self, connection, created_at, reusable=True):
+        """Devolver conexão ao pool (ou descartá-la se estiver inválida ou expirada)"""
+        reusable = reusable and os.getpid() == self._pid
+        if reusable:
+            try:
+                if connection.in_transaction:
+                    connection.rollback()
+                reusable = time.monotonic() - created_at <= self.max_lifetime
+            except Error:
+                reusable = False
+        if not reusable:
+            self._discard(connection)
+        with self._cond:
+            if os.getpid() != self._pid:
+                return
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((connection, created_at, time.monotonic()))
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+    def prewarm(self, count=None):
+        """Abrir conexões antecipadamente (chamado no arranque de cada worker)"""
+        self._check_fork()
+        count = self.prewarm_count if count is None else min(count, self.size)
+        while True:
+            with self._cond:
+                if self._open >= count:
+                    return
+                self._open += 1
+            try:
+                connection, created_at = self._connect()
+            except Error as e:
+                with self._cond:
+                    self._open -= 1
+                print(f"Erro ao pré-aquecer pool MySQL: {e}")
+                return
+            with self._cond:
+                self._idle.append((connection, created_at, time.monotonic()))
+                self._cond.notify()
+
+    def stats(self):
+        """Estatísticas do pool para dimensionamento"""
+        self._check_fork()
+        with self._cond:
+            counters = dict(self._counters)
+            checkouts = counters['checkouts']
+            return {
+                'pid': self._pid,
+                'size': self.size,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': checkouts,
+                'waits': counters['waits'],
+                'timeouts': counters['timeouts'],
+                'created': counters['created'],
+                'recycled': counters['recycled'],
+                'ping_failures': counters['ping_failures'],
+                'wait_time_avg_ms': round(counters['wait_time_total'] * 1000 / checkouts, 3) if checkouts else 0.0,
+                'wait_time_max_ms': round(counters['wait_time_max'] * 1000, 3)
+            }
+
+# ==================== MIGRAÇÕES (MYSQL) ====================
+
+# Tabelas acrescentadas ao esquema MySQL original (no SQLite estão em SQLITE_SCHEMA),
+# criadas com `flask migrar-bd` antes de pôr esta versão em produção
+MYSQL_MIGRACOES = [
+    """
+    CREATE TABLE IF NOT EXISTS recalculo_pendente (
+        jogo_id INT PRIMARY KEY,
+        pedidos INT NOT NULL DEFAULT 1
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS jogador_estatisticas (
+        jogador_id INT PRIMARY KEY,
+        total_jogos INT NOT NULL DEFAULT 0,
+        jogos_pontuados INT NOT NULL DEFAULT 0,
+        soma_tacadas INT NOT NULL DEFAULT 0,
+        melhor_score INT,
+        pior_score INT,
+        vitorias INT NOT NULL DEFAULT 0,
+        ultimo_jogo DATETIME,
+        atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (jogador_id) REFERENCES jogadores(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS jogador_estatisticas_jogos (
+        jogo_id INT NOT NULL,
+        jogador_id INT NOT NULL,
+        total_tacadas INT,
+        vitoria TINYINT NOT NULL DEFAULT 0,
+        data_jogo DATETIME,
+        PRIMARY KEY (jogo_id, jogador_id),
+        INDEX idx_estatisticas_jogos_jogador (jogador_id)
+    )
+    """,
+]
+
+@app.cli.command('migrar-bd')
+def migrar_bd_cli():
+    """Criar no MySQL as tabelas acrescentadas ao esquema (pode ser repetido)"""
+    if DB_BACKEND != 'mysql':
+        print('SQLite: o esquema é criado no arranque (SQLITE_SCHEMA)')
+        return
+    connection = get_db_connection()
+    if not connection:
+        raise SystemExit('Erro de conexão com a base de dados')
+    try:
+        cursor = connection.cursor()
+        for ddl in MYSQL_MIGRACOES:
+            cursor.execute(ddl)
+        print(f"Migrações aplicadas: {len(MYSQL_MIGRACOES)}")
+    finally:
+        connection.close()
+
+# ==================== BACKEND SQLITE ====================
+
+# 'mysql' (DB_CONFIG) ou 'sqlite': base de dados local num ficheiro, em modo WAL,
+# para instalações num único campo sem ida e volta a um MySQL remoto
+DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'minigolf.db')
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cidades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome VARCHAR(100) NOT NULL,
+    distrito VARCHAR(100) NOT NULL,
+    codigo_postal VARCHAR(10)
+);
+CREATE TABLE IF NOT EXISTS campos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome VARCHAR(200) NOT NULL,
+    cidade_id INTEGER NOT NULL REFERENCES cidades(id),
+    tipo VARCHAR(50),
+    endereco TEXT,
+    telefone VARCHAR(20),
+    website VARCHAR(200),
+    email VARCHAR(100),
+    latitude DECIMAL(10, 8),
+    longitude DECIMAL(11, 8),
+    preco_adulto DECIMAL(6, 2),
+    preco_crianca DECIMAL(6, 2),
+    horario_abertura TIME,
+    horario_fecho TIME,
+    ativo INTEGER DEFAULT 1,
+    data_criacao DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS pistas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campo_id INTEGER NOT NULL REFERENCES campos(id),
+    numero_pista INTEGER NOT NULL,
+    nome VARCHAR(100),
+    dificuldade VARCHAR(20),
+    par INTEGER DEFAULT 3,
+    descricao TEXT,
+    ativa INTEGER DEFAULT 1,
+    UNIQUE (campo_id, numero_pista)
+);
+CREATE TABLE IF NOT EXISTS jogadores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome VARCHAR(100) NOT NULL,
+    email VARCHAR(100),
+    telefone VARCHAR(20),
+    data_nascimento DATE,
+    cidade_id INTEGER REFERENCES cidades(id),
+    avatar_url VARCHAR(255),
+    data_registo DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS jogos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campo_id INTEGER NOT NULL REFERENCES campos(id),
+    data_jogo DATETIME NOT NULL,
+    num_jogadores INTEGER,
+    observacoes TEXT
+);
+CREATE TABLE IF NOT EXISTS jogo_participantes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    jogo_id INTEGER NOT NULL REFERENCES jogos(id),
+    jogador_id INTEGER NOT NULL REFERENCES jogadores(id),
+    ordem_jogador INTEGER,
+    total_tacadas INTEGER,
+    posicao_final INTEGER,
+    UNIQUE (jogo_id, jogador_id)
+);
+CREATE TABLE IF NOT EXISTS tacadas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    jogo_id INTEGER NOT NULL REFERENCES jogos(id),
+    jogador_id INTEGER NOT NULL REFERENCES jogadores(id),
+    pista_id INTEGER NOT NULL REFERENCES pistas(id),
+    numero_tacadas INTEGER NOT NULL,
+    tempo_pista TIME,
+    observacoes TEXT,
+    UNIQUE (jogo_id, jogador_id, pista_id)
+);
+CREATE TABLE IF NOT EXISTS jogador_estatisticas (
+    jogador_id INTEGER PRIMARY KEY REFERENCES jogadores(id),
+    total_jogos INTEGER NOT NULL DEFAULT 0,
+    jogos_pontuados INTEGER NOT NULL DEFAULT 0,
+    soma_tacadas INTEGER NOT NULL DEFAULT 0,
+    melhor_score INTEGER,
+    pior_score INTEGER,
+    vitorias INTEGER NOT NULL DEFAULT 0,
+    ultimo_jogo DATETIME,
+    atualizado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS jogador_estatisticas_jogos (
+    jogo_id INTEGER NOT NULL,
+    jogador_id INTEGER NOT NULL,
+    total_tacadas INTEGER,
+    vitoria INTEGER NOT NULL DEFAULT 0,
+    data_jogo DATETIME,
+    PRIMARY KEY (jogo_id, jogador_id)
+);
+CREATE INDEX IF NOT EXISTS idx_estatisticas_jogos_jogador ON jogador_estatisticas_jogos (jogador_id);
+CREATE TABLE IF NOT EXISTS recalculo_pendente (
+    jogo_id INTEGER PRIMARY KEY,
+    pedidos INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_jogos_data ON jogos (data_jogo, id);
+CREATE INDEX IF NOT EXISTS idx_participantes_jogador ON jogo_participantes (jogador_id);
+
+CREATE VIEW IF NOT EXISTS vw_ranking_jogadores AS
+SELECT j.id, j.nome,
+       COUNT(DISTINCT jp.jogo_id) AS total_jogos,
+       AVG(jp.total_tacadas) AS media_tacadas,
+       MIN(jp.total_tacadas) AS melhor_score,
+       COUNT(CASE WHEN jp.posicao_final = 1 THEN 1 END) AS vitorias
+FROM jogadores j
+JOIN jogo_participantes jp ON j.id = jp.jogador_id
+WHERE jp.total_tacadas IS NOT NULL
+GROUP BY j.id, j.nome
+ORDER BY media_tacadas ASC, total_jogos DESC;
+
+CREATE VIEW IF NOT EXISTS vw_estatisticas_campo AS
+SELECT c.id, c.nome, ci.nome AS cidade,
+       (SELECT COUNT(*) FROM pistas p WHERE p.campo_id = c.id AND p.ativa = 1) AS total_pistas,
+       (SELECT COUNT(*) FROM jogos jg WHERE jg.campo_id = c.id) AS total_jogos,
+       (SELECT AVG(jp.total_tacadas) FROM jogo_participantes jp
+        JOIN jogos jg ON jp.jogo_id = jg.id WHERE jg.campo_id = c.id) AS media_tacadas
+FROM campos c
+JOIN cidades ci ON c.cidade_id = ci.id
+WHERE c.ativo = 1;
+"""
+
+# Chave única usada por ON DUPLICATE KEY UPDATE em cada tabela
+SQLITE_UNIQUE_KEYS = {
+    'tacadas': 'jogo_id, jogador_id, pista_id',
+    'jogo_participantes': 'jogo_id, jogador_id',
+    'pistas': 'campo_id, numero_pista',
+    'jogador_estatisticas': 'jogador_id',
+    'recalculo_pendente': 'jogo_id',
 }
 
+def _sqlite_converter(parse):
+    def convert(value):
+        text = value.decode('utf-8')
+        try:
+            return parse(text)
+        except ValueError:
+            return text
+    return convert
+
+def _parse_time(text):
+    partes = [int(parte) for parte in text.split('.')[0].split(':')]
+    if not 2 <= len(partes) <= 3:
+        raise ValueError(text)
+    return timedelta(hours=partes[0], minutes=partes[1], seconds=partes[2] if len(partes) == 3 else 0)
+
+# Tipos devolvidos como no mysql.connector, para o JSON ser o mesmo nos dois backends
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(timedelta, lambda value: _format_timedelta(value))
+sqlite3.register_converter('DATETIME', _sqlite_converter(datetime.fromisoformat))
+sqlite3.register_converter('TIMESTAMP', _sqlite_converter(datetime.fromisoformat))
+sqlite3.register_converter('DATE', _sqlite_converter(date.fromisoformat))
+sqlite3.register_converter('TIME', _sqlite_converter(_parse_time))
+sqlite3.register_converter('DECIMAL', _sqlite_converter(Decimal))
+
+@functools.lru_cache(maxsize=1024)
+def traduzir_sql(sql):
+    """Traduzir o SQL MySQL usado pelas rotas para SQLite"""
+    sql = sql.replace('%s', '?')
+    sql = re.sub(r'\bFOR UPDATE\b', '', sql)
+    sql = re.sub(r'\bTRUE\b', '1', sql)
+    sql = re.sub(r'\bFALSE\b', '0', sql)
+    if sql.lstrip().upper().startswith('EXPLAIN ') and 'QUERY PLAN' not in sql.upper():
+        sql = re.sub(r'^\s*EXPLAIN\s', 'EXPLAIN QUERY PLAN ', sql, flags=re.IGNORECASE)
+    if 'ON DUPLICATE KEY UPDATE' in sql:
+        tabela = re.search(r'INSERT\s+INTO\s+(\w+)', sql, re.IGNORECASE).group(1)
+        sql = sql.replace('ON DUPLICATE KEY UPDATE',
+                          f'ON CONFLICT ({SQLITE_UNIQUE_KEYS[tabela]}) DO UPDATE SET')
+        sql = re.sub(r'VALUES\((\w+)\)', r'excluded.\1', sql)
+    return sql
+
+def _erro_sqlite(e):
+    """Converter erros do sqlite3 nos do mysql.connector (as rotas apanham Error)"""
+    if isinstance(e, sqlite3.IntegrityError):
+        return mysql.connector.errors.IntegrityError(msg=str(e), errno=1062 if 'UNIQUE' in str(e) else 1452)
+    if isinstance(e, sqlite3.OperationalError):
+        return mysql.connector.errors.OperationalError(msg=str(e))
+    return mysql.connector.errors.DatabaseError(msg=str(e))
+
+def calcular_estatisticas_jogo_sqlite(db, jogo_id):
+    """Equivalente a CalcularEstatisticasJogo: totais por jogador e posições (RANK)"""
+    db.execute("""
+    UPDATE jogo_participantes SET total_tacadas = (
+        SELECT COALESCE(SUM(t.numero_tacadas), 0) FROM tacadas t
+        WHERE t.jogo_id = jogo_participantes.jogo_id AND t.jogador_id = jogo_participantes.jogador_id)
+    WHERE jogo_id = ?
+    """, (jogo_id,))
+    db.execute("""
+    UPDATE jogo_participantes SET posicao_final = 1 + (
+        SELECT COUNT(*) FROM jogo_participantes o
+        WHERE o.jogo_id = jogo_participantes.jogo_id AND o.total_tacadas < jogo_participantes.total_tacadas)
+    WHERE jogo_id = ?
+    """, (jogo_id,))
+
+class SQLiteCursor:
+    """Cursor SQLite com a interface do cursor do mysql.connector usada pelas rotas"""
+
+    def __init__(self, connection, buffered=True):
+        self._connection = connection
+        self._buffered = buffered
+        self._pendente = None  # cursor sqlite3 por ler (sem buffer)
+        self.description = None
+        self.lastrowid = None
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, operation, params=None, multi=False):
+        self._connection._begin_if_needed(operation)
+        self._pendente = None
+        try:
+            cursor = self._connection._db.execute(traduzir_sql(operation), tuple(params or ()))
+            if not self._buffered and cursor.description:
+                # Linhas lidas à medida que são pedidas (streaming)
+                self._pendente = cursor
+                rows = []
+            else:
+                rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            raise _erro_sqlite(e)
+        self.description = cursor.description
+        self.lastrowid = cursor.lastrowid
+        self.rowcount = -1 if self._pendente else len(rows) if cursor.description else cursor.rowcount
+        self._rows = rows
+
+    def executemany(self, operation, seq_params):
+        for params in seq_params:
+            self.execute(operation, params)
+
+    def callproc(self, procname, args=()):
+        if procname != 'CalcularEstatisticasJogo':
+            raise mysql.connector.errors.ProgrammingError(msg=f'Procedimento desconhecido: {procname}')
+        self._connection._begin_if_needed('UPDATE')
+        try:
+            calcular_estatisticas_jogo_sqlite(self._connection._db, args[0])
+        except sqlite3.Error as e:
+            raise _erro_sqlite(e)
+        return args
+
+    def stored_results(self):
+        return iter(())
+
+    def _ler(self, size=None):
+        try:
+            return self._pendente.fetchall() if size is None else self._pendente.fetchmany(size)
+        except sqlite3.Error as e:
+            raise _erro_sqlite(e)
+
+    def fetchall(self):
+        if self._pendente is not None:
+            return self._ler()
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        if self._pendente is not None:
+            return self._ler(size)
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchone(self):
+        if self._pendente is not None:
+            rows = self._ler(1)
+            return rows[0] if rows else None
+        return self._rows.pop(0) if self._rows else None
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        if self._pendente is not None:
+            self._pendente.close()
+            self._pendente = None
+        self._rows = []
+
+class SQLiteConnection:
+    """Conexão SQLite com transações como no MySQL (autocommit desligado)"""
+
+    _ESCRITAS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'SAVEPOINT')
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False,
+                                   detect_types=sqlite3.PARSE_DECLTYPES)
+        self._db.execute('PRAGMA synchronous = NORMAL')
+        self._db.execute('PRAGMA foreign_keys = ON')
+
+    @property
+    def in_transaction(self):
+        return self._db is not None and self._db.in_transaction
+
+    def _begin_if_needed(self, operation):
+        # Leituras correm em autocommit; a primeira escrita (ou FOR UPDATE) abre a
+        # transação com BEGIN IMMEDIATE para evitar deadlocks ao promover o lock
+        if not self._db.in_transaction:
+            instrucao = operation.lstrip().split(None, 1)[0].upper()
+            if instrucao in self._ESCRITAS or 'FOR UPDATE' in operation:
+                self._db.execute('BEGIN IMMEDIATE')
+
+    def start_transaction(self):
+        if not self._db.in_transaction:
+            self._db.execute('BEGIN IMMEDIATE')
+
+    def cursor(self, *args, buffered=True, **kwargs):
+        return SQLiteCursor(self, buffered)
+
+    def commit(self):
+        if self._db.in_transaction:
+            self._db.execute('COMMIT')
+
+    def rollback(self):
+        if self._db.in_transaction:
+            self._db.execute('ROLLBACK')
+
+    def ping(self, reconnect=False):
+        pass
+
+    def is_connected(self):
+        return self._db is not None
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+def inicializar_sqlite(path):
+    """Criar o esquema (se não existir) e ativar o modo WAL"""
+    db = sqlite3.connect(path, timeout=30)
+    try:
+        db.execute('PRAGMA journal_mode = WAL')
+        db.executescript(SQLITE_SCHEMA)
+    finally:
+        db.close()
+
+if DB_BACKEND == 'sqlite':
+    inicializar_sqlite(SQLITE_PATH)
+    db_pool = ConnectionPool({'path': SQLITE_PATH}, connect=SQLiteConnection, **DB_POOL_CONFIG)
+else:
+    db_pool = ConnectionPool(DB_CONFIG, **DB_POOL_CONFIG)
+
 def get_db_connection():
-    """Criar conexão com a base de dados"""
+    """Obter conexão do pool"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        return connection
+        if not metrics.enabled:
+            return db_pool.acquire()
+        start = time.perf_counter()
+        try:
+            return db_pool.acquire()
+        finally:
+            metrics.observe(metrics.db_acquire, time.perf_counter() - start)
     except Error as e:
         print(f"Erro ao conectar com MySQL: {e}")
         return None
 
+def _format_timedelta(obj):
+    total_seconds = int(obj.total_seconds())
+    return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
+
 def serialize_data(obj):
     """Converter tipos especiais para JSON"""
     if isinstance(obj, (datetime, date)):
@@ -41,16 +1117,591 @@ def serialize_data(obj):
         return obj.decode('utf-8')
     elif isinstance(obj, timedelta):
         # Converter timedelta para string no formato HH:MM:SS
-        total_seconds = int(obj.total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        return _format_timedelta(obj)
     return obj
 
 def dict_factory(cursor, row):
     """Converter resultado do cursor em dicionário"""
-    return {col[0]: serialize_data(val) for col, val in zip(cursor.description, row)}
+    start = time.perf_counter()
+    result = {col[0]: serialize_data(val) for col, val in zip(cursor.description, row)}
+    metrics.acumular(metrics.row_conversion, time.perf_counter() - start)
+    return result
+
+def _decode_bytes(obj):
+    return obj.decode('utf-8') if isinstance(obj, bytes) else obj
+
+# Conversor por tipo de coluna (None = valor já serializável); tipos não listados usam serialize_data
+_COLUMN_CONVERTERS = {
+    FieldType.TINY: None, FieldType.SHORT: None, FieldType.LONG: None, FieldType.LONGLONG: None,
+    FieldType.INT24: None, FieldType.YEAR: None, FieldType.FLOAT: None, FieldType.DOUBLE: None,
+    FieldType.NULL: None, FieldType.BIT: None, FieldType.JSON: None, FieldType.ENUM: None,
+    FieldType.DATE: date.isoformat, FieldType.NEWDATE: date.isoformat,
+    FieldType.DATETIME: datetime.isoformat, FieldType.TIMESTAMP: datetime.isoformat,
+    FieldType.DECIMAL: float, FieldType.NEWDECIMAL: float,
+    FieldType.TIME: _format_timedelta,
+    FieldType.VARCHAR: _decode_bytes, FieldType.VAR_STRING: _decode_bytes, FieldType.STRING: _decode_bytes,
+    FieldType.TINY_BLOB: _decode_bytes, FieldType.MEDIUM_BLOB: _decode_bytes,
+    FieldType.LONG_BLOB: _decode_bytes, FieldType.BLOB: _decode_bytes,
+}
+
+def row_converter(cursor):
+    """Criar um conversor de linhas para o resultado atual do cursor.
+
+    Inspeciona cursor.description uma só vez e escolhe um conversor por coluna,
+    em vez de passar cada valor pela cadeia de isinstance de serialize_data.
+    """
+    keys = tuple(col[0] for col in cursor.description)
+    converters = []
+    for i, col in enumerate(cursor.description):
+        converter = _COLUMN_CONVERTERS.get(col[1], serialize_data)
+        if converter is not None:
+            converters.append((i, converter))
+    
+    if not converters:
+        return lambda row: dict(zip(keys, row))
+    
+    def convert(row):
+        values = list(row)
+        for i, converter in converters:
+            value = values[i]
+            if value is not None:
+                values[i] = converter(value)
+        return dict(zip(keys, values))
+    return convert
+
+def fetchall_dicts(cursor):
+    """Ler todas as linhas do cursor como dicionários serializáveis"""
+    rows = cursor.fetchall()
+    if not rows:
+        return []
+    start = time.perf_counter()
+    convert = row_converter(cursor)
+    result = [convert(row) for row in rows]
+    metrics.acumular(metrics.row_conversion, time.perf_counter() - start)
+    return result
+
+def fetchone_dict(cursor):
+    """Ler uma linha do cursor como dicionário serializável (None se não houver)"""
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    start = time.perf_counter()
+    result = row_converter(cursor)(row)
+    metrics.acumular(metrics.row_conversion, time.perf_counter() - start)
+    return result
+
+# Paginação por cursor (keyset): o cursor codifica as chaves de ordenação da última linha
+PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 100))
+PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 500))
+
+def get_page_size(default=PAGE_SIZE_DEFAULT):
+    """Tamanho de página pedido em ?limit=, limitado a PAGE_SIZE_MAX"""
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, PAGE_SIZE_MAX))
+
+def encode_cursor(values):
+    """Codificar as chaves de ordenação num cursor opaco"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, num_keys):
+    """Descodificar um cursor; ValueError se for inválido"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Cursor inválido')
+    if not isinstance(values, list) or len(values) != num_keys:
+        raise ValueError('Cursor inválido')
+    return values
+
+def paginated_response(items, page_size, cursor_key):
+    """Resposta JSON com uma página; X-Next-Cursor indica a página seguinte.
+
+    `items` deve ter até page_size + 1 elementos (o extra só indica se há mais);
+    `cursor_key(item)` devolve as chaves de ordenação de um elemento.
+    """
+    response = jsonify(items[:page_size])
+    if len(items) > page_size:
+        response.headers['X-Next-Cursor'] = encode_cursor(cursor_key(items[page_size - 1]))
+    return response
+
+# Respostas em streaming: ?stream=1 (array JSON) ou ?stream=ndjson / Accept: application/x-ndjson
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 500))
+
+def get_stream_format():
+    """'json', 'ndjson' ou None conforme o pedido queira resposta em streaming"""
+    stream = request.args.get('stream', '').lower()
+    if stream == 'ndjson' or 'application/x-ndjson' in request.headers.get('Accept', ''):
+        return 'ndjson'
+    if stream in ('1', 'true', 'json'):
+        return 'json'
+    return None
+
+def _linhas_csv(keys, rows):
+    """Linhas CSV (com \\r\\n, como o módulo csv) para uma lista de valores"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if keys is not None:
+        writer.writerow(keys)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+def stream_query(query, params, stream_format, compress=False, filename=None, chunk_size=None):
+    """Executar uma consulta e enviar as linhas à medida que são lidas (fetchmany).
+
+    Usa um cursor sem buffer e uma conexão própria, devolvida ao pool no fim do
+    gerador; a memória do worker não depende do número de linhas. stream_format
+    é 'json', 'ndjson' ou 'csv'; com compress=True cada bloco sai comprimido
+    em gzip (Z_SYNC_FLUSH, para o cliente receber dados logo).
+    """
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        cursor = connection.cursor(buffered=False)
+        cursor.execute(query, params)
+    except Error as e:
+        connection.discard()
+        return jsonify({'error': str(e)}), 500
+    
+    dumps = app.json.dumps
+    convert = row_converter(cursor)
+    keys = [col[0] for col in cursor.description]
+    
+    def encode():
+        first = True
+        if stream_format == 'json':
+            yield '['
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            if stream_format == 'csv':
+                yield _linhas_csv(keys if first else None, [list(convert(row).values()) for row in rows])
+                first = False
+                continue
+            encoded = [dumps(convert(row), separators=(',', ':')) for row in rows]
+            if stream_format == 'ndjson':
+                yield '\n'.join(encoded) + '\n'
+            else:
+                yield ('' if first else ',') + ','.join(encoded)
+            first = False
+        if stream_format == 'json':
+            yield ']'
+        elif stream_format == 'csv' and first:
+            yield _linhas_csv(keys, [])
+    
+    def generate():
+        finished = False
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        try:
+            for chunk in encode():
+                if compressor:
+                    yield compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                else:
+                    yield chunk
+            if compressor:
+                yield compressor.flush()
+            finished = True
+        except Error as e:
+            print(f"Erro durante streaming: {e}")
+        finally:
+            if finished:
+                cursor.close()
+                connection.close()
+            else:
+                # Linhas por ler: a conexão não pode voltar ao pool
+                connection.discard()
+    
+    mimetype = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}.get(stream_format, 'application/json')
+    headers = {'X-Accel-Buffering': 'no'}
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    if filename:
+        headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return Response(generate(), mimetype=mimetype, headers=headers)
+
+# ==================== CACHE DE DADOS DE REFERÊNCIA ====================
+
+class TableVersions:
+    """Contador de versão por tabela, incrementado a cada escrita (só neste processo)"""
+
+    # Os outros workers não veem estes contadores: não servem para ETags
+    partilhado = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._nonce = uuid.uuid4().hex[:8]
+
+    def generation(self):
+        """Identifica o espaço de versões: muda quando os contadores podem ter recomeçado"""
+        return self._nonce
+
+    def get(self, *tables):
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, *tables):
+        """Incrementar as versões; devolve as novas versões"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            return tuple(self._versions[table] for table in tables)
+
+class SharedTableVersions(TableVersions):
+    """Contadores de versão num ficheiro mapeado em memória, partilhados pelos workers.
+
+    Cada tabela ocupa uma posição (crc32 do nome); colisões só causam invalidações
+    a mais. A leitura não bloqueia; o incremento usa flock.
+    """
+
+    SLOTS = 256
+    partilhado = True
+
+    def __init__(self, path):
+        import fcntl
+        self._fcntl = fcntl
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = (self.SLOTS + 1) * 8
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            novo = os.fstat(self._fd).st_size < size
+            if novo:
+                os.ftruncate(self._fd, size)
+            self._mm = mmap.mmap(self._fd, size)
+            if novo:
+                # Última posição: geração aleatória do ficheiro (contadores recomeçam em 0)
+                struct.pack_into('<Q', self._mm, self.SLOTS * 8, uuid.uuid4().int & (2 ** 64 - 1))
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def generation(self):
+        return f"{struct.unpack_from('<Q', self._mm, self.SLOTS * 8)[0]:x}"
+
+    def _slot(self, table):
+        return (zlib.crc32(table.encode('utf-8')) % self.SLOTS) * 8
+
+    def get(self, *tables):
+        return tuple(struct.unpack_from('<Q', self._mm, self._slot(table))[0] for table in tables)
+
+    def bump(self, *tables):
+        self._fcntl.flock(self._fd, self._fcntl.LOCK_EX)
+        try:
+            for table in tables:
+                slot = self._slot(table)
+                struct.pack_into('<Q', self._mm, slot, struct.unpack_from('<Q', self._mm, slot)[0] + 1)
+            return self.get(*tables)
+        finally:
+            self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+
+class ReferenceCache:
+    """Cache LRU com TTL; cada entrada guarda as versões das tabelas de que depende"""
+
+    def __init__(self, max_entries=1024, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (versões, expira_em, valor)
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'stale': 0}
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            if entry[0] != versions:
+                del self._entries[key]
+                self._counters['stale'] += 1
+                self._counters['misses'] += 1
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[key]
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry[2]
+
+    def set(self, key, versions, value):
+        with self._lock:
+            self._entries[key] = (versions, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        return stats
+
+if os.getenv('CACHE_SHARED_FILE'):
+    table_versions = SharedTableVersions(os.getenv('CACHE_SHARED_FILE'))
+else:
+    table_versions = TableVersions()
+    if int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+        # Índices e rankings em memória só veem as escritas deste worker até expirarem
+        print("Aviso: vários workers sem CACHE_SHARED_FILE; as escritas de outros workers "
+              "só aparecem nos índices em memória ao fim de max_age")
+
+reference_cache = ReferenceCache(int(os.getenv('CACHE_MAX_ENTRIES', 1024)), float(os.getenv('CACHE_TTL', 300)))
+
+def cached_reference(*tables):
+    """Servir a resposta da cache enquanto as tabelas indicadas não forem alteradas"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if get_stream_format():
+                return view(*args, **kwargs)
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+            versions = table_versions.get(*tables)
+            cached = reference_cache.get(key, versions)
+            if cached is not None:
+                body, mimetype, headers = cached
+                return Response(body, mimetype=mimetype, headers=headers)
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                headers = {name: value for name, value in response.headers.items() if name.startswith('X-')}
+                reference_cache.set(key, versions, (response.get_data(), response.mimetype, headers))
+            return response
+        return wrapper
+    return decorator
+
+def conditional_get(*tables, before=None):
+    """ETag forte a partir das versões das tabelas; If-None-Match responde 304 sem consultar a base de dados.
+
+    `before` corre antes de calcular o ETag (ex.: aplicar recálculos pendentes),
+    com os argumentos da rota.
+    Só com versões partilhadas (CACHE_SHARED_FILE): com contadores locais um
+    worker não vê as escritas dos outros e responderia 304 desatualizado.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if before:
+                before(**kwargs)
+            if not table_versions.partilhado:
+                return view(*args, **kwargs)
+            versions = '.'.join(str(version) for version in table_versions.get(*tables))
+            etag = f"{table_versions.generation()}-{versions}-{get_stream_format() or 'page'}"
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+# ==================== IDEMPOTÊNCIA ====================
+
+class IdempotencyStore:
+    """Respostas de POST guardadas por Idempotency-Key (LRU com TTL).
+
+    Uma chave fica "em curso" enquanto o primeiro pedido corre; repetições
+    recebem 409 até haver resposta e depois a resposta guardada. Com um
+    diretório partilhado (IDEMPOTENCY_DIR, ex. em /dev/shm) as respostas e os
+    bloqueios ficam visíveis a todos os workers do mesmo host; sem ele só servem
+    a um processo, por isso o gunicorn.conf.py define-o com mais de um worker.
+    """
+
+    def __init__(self, max_entries=10000, ttl=86400.0, directory=None, lock_timeout=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (fingerprint, expira_em, resposta ou None se em curso)
+        self._counters = {'novos': 0, 'repetidos': 0, 'em_curso': 0, 'divergentes': 0, 'evictions': 0}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, extensao):
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + extensao)
+
+    def _contar(self, nome):
+        with self._lock:
+            self._counters[nome] += 1
+
+    def _guardar(self, key, fingerprint, expira_em, resposta):
+        with self._lock:
+            self._entries[key] = (fingerprint, expira_em, resposta)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def begin(self, key, fingerprint):
+        """('novo'|'repetido'|'em_curso'|'divergente', resposta guardada)"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < now:
+                del self._entries[key]
+                entry = None
+        if entry is None and self.directory:
+            entry = self._ler(key, now)
+        if entry is not None:
+            if entry[0] != fingerprint:
+                self._contar('divergentes')
+                return 'divergente', None
+            if entry[2] is None:
+                self._contar('em_curso')
+                return 'em_curso', None
+            self._contar('repetidos')
+            return 'repetido', entry[2]
+        if self.directory and not self._bloquear(key, fingerprint, now):
+            self._contar('em_curso')
+            return 'em_curso', None
+        self._guardar(key, fingerprint, now + self.lock_timeout, None)
+        self._contar('novos')
+        return 'novo', None
+
+    def complete(self, key, fingerprint, resposta):
+        expira_em = time.time() + self.ttl
+        self._guardar(key, fingerprint, expira_em, resposta)
+        if self.directory:
+            status, body, headers = resposta
+            path = self._path(key, '.json')
+            try:
+                with open(path + '.tmp', 'w') as f:
+                    json.dump({'fingerprint': fingerprint, 'expira_em': expira_em, 'status': status,
+                               'body': base64.b64encode(body).decode('ascii'), 'headers': headers}, f)
+                os.replace(path + '.tmp', path)
+            except OSError as e:
+                print(f"Erro ao guardar resposta idempotente: {e}")
+            self._desbloquear(key)
+
+    def abort(self, key):
+        """Libertar a chave sem guardar resposta (erro do servidor: o cliente pode repetir)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is None:
+                del self._entries[key]
+        if self.directory:
+            self._desbloquear(key)
+
+    def _ler(self, key, now):
+        try:
+            with open(self._path(key, '.json')) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            lock_path = self._path(key, '.lock')
+            try:
+                if now - os.path.getmtime(lock_path) < self.lock_timeout:
+                    with open(lock_path) as f:
+                        return (f.read(), now + self.lock_timeout, None)
+            except OSError:
+                pass
+            return None
+        if data['expira_em'] < now:
+            return None
+        resposta = (data['status'], base64.b64decode(data['body']), data['headers'])
+        self._guardar(key, data['fingerprint'], data['expira_em'], resposta)
+        return data['fingerprint'], data['expira_em'], resposta
+
+    def _bloquear(self, key, fingerprint, now):
+        lock_path = self._path(key, '.lock')
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if now - os.path.getmtime(lock_path) < self.lock_timeout:
+                        return False
+                    os.unlink(lock_path)  # bloqueio de um worker que morreu
+                except OSError:
+                    pass
+                continue
+            os.write(fd, fingerprint.encode('ascii'))
+            os.close(fd)
+            return True
+        return False
+
+    def _desbloquear(self, key):
+        try:
+            os.unlink(self._path(key, '.lock'))
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        stats['shared'] = bool(self.directory)
+        return stats
+
+idempotency_store = IdempotencyStore(
+    int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', 10000)),
+    float(os.getenv('IDEMPOTENCY_TTL', 86400)),
+    os.getenv('IDEMPOTENCY_DIR')
+)
+
+IDEMPOTENCY_MAX_BODY = 1024 * 1024
+_IDEMPOTENCY_SKIP_HEADERS = {'content-length', 'date', 'set-cookie'}
+
+@app.before_request
+def _idempotencia_inicio():
+    """Responder a repetições de POST com a mesma Idempotency-Key sem voltar a executar a rota"""
+    if request.method != 'POST' or 'Idempotency-Key' not in request.headers:
+        return None
+    key = request.headers['Idempotency-Key']
+    if not key or len(key) > 255:
+        return jsonify({'error': 'Idempotency-Key inválida (1 a 255 caracteres)'}), 400
+    scoped = f"{request.path} {key}"
+    fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+    estado, resposta = idempotency_store.begin(scoped, fingerprint)
+    if estado == 'repetido':
+        status, body, headers = resposta
+        replay = Response(body, status=status, headers=headers)
+        replay.headers['Idempotent-Replayed'] = 'true'
+        return replay
+    if estado == 'em_curso':
+        return jsonify({'error': 'Pedido com esta Idempotency-Key ainda em curso'}), 409
+    if estado == 'divergente':
+        return jsonify({'error': 'Idempotency-Key já usada com outro pedido'}), 422
+    request.environ['minigolf.idempotency'] = (scoped, fingerprint)
+    return None
+
+@app.after_request
+def _idempotencia_fim(response):
+    pendente = request.environ.pop('minigolf.idempotency', None)
+    if pendente is not None:
+        scoped, fingerprint = pendente
+        if response.status_code >= 500 or response.is_streamed or \
+                (response.content_length or 0) > IDEMPOTENCY_MAX_BODY:
+            idempotency_store.abort(scoped)
+        else:
+            headers = [(name, value) for name, value in response.headers.items()
+                       if name.lower() not in _IDEMPOTENCY_SKIP_HEADERS]
+            idempotency_store.complete(scoped, fingerprint, (response.status_code, response.get_data(), headers))
+    return response
+
+@app.teardown_request
+def _idempotencia_erro(exc):
+    # Exceção não tratada: after_request não correu, libertar a chave
+    pendente = request.environ.pop('minigolf.idempotency', None)
+    if pendente is not None:
+        idempotency_store.abort(pendente[0])
 
 @app.route('/')
 def serve_html():
@@ -59,17 +1710,36 @@ def serve_html():
 # ==================== CIDADES ====================
 
 @app.route('/api/cidades', methods=['GET'])
+@conditional_get('cidades')
+@cached_reference('cidades')
 def get_cidades():
-    """Listar todas as cidades"""
+    """Listar cidades (paginado por nome, id)"""
+    page_size = get_page_size()
+    try:
+        after = decode_cursor(request.args['cursor'], 2) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = "SELECT * FROM cidades"
+    params = []
+    if after:
+        query += " WHERE nome > %s OR (nome = %s AND id > %s)"
+        params += [after[0], after[0], after[1]]
+    query += " ORDER BY nome, id"
+    
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_query(query, params, stream_format)
+    
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
     
     try:
         cursor = connection.cursor()
-        cursor.execute("SELECT * FROM cidades ORDER BY nome")
-        cidades = [dict_factory(cursor, row) for row in cursor.fetchall()]
-        return jsonify(cidades)
+        cursor.execute(query + " LIMIT %s", params + [page_size + 1])
+        cidades = fetchall_dicts(cursor)
+        return paginated_response(cidades, page_size, lambda c: [c['nome'], c['id']])
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -93,6 +1763,7 @@ def create_cidade():
         query = "INSERT INTO cidades (nome, distrito, codigo_postal) VALUES (%s, %s, %s)"
         cursor.execute(query, (data['nome'], data['distrito'], data.get('codigo_postal')))
         connection.commit()
+        table_versions.bump('cidades')
         return jsonify({'id': cursor.lastrowid, 'message': 'Cidade criada com sucesso'}), 201
     except Error as e:
         return jsonify({'error': str(e)}), 500
@@ -104,27 +1775,50 @@ def create_cidade():
 # ==================== CAMPOS ====================
 
 @app.route('/api/campos', methods=['GET'])
+@conditional_get('campos', 'cidades', 'pistas')
+@cached_reference('campos', 'cidades', 'pistas')
 def get_campos():
-    """Listar todos os campos"""
+    """Listar campos (paginado por cidade, nome, id)"""
+    page_size = get_page_size()
+    try:
+        after = decode_cursor(request.args['cursor'], 3) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = """
+    SELECT c.*, ci.nome as cidade_nome, ci.distrito,
+           COUNT(p.id) as total_pistas
+    FROM campos c
+    LEFT JOIN cidades ci ON c.cidade_id = ci.id
+    LEFT JOIN pistas p ON c.id = p.campo_id AND p.ativa = TRUE
+    WHERE c.ativo = TRUE
+    """
+    params = []
+    if after:
+        query += """
+        AND (COALESCE(ci.nome, '') > %s
+             OR (COALESCE(ci.nome, '') = %s AND c.nome > %s)
+             OR (COALESCE(ci.nome, '') = %s AND c.nome = %s AND c.id > %s))
+        """
+        params += [after[0], after[0], after[1], after[0], after[1], after[2]]
+    query += """
+    GROUP BY c.id
+    ORDER BY COALESCE(ci.nome, ''), c.nome, c.id
+    """
+    
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_query(query, params, stream_format)
+    
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
     
     try:
         cursor = connection.cursor()
-        query = """
-        SELECT c.*, ci.nome as cidade_nome, ci.distrito,
-               COUNT(p.id) as total_pistas
-        FROM campos c
-        LEFT JOIN cidades ci ON c.cidade_id = ci.id
-        LEFT JOIN pistas p ON c.id = p.campo_id AND p.ativa = TRUE
-        WHERE c.ativo = TRUE
-        GROUP BY c.id
-        ORDER BY ci.nome, c.nome
-        """
-        cursor.execute(query)
-        campos = [dict_factory(cursor, row) for row in cursor.fetchall()]
-        return jsonify(campos)
+        cursor.execute(query + " LIMIT %s", params + [page_size + 1])
+        campos = fetchall_dicts(cursor)
+        return paginated_response(campos, page_size, lambda c: [c['cidade_nome'] or '', c['nome'], c['id']])
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -132,7 +1826,173 @@ def get_campos():
             cursor.close()
             connection.close()
 
+class IndiceEspacial:
+    """Árvore k-d dos campos ativos sobre coordenadas 3D na esfera terrestre.
+
+    Reconstruída a partir da tabela campos quando a versão de campos/cidades muda
+    (create_campo neste worker, ou noutro com CACHE_SHARED_FILE) ou ao fim de
+    max_age segundos; as consultas de proximidade não tocam na base de dados.
+    """
+
+    RAIO_TERRA_KM = 6371.0088
+
+    QUERY = """
+    SELECT c.id, c.nome, c.tipo, c.endereco, c.latitude, c.longitude,
+           ci.nome as cidade_nome, ci.distrito
+    FROM campos c
+    LEFT JOIN cidades ci ON c.cidade_id = ci.id
+    WHERE c.ativo = TRUE AND c.latitude IS NOT NULL AND c.longitude IS NOT NULL
+    """
+
+    def __init__(self, max_age=300.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._raiz = None
+        self._campos = []
+        self._versao = None
+        self._construido_em = 0.0
+        self._counters = {'reconstrucoes': 0, 'consultas': 0}
+
+    @classmethod
+    def _xyz(cls, lat, lon):
+        lat, lon = math.radians(lat), math.radians(lon)
+        return (cls.RAIO_TERRA_KM * math.cos(lat) * math.cos(lon),
+                cls.RAIO_TERRA_KM * math.cos(lat) * math.sin(lon),
+                cls.RAIO_TERRA_KM * math.sin(lat))
+
+    @classmethod
+    def _construir(cls, pontos, profundidade=0):
+        # Nó: (ponto, índice do campo, eixo, esquerda, direita)
+        if not pontos:
+            return None
+        eixo = profundidade % 3
+        pontos.sort(key=lambda ponto: ponto[0][eixo])
+        meio = len(pontos) // 2
+        return (pontos[meio][0], pontos[meio][1], eixo,
+                cls._construir(pontos[:meio], profundidade + 1),
+                cls._construir(pontos[meio + 1:], profundidade + 1))
+
+    def carregar(self, campos, versao=None):
+        """Substituir o índice pelos campos dados (dicionários com latitude/longitude)"""
+        campos = [c for c in campos if c.get('latitude') is not None and c.get('longitude') is not None]
+        raiz = self._construir([(self._xyz(float(c['latitude']), float(c['longitude'])), i)
+                                for i, c in enumerate(campos)])
+        with self._lock:
+            self._raiz = raiz
+            self._campos = campos
+            self._versao = versao
+            self._construido_em = time.monotonic()
+            self._counters['reconstrucoes'] += 1
+
+    def reconstruir(self, cursor):
+        versao = table_versions.get('campos', 'cidades')
+        cursor.execute(self.QUERY)
+        self.carregar(fetchall_dicts(cursor), versao)
+
+    def _atual(self):
+        return (self._versao == table_versions.get('campos', 'cidades')
+                and time.monotonic() - self._construido_em < self.max_age)
+
+    def garantir_atual(self):
+        """Reconstruir o índice se estiver desatualizado; False se a base de dados falhar"""
+        with self._lock:
+            if self._atual():
+                return True
+        with self._rebuild_lock:
+            with self._lock:
+                if self._atual():
+                    return True
+            connection = get_db_connection()
+            if not connection:
+                return False
+            try:
+                cursor = connection.cursor()
+                self.reconstruir(cursor)
+                return True
+            except Error as e:
+                print(f"Erro ao reconstruir índice de campos: {e}")
+                return False
+            finally:
+                if connection.is_connected():
+                    cursor.close()
+                    connection.close()
+
+    def distancia_km(self, lat1, lon1, lat2, lon2):
+        """Distância de círculo máximo (haversine)"""
+        lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return 2 * self.RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+    def proximos(self, lat, lon, k, raio_km=None):
+        """Os k campos mais próximos de (lat, lon), opcionalmente até raio_km"""
+        with self._lock:
+            raiz, campos = self._raiz, self._campos
+            self._counters['consultas'] += 1
+        alvo = self._xyz(lat, lon)
+        if raio_km is None:
+            limite = float('inf')
+        else:
+            # Distância em linha reta (corda) equivalente ao raio sobre a superfície
+            corda = 2 * self.RAIO_TERRA_KM * math.sin(min(raio_km / (2 * self.RAIO_TERRA_KM), math.pi / 2))
+            limite = corda * corda
+        melhores = []  # heap de (-distância², índice)
+        
+        def visitar(no):
+            if no is None:
+                return
+            ponto, i, eixo, esquerda, direita = no
+            d2 = (ponto[0] - alvo[0]) ** 2 + (ponto[1] - alvo[1]) ** 2 + (ponto[2] - alvo[2]) ** 2
+            if d2 <= limite:
+                if len(melhores) < k:
+                    heapq.heappush(melhores, (-d2, i))
+                elif d2 < -melhores[0][0]:
+                    heapq.heapreplace(melhores, (-d2, i))
+            diferenca = alvo[eixo] - ponto[eixo]
+            primeiro, segundo = (esquerda, direita) if diferenca < 0 else (direita, esquerda)
+            visitar(primeiro)
+            pior = -melhores[0][0] if len(melhores) == k else limite
+            if diferenca * diferenca <= pior:
+                visitar(segundo)
+        
+        if k > 0:
+            visitar(raiz)
+        resultado = []
+        for _, i in sorted(melhores, reverse=True):
+            campo = campos[i]
+            distancia = self.distancia_km(lat, lon, float(campo['latitude']), float(campo['longitude']))
+            resultado.append(dict(campo, distancia_km=round(distancia, 3)))
+        return resultado
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['campos'] = len(self._campos)
+        return stats
+
+indice_campos = IndiceEspacial(float(os.getenv('CAMPOS_INDEX_MAX_AGE', 300)))
+
+@app.route('/api/campos/proximos', methods=['GET'])
+@conditional_get('campos', 'cidades')
+def get_campos_proximos():
+    """Campos mais próximos de um ponto (?lat=&lon=&raio_km=&limit=), com distância em km"""
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        raio_km = float(request.args['raio_km']) if request.args.get('raio_km') else None
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat e lon são obrigatórios e numéricos (raio_km opcional)'}), 400
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (raio_km is not None and raio_km <= 0):
+        return jsonify({'error': 'Coordenadas ou raio inválidos'}), 400
+    limit = min(get_page_size(10), 100)
+    
+    if not indice_campos.garantir_atual():
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    return jsonify(indice_campos.proximos(lat, lon, limit, raio_km))
+
 @app.route('/api/campos/<int:campo_id>', methods=['GET'])
+@conditional_get('campos', 'cidades', 'pistas')
+@cached_reference('campos', 'cidades', 'pistas')
 def get_campo(campo_id):
     """Obter detalhes de um campo específico"""
     connection = get_db_connection()
@@ -148,12 +2008,10 @@ def get_campo(campo_id):
         WHERE c.id = %s AND c.ativo = TRUE
         """
         cursor.execute(query, (campo_id,))
-        campo = cursor.fetchone()
+        campo_dict = fetchone_dict(cursor)
         
-        if not campo:
+        if not campo_dict:
             return jsonify({'error': 'Campo não encontrado'}), 404
-            
-        campo_dict = dict_factory(cursor, campo)
         
         # Buscar pistas do campo
         cursor.execute("""
@@ -161,7 +2019,7 @@ def get_campo(campo_id):
         WHERE campo_id = %s AND ativa = TRUE 
         ORDER BY numero_pista
         """, (campo_id,))
-        pistas = [dict_factory(cursor, row) for row in cursor.fetchall()]
+        pistas = fetchall_dicts(cursor)
         campo_dict['pistas'] = pistas
         
         return jsonify(campo_dict)
@@ -205,6 +2063,7 @@ def create_campo():
         )
         cursor.execute(query, values)
         connection.commit()
+        table_versions.bump('campos')
         return jsonify({'id': cursor.lastrowid, 'message': 'Campo criado com sucesso'}), 201
     except Error as e:
         return jsonify({'error': str(e)}), 500
@@ -215,24 +2074,248 @@ def create_campo():
 
 # ==================== PISTAS ====================
 
-@app.route('/api/campos/<int:campo_id>/pistas', methods=['GET'])
-def get_pistas_campo(campo_id):
-    """Listar pistas de um campo"""
-    connection = get_db_connection()
-    if not connection:
-        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
-    
-    try:
-        cursor = connection.cursor()
-        query = """
-        SELECT p.*, c.nome as campo_nome
+class DificuldadePistas:
+    """Distribuição das tacadas por pista (rollup em memória) para medir a dificuldade.
+
+    A agregação é feita pela base de dados com GROUP BY pista_id, numero_tacadas
+    em lotes de intervalos de tacadas.id, por isso só os histogramas chegam ao
+    worker. Tacadas novas entram de forma incremental quando a versão de
+    tacadas muda ou ao fim de `intervalo` segundos. Os últimos `janela_ids` ids
+    são relidos linha a linha em cada sincronização, porque um id baixo pode
+    ser confirmado depois de um mais alto já ter sido lido (transações em
+    curso); só os ids abaixo da janela ficam dados como estáveis. Quem corrige
+    uma tacada já gravada (upsert com outro valor) incrementa a versão de
+    tacadas_corrigidas, e a leitura seguinte reconstrói os histogramas antes de
+    responder; além disso há uma reconstrução em fundo ao fim de max_age segundos.
+    """
+
+    QUERY = """
+    SELECT pista_id, numero_tacadas, COUNT(*)
+    FROM tacadas
+    WHERE id > %s AND id <= %s
+    GROUP BY pista_id, numero_tacadas
+    """
+
+    def __init__(self, max_age=900.0, intervalo=10.0, lote_ids=200000, janela_ids=1000):
+        self.max_age = max_age
+        self.intervalo = intervalo
+        self.lote_ids = lote_ids
+        self.janela_ids = janela_ids
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._histogramas = None  # pista_id -> {numero_tacadas: contagem}
+        self._estavel = 0         # tacadas com id <= _estavel agregadas de vez
+        self._recentes = {}       # id -> (pista_id, numero_tacadas) contadas acima de _estavel
+        self._versao = None
+        self._correcoes = None
+        self._construido_em = 0.0
+        self._sincronizado_em = 0.0
+        self._thread = None
+        self._counters = {'reconstrucoes': 0, 'reconstrucoes_correcoes': 0, 'incrementos': 0, 'tacadas': 0}
+
+    def _agregar(self, cursor, histogramas, desde, ate):
+        """Somar aos histogramas as tacadas com id em ]desde, ate], por lotes de ids"""
+        tacadas = 0
+        while desde < ate:
+            fim = min(desde + self.lote_ids, ate)
+            cursor.execute(self.QUERY, (desde, fim))
+            for pista_id, numero_tacadas, contagem in cursor.fetchall():
+                histograma = histogramas.setdefault(pista_id, {})
+                histograma[numero_tacadas] = histograma.get(numero_tacadas, 0) + contagem
+                tacadas += contagem
+            desde = fim
+        return tacadas
+
+    @staticmethod
+    def _maximo_id(cursor):
+        cursor.execute("SELECT MAX(id) FROM tacadas")
+        row = cursor.fetchone()
+        return (row[0] if row else None) or 0
+
+    def _sincronizar(self, cursor, estavel, recentes):
+        """Variação dos histogramas desde o estado (estavel, recentes).
+
+        As tacadas recentes já contadas são descontadas e voltam a entrar com
+        o valor atual: as que passam a estáveis pela agregação do intervalo
+        ]estavel, novo estavel], as da janela pela releitura linha a linha.
+        Devolve (variação, novo estavel, novas recentes, variação do número de tacadas).
+        """
+        novo_estavel = max(estavel, self._maximo_id(cursor) - self.janela_ids)
+        variacao = {}
+        for pista_id, numero_tacadas in recentes.values():
+            histograma = variacao.setdefault(pista_id, {})
+            histograma[numero_tacadas] = histograma.get(numero_tacadas, 0) - 1
+        tacadas = self._agregar(cursor, variacao, estavel, novo_estavel) - len(recentes)
+        cursor.execute("SELECT id, pista_id, numero_tacadas FROM tacadas WHERE id > %s", (novo_estavel,))
+        novas_recentes = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+        for pista_id, numero_tacadas in novas_recentes.values():
+            histograma = variacao.setdefault(pista_id, {})
+            histograma[numero_tacadas] = histograma.get(numero_tacadas, 0) + 1
+        return variacao, novo_estavel, novas_recentes, tacadas + len(novas_recentes)
+
+    def reconstruir(self, cursor):
+        """Recalcular todos os histogramas a partir da tabela tacadas"""
+        versao, correcoes = table_versions.get('tacadas', 'tacadas_corrigidas')
+        histogramas, estavel, recentes, tacadas = self._sincronizar(cursor, 0, {})
+        with self._lock:
+            self._histogramas = histogramas
+            self._estavel = estavel
+            self._recentes = recentes
+            self._versao = versao
+            self._correcoes = correcoes
+            self._construido_em = self._sincronizado_em = time.monotonic()
+            self._counters['reconstrucoes'] += 1
+            self._counters['tacadas'] = tacadas
+
+    def incrementar(self, cursor):
+        """Acrescentar as tacadas confirmadas desde a última sincronização"""
+        versao = table_versions.get('tacadas')[0]
+        with self._lock:
+            estavel, recentes = self._estavel, self._recentes
+        variacao, novo_estavel, novas_recentes, tacadas = self._sincronizar(cursor, estavel, recentes)
+        with self._lock:
+            if self._histogramas is None or self._recentes is not recentes:
+                # Outra sincronização (ou reconstrução) já avançou entretanto
+                return
+            for pista_id, valores in variacao.items():
+                histograma = self._histogramas.setdefault(pista_id, {})
+                for numero_tacadas, contagem in valores.items():
+                    contagem += histograma.get(numero_tacadas, 0)
+                    if contagem:
+                        histograma[numero_tacadas] = contagem
+                    else:
+                        histograma.pop(numero_tacadas, None)
+            self._estavel = novo_estavel
+            self._recentes = novas_recentes
+            self._versao = versao
+            self._sincronizado_em = time.monotonic()
+            self._counters['incrementos'] += 1
+            self._counters['tacadas'] += tacadas
+
+    def _com_conexao(self, operacao):
+        connection = get_db_connection()
+        if not connection:
+            return False
+        try:
+            cursor = connection.cursor()
+            operacao(cursor)
+            return True
+        except Error as e:
+            print(f"Erro ao agregar tacadas por pista: {e}")
+            return False
+        finally:
+            if connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    def _reconstruir_em_fundo(self):
+        with self._rebuild_lock:
+            self._com_conexao(self.reconstruir)
+
+    def garantir_atual(self):
+        """Construir, atualizar ou agendar a reconstrução; False se a base de dados falhar"""
+        with self._lock:
+            construido = self._histogramas is not None
+            agora = time.monotonic()
+            expirado = construido and agora - self._construido_em >= self.max_age
+            if expirado and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._reconstruir_em_fundo,
+                                                name='reconstrucao-pistas', daemon=True)
+                self._thread.start()
+            corrigido = construido and self._correcoes != table_versions.get('tacadas_corrigidas')[0]
+            desatualizado = construido and (self._versao != table_versions.get('tacadas')[0]
+                                            or agora - self._sincronizado_em >= self.intervalo)
+        if corrigido:
+            # Tacadas já contadas mudaram de valor: o incremento por ids não as vê
+            with self._rebuild_lock:
+                with self._lock:
+                    if self._correcoes == table_versions.get('tacadas_corrigidas')[0]:
+                        return True
+                    self._counters['reconstrucoes_correcoes'] += 1
+                return self._com_conexao(self.reconstruir)
+        if desatualizado:
+            return self._com_conexao(self.incrementar)
+        if construido:
+            return True
+        with self._rebuild_lock:
+            if self._histogramas is not None:
+                return True
+            return self._com_conexao(self.reconstruir)
+
+    def estatisticas(self, pista_id, par):
+        """Média, mediana, distribuição, média acima do par e taxa de hole-in-one de uma pista"""
+        with self._lock:
+            histograma = dict(self._histogramas.get(pista_id, {}))
+        total = sum(histograma.values())
+        if not total:
+            return {'tacadas': 0, 'media': None, 'mediana': None, 'media_acima_par': None,
+                    'taxa_hole_in_one': None, 'distribuicao': {}}
+        valores = sorted(histograma)
+        media = sum(valor * histograma[valor] for valor in valores) / total
+        
+        def posicao(k):
+            acumulado = 0
+            for valor in valores:
+                acumulado += histograma[valor]
+                if acumulado > k:
+                    return valor
+        
+        mediana = (posicao((total - 1) // 2) + posicao(total // 2)) / 2
+        return {
+            'tacadas': total,
+            'media': round(media, 3),
+            'mediana': mediana,
+            'media_acima_par': round(media - par, 3) if par is not None else None,
+            'taxa_hole_in_one': round(histograma.get(1, 0) / total, 4),
+            'distribuicao': {str(valor): histograma[valor] for valor in valores}
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['pistas'] = len(self._histogramas) if self._histogramas is not None else 0
+            stats['ultimo_id_estavel'] = self._estavel
+            stats['janela'] = len(self._recentes)
+        return stats
+
+dificuldade_pistas = DificuldadePistas(
+    max_age=float(os.getenv('PISTAS_STATS_MAX_AGE', 900)),
+    intervalo=float(os.getenv('PISTAS_STATS_INTERVALO', 10)),
+    janela_ids=int(os.getenv('PISTAS_STATS_JANELA', 1000))
+)
+
+@app.route('/api/campos/<int:campo_id>/pistas', methods=['GET'])
+@conditional_get('pistas', 'campos', 'tacadas')
+def get_pistas_campo(campo_id):
+    """Listar pistas de um campo, com a dificuldade medida a partir das tacadas"""
+    response = listar_pistas_campo(campo_id)
+    if response.status_code != 200:
+        return response
+    if not dificuldade_pistas.garantir_atual():
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    pistas = response.get_json()
+    for pista in pistas:
+        pista['estatisticas'] = dificuldade_pistas.estatisticas(pista['id'], pista.get('par'))
+    return jsonify(pistas)
+
+@cached_reference('pistas', 'campos')
+def listar_pistas_campo(campo_id):
+    """Listar pistas de um campo"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        cursor = connection.cursor()
+        query = """
+        SELECT p.*, c.nome as campo_nome
         FROM pistas p
         JOIN campos c ON p.campo_id = c.id
         WHERE p.campo_id = %s AND p.ativa = TRUE
         ORDER BY p.numero_pista
         """
         cursor.execute(query, (campo_id,))
-        pistas = [dict_factory(cursor, row) for row in cursor.fetchall()]
+        pistas = fetchall_dicts(cursor)
         return jsonify(pistas)
     except Error as e:
         return jsonify({'error': str(e)}), 500
@@ -241,6 +2324,36 @@ def get_pistas_campo(campo_id):
             cursor.close()
             connection.close()
 
+@app.route('/api/pistas/<int:pista_id>/estatisticas', methods=['GET'])
+@conditional_get('pistas', 'tacadas')
+def get_estatisticas_pista(pista_id):
+    """Dificuldade medida de uma pista: média, mediana, distribuição, média acima do par, hole-in-one"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT id, campo_id, numero_pista, nome, dificuldade, par
+        FROM pistas WHERE id = %s
+        """, (pista_id,))
+        pistas = fetchall_dicts(cursor)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+    
+    if not pistas:
+        return jsonify({'error': 'Pista não encontrada'}), 404
+    if not dificuldade_pistas.garantir_atual():
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    pista = pistas[0]
+    pista['estatisticas'] = dificuldade_pistas.estatisticas(pista_id, pista['par'])
+    return jsonify(pista)
+
 @app.route('/api/pistas', methods=['POST'])
 def create_pista():
     """Criar nova pista"""
@@ -266,6 +2379,7 @@ def create_pista():
         )
         cursor.execute(query, values)
         connection.commit()
+        table_versions.bump('pistas')
         return jsonify({'id': cursor.lastrowid, 'message': 'Pista criada com sucesso'}), 201
     except Error as e:
         return jsonify({'error': str(e)}), 500
@@ -276,24 +2390,221 @@ def create_pista():
 
 # ==================== JOGADORES ====================
 
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos ('Jóão' -> 'joao'), para pesquisa"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(ch for ch in decomposto if not unicodedata.combining(ch)).casefold()
+
+class IndicePesquisaJogadores:
+    """Índice em memória para pesquisa de jogadores por nome e email.
+
+    Cada palavra normalizada (sem acentos) do nome e do email fica numa lista
+    ordenada, pesquisada por prefixo com bisect; os trigramas do nome servem a
+    pesquisa aproximada (erros de escrita) quando os prefixos não chegam.
+    create_jogador acrescenta o jogador sem reconstruir; outras alterações
+    (versão de jogadores/cidades ou max_age) reconstroem na consulta seguinte.
+    Jogadores criados noutro worker só mudam a versão com CACHE_SHARED_FILE;
+    sem ele aparecem ao fim de max_age segundos.
+    """
+
+    QUERY = """
+    SELECT j.id, j.nome, j.email, j.cidade_id, j.avatar_url, c.nome as cidade_nome
+    FROM jogadores j
+    LEFT JOIN cidades c ON j.cidade_id = c.id
+    """
+
+    SIMILARIDADE_MINIMA = 0.3
+
+    def __init__(self, max_age=300.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._versao = None
+        self._construido_em = 0.0
+        self._limpar()
+        self._counters = {'reconstrucoes': 0, 'adicionados': 0, 'consultas': 0}
+
+    def _limpar(self):
+        self._jogadores = {}
+        self._palavras = []      # (palavra, id) ordenado
+        self._trigramas = {}     # trigrama -> set(id)
+        self._num_trigramas = {}
+
+    @staticmethod
+    def palavras(texto):
+        return [p for p in re.split(r'[^0-9a-z]+', normalizar_texto(texto)) if p]
+
+    @staticmethod
+    def trigramas(texto):
+        trigramas = set()
+        for palavra in IndicePesquisaJogadores.palavras(texto):
+            palavra = f"  {palavra} "
+            trigramas.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+        return trigramas
+
+    def _termos(self, jogador):
+        """Palavras (nome e email) e trigramas (nome) de um jogador"""
+        palavras = set(self.palavras(jogador['nome']) + self.palavras(jogador.get('email')))
+        return palavras, self.trigramas(jogador['nome'])
+
+    def _indexar(self, jogador):
+        jogador_id = jogador['id']
+        palavras, trigramas = self._termos(jogador)
+        self._jogadores[jogador_id] = jogador
+        for palavra in palavras:
+            bisect.insort(self._palavras, (palavra, jogador_id))
+        for trigrama in trigramas:
+            self._trigramas.setdefault(trigrama, set()).add(jogador_id)
+        self._num_trigramas[jogador_id] = len(trigramas)
+
+    def carregar(self, jogadores, versao=None):
+        """Construir o índice fora do lock (uma só ordenação) e trocá-lo de uma vez"""
+        indice, pares, indice_trigramas, num_trigramas = {}, [], {}, {}
+        for jogador in jogadores:
+            jogador_id = jogador['id']
+            palavras, trigramas = self._termos(jogador)
+            indice[jogador_id] = jogador
+            pares.extend((palavra, jogador_id) for palavra in palavras)
+            for trigrama in trigramas:
+                indice_trigramas.setdefault(trigrama, set()).add(jogador_id)
+            num_trigramas[jogador_id] = len(trigramas)
+        pares.sort()
+        with self._lock:
+            self._jogadores = indice
+            self._palavras = pares
+            self._trigramas = indice_trigramas
+            self._num_trigramas = num_trigramas
+            self._versao = versao
+            self._construido_em = time.monotonic()
+            self._counters['reconstrucoes'] += 1
+
+    def reconstruir(self, cursor):
+        versao = table_versions.get('jogadores', 'cidades')
+        cursor.execute(self.QUERY)
+        self.carregar(fetchall_dicts(cursor), versao)
+
+    def adicionar(self, jogador, versao_anterior, versao_nova):
+        """Indexar um jogador novo se o índice refletia versao_anterior"""
+        with self._lock:
+            if self._versao != versao_anterior:
+                return
+            self._indexar(jogador)
+            self._versao = versao_nova
+            self._counters['adicionados'] += 1
+
+    def _atual(self):
+        return (self._versao == table_versions.get('jogadores', 'cidades')
+                and time.monotonic() - self._construido_em < self.max_age)
+
+    def garantir_atual(self):
+        """Reconstruir o índice se estiver desatualizado; False se a base de dados falhar"""
+        with self._lock:
+            if self._atual():
+                return True
+        with self._rebuild_lock:
+            with self._lock:
+                if self._atual():
+                    return True
+            connection = get_db_connection()
+            if not connection:
+                return False
+            try:
+                cursor = connection.cursor()
+                self.reconstruir(cursor)
+                return True
+            except Error as e:
+                print(f"Erro ao reconstruir índice de jogadores: {e}")
+                return False
+            finally:
+                if connection.is_connected():
+                    cursor.close()
+                    connection.close()
+
+    def _prefixo(self, prefixo):
+        inicio = bisect.bisect_left(self._palavras, (prefixo,))
+        ids = set()
+        for palavra, jogador_id in itertools.islice(self._palavras, inicio, None):
+            if not palavra.startswith(prefixo):
+                break
+            ids.add(jogador_id)
+        return ids
+
+    def pesquisar(self, termo):
+        """Jogadores que correspondem ao termo: primeiro os que têm todas as
+        palavras como prefixo (por nome, id), depois os aproximados por
+        semelhança de trigramas (mais semelhantes primeiro)"""
+        palavras = self.palavras(termo)
+        with self._lock:
+            self._counters['consultas'] += 1
+            exatos = None
+            for palavra in palavras:
+                ids = self._prefixo(palavra)
+                exatos = ids if exatos is None else exatos & ids
+                if not exatos:
+                    break
+            exatos = exatos or set()
+            
+            trigramas = self.trigramas(termo)
+            comuns = {}
+            for trigrama in trigramas:
+                for jogador_id in self._trigramas.get(trigrama, ()):
+                    if jogador_id not in exatos:
+                        comuns[jogador_id] = comuns.get(jogador_id, 0) + 1
+            aproximados = []
+            for jogador_id, n in comuns.items():
+                semelhanca = n / (len(trigramas) + self._num_trigramas[jogador_id] - n)
+                if semelhanca >= self.SIMILARIDADE_MINIMA:
+                    aproximados.append((semelhanca, jogador_id))
+            
+            jogadores = self._jogadores
+            resultado = sorted((jogadores[i] for i in exatos), key=lambda j: (j['nome'], j['id']))
+            aproximados.sort(key=lambda a: (-a[0], jogadores[a[1]]['nome'], a[1]))
+            resultado += [dict(jogadores[i], semelhanca=round(semelhanca, 3)) for semelhanca, i in aproximados]
+        return resultado
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['jogadores'] = len(self._jogadores)
+            stats['palavras'] = len(self._palavras)
+        return stats
+
+indice_jogadores = IndicePesquisaJogadores(float(os.getenv('JOGADORES_INDEX_MAX_AGE', 300)))
+
 @app.route('/api/jogadores', methods=['GET'])
+@conditional_get('jogadores', 'cidades')
 def get_jogadores():
-    """Listar todos os jogadores"""
+    """Listar jogadores (paginado por nome, id)"""
+    page_size = get_page_size()
+    try:
+        after = decode_cursor(request.args['cursor'], 2) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = """
+    SELECT j.*, c.nome as cidade_nome
+    FROM jogadores j
+    LEFT JOIN cidades c ON j.cidade_id = c.id
+    """
+    params = []
+    if after:
+        query += " WHERE j.nome > %s OR (j.nome = %s AND j.id > %s)"
+        params += [after[0], after[0], after[1]]
+    query += " ORDER BY j.nome, j.id"
+    
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_query(query, params, stream_format)
+    
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
     
     try:
         cursor = connection.cursor()
-        query = """
-        SELECT j.*, c.nome as cidade_nome
-        FROM jogadores j
-        LEFT JOIN cidades c ON j.cidade_id = c.id
-        ORDER BY j.nome
-        """
-        cursor.execute(query)
-        jogadores = [dict_factory(cursor, row) for row in cursor.fetchall()]
-        return jsonify(jogadores)
+        cursor.execute(query + " LIMIT %s", params + [page_size + 1])
+        jogadores = fetchall_dicts(cursor)
+        return paginated_response(jogadores, page_size, lambda j: [j['nome'], j['id']])
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -301,6 +2612,26 @@ def get_jogadores():
             cursor.close()
             connection.close()
 
+@app.route('/api/jogadores/pesquisa', methods=['GET'])
+@conditional_get('jogadores', 'cidades')
+def pesquisar_jogadores():
+    """Pesquisar jogadores por nome ou email (?q=), sem acentos, por prefixo ou aproximada (paginado)"""
+    termo = request.args.get('q', '')
+    if not IndicePesquisaJogadores.palavras(termo):
+        return jsonify({'error': 'Parâmetro q é obrigatório'}), 400
+    page_size = get_page_size(20)
+    try:
+        inicio = decode_cursor(request.args['cursor'], 1)[0] if request.args.get('cursor') else 0
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not isinstance(inicio, int) or inicio < 0:
+        return jsonify({'error': 'Cursor inválido'}), 400
+    
+    if not indice_jogadores.garantir_atual():
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    jogadores = indice_jogadores.pesquisar(termo)[inicio:inicio + page_size + 1]
+    return paginated_response(jogadores, page_size, lambda j: [inicio + page_size])
+
 @app.route('/api/jogadores', methods=['POST'])
 def create_jogador():
     """Criar novo jogador"""
@@ -323,8 +2654,15 @@ def create_jogador():
             data.get('data_nascimento'), data.get('cidade_id'), data.get('avatar_url')
         )
         cursor.execute(query, values)
+        jogador_id = cursor.lastrowid
         connection.commit()
-        return jsonify({'id': cursor.lastrowid, 'message': 'Jogador criado com sucesso'}), 201
+        versao_anterior = table_versions.get('jogadores', 'cidades')
+        table_versions.bump('jogadores')
+        cursor.execute(IndicePesquisaJogadores.QUERY + " WHERE j.id = %s", (jogador_id,))
+        jogadores = fetchall_dicts(cursor)
+        if jogadores:
+            indice_jogadores.adicionar(jogadores[0], versao_anterior, table_versions.get('jogadores', 'cidades'))
+        return jsonify({'id': jogador_id, 'message': 'Jogador criado com sucesso'}), 201
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -336,9 +2674,39 @@ def create_jogador():
 
 @app.route('/api/jogos', methods=['GET'])
 def get_jogos():
-    """Listar todos os jogos"""
+    """Listar jogos (paginado por data_jogo, id, do mais recente para o mais antigo)"""
     campo_id = request.args.get('campo_id')
-    limit = request.args.get('limit', 50)
+    page_size = get_page_size(50)
+    try:
+        before = decode_cursor(request.args['cursor'], 2) if request.args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = """
+    SELECT j.*, c.nome as campo_nome, ci.nome as cidade_nome
+    FROM jogos j
+    JOIN campos c ON j.campo_id = c.id
+    JOIN cidades ci ON c.cidade_id = ci.id
+    """
+    conditions = []
+    params = []
+    
+    if campo_id:
+        conditions.append("j.campo_id = %s")
+        params.append(campo_id)
+    
+    if before:
+        conditions.append("(j.data_jogo < %s OR (j.data_jogo = %s AND j.id < %s))")
+        params += [before[0], before[0], before[1]]
+    
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    
+    query += " ORDER BY j.data_jogo DESC, j.id DESC"
+    
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_query(query, params, stream_format)
     
     connection = get_db_connection()
     if not connection:
@@ -346,24 +2714,9 @@ def get_jogos():
     
     try:
         cursor = connection.cursor()
-        query = """
-        SELECT j.*, c.nome as campo_nome, ci.nome as cidade_nome
-        FROM jogos j
-        JOIN campos c ON j.campo_id = c.id
-        JOIN cidades ci ON c.cidade_id = ci.id
-        """
-        params = []
-        
-        if campo_id:
-            query += " WHERE j.campo_id = %s"
-            params.append(campo_id)
-        
-        query += " ORDER BY j.data_jogo DESC LIMIT %s"
-        params.append(int(limit))
-        
-        cursor.execute(query, params)
-        jogos = [dict_factory(cursor, row) for row in cursor.fetchall()]
-        return jsonify(jogos)
+        cursor.execute(query + " LIMIT %s", params + [page_size + 1])
+        jogos = fetchall_dicts(cursor)
+        return paginated_response(jogos, page_size, lambda j: [j['data_jogo'], j['id']])
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -412,6 +2765,8 @@ def create_jogo():
             cursor.execute(query_participante, (jogo_id, jogador_id, i))
         
         connection.commit()
+        table_versions.bump('jogos')
+        participantes_alterados(cursor, jogo_id)
         return jsonify({'id': jogo_id, 'message': 'Jogo criado com sucesso'}), 201
     except Error as e:
         connection.rollback()
@@ -424,6 +2779,10 @@ def create_jogo():
 @app.route('/api/jogos/<int:jogo_id>', methods=['GET'])
 def get_jogo(jogo_id):
     """Obter detalhes de um jogo específico"""
+    recalculo_estatisticas.flush(jogo_id)
+    if (request.args.get('formato') == 'compacto'
+            or request.accept_mimetypes.best == SCORECARD_MIMETYPE):
+        return get_jogo_compacto(jogo_id)
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
@@ -440,13 +2799,11 @@ def get_jogo(jogo_id):
         WHERE j.id = %s
         """
         cursor.execute(query_jogo, (jogo_id,))
-        jogo = cursor.fetchone()
+        jogo_dict = fetchone_dict(cursor)
         
-        if not jogo:
+        if not jogo_dict:
             return jsonify({'error': 'Jogo não encontrado'}), 404
         
-        jogo_dict = dict_factory(cursor, jogo)
-        
         # Buscar participantes
         query_participantes = """
         SELECT jp.*, jog.nome as jogador_nome
@@ -456,7 +2813,7 @@ def get_jogo(jogo_id):
         ORDER BY jp.ordem_jogador
         """
         cursor.execute(query_participantes, (jogo_id,))
-        participantes = [dict_factory(cursor, row) for row in cursor.fetchall()]
+        participantes = fetchall_dicts(cursor)
         jogo_dict['participantes'] = participantes
         
         # Buscar tacadas
@@ -469,10 +2826,13 @@ def get_jogo(jogo_id):
         ORDER BY p.numero_pista, t.jogador_id
         """
         cursor.execute(query_tacadas, (jogo_id,))
-        tacadas = [dict_factory(cursor, row) for row in cursor.fetchall()]
+        tacadas = fetchall_dicts(cursor)
         jogo_dict['tacadas'] = tacadas
         
-        return jsonify(jogo_dict)
+        # A mesma URL também serve o cartão compacto (Accept): as caches têm de distinguir
+        response = jsonify(jogo_dict)
+        response.headers['Vary'] = 'Accept'
+        return response
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -480,43 +2840,92 @@ def get_jogo(jogo_id):
             cursor.close()
             connection.close()
 
-# ==================== TACADAS ====================
+SCORECARD_MIMETYPE = 'application/vnd.minigolf.scorecard+json'
 
-@app.route('/api/tacadas', methods=['POST'])
-def registrar_tacada():
-    """Registrar tacada de um jogador numa pista"""
-    data = request.get_json()
-    required_fields = ['jogo_id', 'jogador_id', 'pista_id', 'numero_tacadas']
+# Colunas do cartão (além de j.*, campo_nome e cidade_nome) numa só consulta
+_SCORECARD_COLUMNS = ('jogador_id', 'jogador_nome', 'total_tacadas', 'posicao_final',
+                      'pista_id', 'numero_pista', 'pista_nome', 'par', 'numero_tacadas')
+
+def carregar_cartao(cursor, jogo_id):
+    """Cartão de um jogo numa só consulta: jogadores, pistas e matriz de tacadas.
+
+    tacadas[i][k] são as tacadas do jogador i na pista k (0 se não registadas).
+    Devolve None se o jogo não existir.
+    """
+    query = """
+    SELECT j.*, c.nome as campo_nome, ci.nome as cidade_nome,
+           jp.jogador_id as jogador_id, jog.nome as jogador_nome,
+           jp.total_tacadas as total_tacadas, jp.posicao_final as posicao_final,
+           p.id as pista_id, p.numero_pista as numero_pista, p.nome as pista_nome,
+           p.par as par, t.numero_tacadas as numero_tacadas
+    FROM jogos j
+    JOIN campos c ON j.campo_id = c.id
+    JOIN cidades ci ON c.cidade_id = ci.id
+    LEFT JOIN jogo_participantes jp ON jp.jogo_id = j.id
+    LEFT JOIN jogadores jog ON jog.id = jp.jogador_id
+    LEFT JOIN pistas p ON p.campo_id = j.campo_id
+    LEFT JOIN tacadas t ON t.jogo_id = j.id AND t.jogador_id = jp.jogador_id AND t.pista_id = p.id
+    WHERE j.id = %s
+      AND (p.id IS NULL OR p.ativa = TRUE
+           OR p.id IN (SELECT pista_id FROM tacadas WHERE jogo_id = %s))
+    ORDER BY jp.ordem_jogador, p.numero_pista
+    """
+    cursor.execute(query, (jogo_id, jogo_id))
+    rows = fetchall_dicts(cursor)
     
-    if not data or not all(field in data for field in required_fields):
-        return jsonify({'error': 'jogo_id, jogador_id, pista_id e numero_tacadas são obrigatórios'}), 400
+    if not rows:
+        return None
+    
+    cartao = {key: value for key, value in rows[0].items() if key not in _SCORECARD_COLUMNS}
+    jogadores = []
+    indice_jogador = {}
+    pistas = []
+    vistas = set()
+    for row in rows:
+        if row['jogador_id'] is not None and row['jogador_id'] not in indice_jogador:
+            indice_jogador[row['jogador_id']] = len(jogadores)
+            jogadores.append({
+                'id': row['jogador_id'],
+                'nome': row['jogador_nome'],
+                'total_tacadas': row['total_tacadas'],
+                'posicao_final': row['posicao_final']
+            })
+        if row['pista_id'] is not None and row['pista_id'] not in vistas:
+            vistas.add(row['pista_id'])
+            pistas.append({
+                'id': row['pista_id'],
+                'numero_pista': row['numero_pista'],
+                'nome': row['pista_nome'],
+                'par': row['par']
+            })
+    
+    # As linhas vêm ordenadas por jogador; as pistas podem aparecer por outra ordem
+    pistas.sort(key=lambda pista: pista['numero_pista'])
+    indice_pista = {pista['id']: k for k, pista in enumerate(pistas)}
+    tacadas = [[0] * len(pistas) for _ in jogadores]
+    for row in rows:
+        if row['numero_tacadas'] is not None:
+            tacadas[indice_jogador[row['jogador_id']]][indice_pista[row['pista_id']]] = row['numero_tacadas']
     
+    cartao['jogadores'] = jogadores
+    cartao['pistas'] = pistas
+    cartao['tacadas'] = tacadas
+    return cartao
+
+def get_jogo_compacto(jogo_id):
+    """Detalhes de um jogo no formato compacto (ver carregar_cartao)"""
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
     
     try:
         cursor = connection.cursor()
-        query = """
-        INSERT INTO tacadas (jogo_id, jogador_id, pista_id, numero_tacadas, tempo_pista, observacoes)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        numero_tacadas = VALUES(numero_tacadas),
-        tempo_pista = VALUES(tempo_pista),
-        observacoes = VALUES(observacoes)
-        """
-        values = (
-            data['jogo_id'], data['jogador_id'], data['pista_id'], data['numero_tacadas'],
-            data.get('tempo_pista'), data.get('observacoes')
-        )
-        cursor.execute(query, values)
-        connection.commit()
-        
-        # Recalcular estatísticas do jogo
-        cursor.callproc('CalcularEstatisticasJogo', [data['jogo_id']])
-        connection.commit()
-        
-        return jsonify({'message': 'Tacada registrada com sucesso'}), 201
+        cartao = carregar_cartao(cursor, jogo_id)
+        if cartao is None:
+            return jsonify({'error': 'Jogo não encontrado'}), 404
+        response = jsonify(cartao)
+        response.headers['Vary'] = 'Accept'
+        return response
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -524,49 +2933,735 @@ def registrar_tacada():
             cursor.close()
             connection.close()
 
-# ==================== ESTATÍSTICAS ====================
-
-@app.route('/api/estatisticas/campos', methods=['GET'])
-def get_estatisticas_campos():
-    """Obter estatísticas dos campos"""
+@app.route('/api/jogos/<int:jogo_id>/pontuacao/verificar', methods=['GET'])
+def verificar_pontuacao_jogo(jogo_id):
+    """Comparar o motor de pontuação com CalcularEstatisticasJogo (sem gravar nada)"""
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
     
     try:
         cursor = connection.cursor()
-        cursor.execute("SELECT * FROM vw_estatisticas_campo")
-        stats = [dict_factory(cursor, row) for row in cursor.fetchall()]
-        return jsonify(stats)
+        connection.start_transaction()
+        divergencias = motor_pontuacao.verificar(cursor, jogo_id)
+        connection.rollback()
+        return jsonify({'jogo_id': jogo_id, 'ok': not divergencias, 'divergencias': divergencias})
     except Error as e:
+        connection.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
         if connection.is_connected():
             cursor.close()
             connection.close()
 
-@app.route('/api/estatisticas/jogadores', methods=['GET'])
-def get_ranking_jogadores():
-    """Obter ranking dos jogadores"""
+# ==================== RECÁLCULO DE ESTATÍSTICAS ====================
+
+# Funções (cursor, jogo_id, versao) chamadas depois de gravadas alterações em
+# jogo_participantes (totais/posições recalculados ou novo jogo)
+participantes_listeners = []
+
+def participantes_alterados(cursor, jogo_id):
+    """Incrementar a versão de jogo_participantes e avisar os listeners (após o commit)"""
+    versao = table_versions.bump('jogo_participantes')[0]
+    for listener in participantes_listeners:
+        try:
+            listener(cursor, jogo_id, versao)
+        except Error as e:
+            print(f"Erro ao propagar alterações do jogo {jogo_id}: {e}")
+
+class RecalculoEstatisticas:
+    """Fila de recálculo de estatísticas por jogo, executada numa thread de fundo.
+
+    Vários pedidos para o mesmo jogo dentro da janela `delay` resultam numa só
+    chamada a CalcularEstatisticasJogo. A fila em memória é local a cada worker;
+    quem grava tacadas marca também o jogo em recalculo_pendente na mesma
+    transação, e as leituras (flush/flush_all) aplicam tanto a fila local como
+    os jogos marcados na base de dados (por outro worker, ou por um que morreu).
+    No MySQL a tabela é criada por `flask migrar-bd`.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._pending = {}  # jogo_id -> instante em que deve ser recalculado
+        self._running = set()
+        self._thread = None
+        self._counters = {'agendados': 0, 'executados': 0, 'agregados': 0, 'flushes': 0,
+                          'pendentes_bd': 0, 'erros': 0}
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            self._reset()
+
+    def marcar(self, cursor, jogo_ids):
+        """Registar jogos por recalcular na transação de quem grava as tacadas"""
+        cursor.executemany("""
+        INSERT INTO recalculo_pendente (jogo_id) VALUES (%s)
+        ON DUPLICATE KEY UPDATE pedidos = pedidos + 1
+        """, [(int(jogo_id),) for jogo_id in jogo_ids])
+
+    def _pendentes_bd(self, jogo_id=None, jogador_id=None):
+        """Jogos marcados em recalculo_pendente (todos, só jogo_id ou só os de jogador_id)"""
+        connection = get_db_connection()
+        if not connection:
+            return set()
+        try:
+            cursor = connection.cursor()
+            if jogador_id is not None:
+                cursor.execute("""
+                SELECT rp.jogo_id FROM recalculo_pendente rp
+                JOIN jogo_participantes jp ON jp.jogo_id = rp.jogo_id
+                WHERE jp.jogador_id = %s
+                """, (jogador_id,))
+            elif jogo_id is None:
+                cursor.execute("SELECT jogo_id FROM recalculo_pendente")
+            else:
+                cursor.execute("SELECT jogo_id FROM recalculo_pendente WHERE jogo_id = %s", (jogo_id,))
+            return {row[0] for row in cursor.fetchall()}
+        except Error as e:
+            print(f"Erro ao ler recálculos pendentes: {e}")
+            return set()
+        finally:
+            if connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    def agendar(self, jogo_id):
+        """Pedir o recálculo das estatísticas de um jogo (já marcado com marcar())"""
+        jogo_id = int(jogo_id)
+        self._check_fork()
+        if self.delay <= 0:
+            with self._cond:
+                self._counters['agendados'] += 1
+            self._executar(jogo_id)
+            return
+        with self._cond:
+            self._counters['agendados'] += 1
+            if jogo_id in self._pending:
+                self._counters['agregados'] += 1
+            else:
+                self._pending[jogo_id] = time.monotonic() + self.delay
+                self._cond.notify_all()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='recalculo-estatisticas', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending:
+                        jogo_id, limite = min(self._pending.items(), key=lambda item: item[1])
+                        espera = limite - time.monotonic()
+                        if espera <= 0:
+                            del self._pending[jogo_id]
+                            self._running.add(jogo_id)
+                            break
+                        self._cond.wait(espera)
+                    else:
+                        self._cond.wait()
+            try:
+                self._executar(jogo_id)
+            finally:
+                with self._cond:
+                    self._running.discard(jogo_id)
+                    self._cond.notify_all()
+
+    def _executar(self, jogo_id):
+        connection = get_db_connection()
+        if not connection:
+            with self._cond:
+                self._counters['erros'] += 1
+            return
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT pedidos FROM recalculo_pendente WHERE jogo_id = %s", (jogo_id,))
+            row = cursor.fetchone()
+            pedidos = row[0] if row else None
+            if MOTOR_PONTUACAO_MODO == 'verify':
+                motor_pontuacao.verificar(cursor, jogo_id)
+            else:
+                cursor.callproc('CalcularEstatisticasJogo', [jogo_id])
+            if pedidos is not None:
+                # Se entretanto houve outro pedido (pedidos mudou) a marca fica
+                cursor.execute("DELETE FROM recalculo_pendente WHERE jogo_id = %s AND pedidos = %s",
+                               (jogo_id, pedidos))
+            connection.commit()
+            participantes_alterados(cursor, jogo_id)
+            with self._cond:
+                self._counters['executados'] += 1
+        except Error as e:
+            print(f"Erro ao recalcular estatísticas do jogo {jogo_id}: {e}")
+            with self._cond:
+                self._counters['erros'] += 1
+        finally:
+            if connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    def flush(self, jogo_id, marcado=None):
+        """Executar já o recálculo pendente de um jogo (e esperar pelo que está a correr).
+
+        Sem o jogo na fila local consulta recalculo_pendente, a não ser que
+        `marcado` já diga se lá está.
+        """
+        self._check_fork()
+        with self._cond:
+            while jogo_id in self._running:
+                self._cond.wait()
+            local = self._pending.pop(jogo_id, None) is not None
+            if local:
+                self._running.add(jogo_id)
+                self._counters['flushes'] += 1
+        if not local:
+            if not (self._pendentes_bd(jogo_id) if marcado is None else marcado):
+                return
+            with self._cond:
+                while jogo_id in self._running:
+                    self._cond.wait()
+                self._pending.pop(jogo_id, None)
+                self._running.add(jogo_id)
+                self._counters['flushes'] += 1
+                self._counters['pendentes_bd'] += 1
+        try:
+            self._executar(jogo_id)
+        finally:
+            with self._cond:
+                self._running.discard(jogo_id)
+                self._cond.notify_all()
+
+    def flush_locais(self):
+        """Executar os recálculos da fila deste worker, sem consultar recalculo_pendente (à saída)"""
+        if os.getpid() != self._pid:
+            return
+        with self._cond:
+            jogos = list(self._pending) + list(self._running)
+        for jogo_id in jogos:
+            self.flush(jogo_id, marcado=False)
+
+    def flush_all(self):
+        """Executar todos os recálculos pendentes, deste e dos outros workers (usado pelos rankings)"""
+        self._check_fork()
+        self.flush_locais()
+        for jogo_id in self._pendentes_bd():
+            self.flush(jogo_id, marcado=True)
+
+    def flush_jogador(self, jogador_id):
+        """Executar só os recálculos pendentes dos jogos de um jogador.
+
+        Quem agenda marca sempre o jogo em recalculo_pendente, por isso a consulta
+        cobre também a fila local.
+        """
+        self._check_fork()
+        for jogo_id in self._pendentes_bd(jogador_id=jogador_id):
+            self.flush(jogo_id, marcado=True)
+
+    def stats(self):
+        """Métricas da fila: profundidade e taxa de agregação"""
+        self._check_fork()
+        with self._cond:
+            counters = dict(self._counters)
+            counters['profundidade'] = len(self._pending)
+            counters['em_execucao'] = len(self._running)
+        executados = counters['executados']
+        counters['delay'] = self.delay
+        counters['taxa_agregacao'] = round(counters['agendados'] / executados, 3) if executados else None
+        return counters
+
+recalculo_estatisticas = RecalculoEstatisticas(float(os.getenv('STATS_RECOMPUTE_DELAY', 1.0)))
+# Só a fila local: um processo que não gravou nada (CLI, benchmarks) não se liga à base de dados
+atexit.register(recalculo_estatisticas.flush_locais)
+
+# ==================== MOTOR DE PONTUAÇÃO ====================
+
+# 'procedure': CalcularEstatisticasJogo (fila de recálculo)
+# 'python': motor incremental em memória, sem chamar o procedimento
+# 'verify': procedimento como referência, comparado com o motor a cada recálculo
+MOTOR_PONTUACAO_MODO = os.getenv('SCORING_ENGINE', 'procedure')
+
+class EstadoJogo:
+    """Tacadas de um jogo em arrays compactos: uma linha por jogador, uma coluna por pista"""
+
+    __slots__ = ('jogadores', 'indice_jogador', 'indice_pista', 'tacadas', 'totais', 'posicoes')
+
+    def __init__(self, jogadores, pistas):
+        self.jogadores = list(jogadores)
+        self.indice_jogador = {jogador_id: i for i, jogador_id in enumerate(self.jogadores)}
+        self.indice_pista = {pista_id: i for i, pista_id in enumerate(pistas)}
+        self.tacadas = [array('i', [0] * len(self.indice_pista)) for _ in self.jogadores]
+        self.totais = array('i', [0] * len(self.jogadores))
+        self.posicoes = array('i', [1] * len(self.jogadores))
+
+    def definir(self, jogador_id, pista_id, numero_tacadas):
+        """Atualizar uma célula e o total do jogador; devolve o índice do jogador (ou None)"""
+        i = self.indice_jogador.get(jogador_id)
+        if i is None:
+            return None
+        coluna = self.indice_pista.get(pista_id)
+        if coluna is None:
+            # Pista criada depois de o jogo ser carregado: acrescentar coluna
+            coluna = self.indice_pista[pista_id] = len(self.indice_pista)
+            for linha in self.tacadas:
+                linha.append(0)
+        self.totais[i] += numero_tacadas - self.tacadas[i][coluna]
+        self.tacadas[i][coluna] = numero_tacadas
+        return i
+
+    def valor(self, jogador_id, pista_id):
+        """Tacadas de um jogador numa pista (0 se não registadas)"""
+        i = self.indice_jogador.get(jogador_id)
+        coluna = self.indice_pista.get(pista_id)
+        if i is None or coluna is None:
+            return 0
+        return self.tacadas[i][coluna]
+
+    def classificar(self):
+        """Recalcular todas as posições (empates partilham a posição)"""
+        ordenados = sorted(self.totais)
+        primeira = {}
+        for posicao, total in enumerate(ordenados, 1):
+            primeira.setdefault(total, posicao)
+        for i, total in enumerate(self.totais):
+            self.posicoes[i] = primeira[total]
+
+    def reclassificar(self, i, total_antigo):
+        """Atualizar posições em O(jogadores) depois de mudar apenas o total do jogador i"""
+        total_novo = self.totais[i]
+        melhores = 0
+        for k, total in enumerate(self.totais):
+            if k == i:
+                continue
+            if total < total_novo:
+                melhores += 1
+            self.posicoes[k] += (total_novo < total) - (total_antigo < total)
+        self.posicoes[i] = melhores + 1
+
+class MotorPontuacao:
+    """Totais e classificações por jogo mantidos em memória e atualizados tacada a tacada.
+
+    Cada atualização bloqueia as linhas de jogo_participantes do jogo (FOR UPDATE),
+    valida o estado em cache contra os totais gravados (recarregando-o se outro
+    worker alterou o jogo) e grava apenas as linhas cujo total ou posição mudou.
+    """
+
+    def __init__(self, max_jogos=512):
+        self.max_jogos = max_jogos
+        self._lock = threading.Lock()
+        self._jogos = OrderedDict()
+        self._counters = {'atualizacoes': 0, 'recargas': 0, 'linhas_gravadas': 0,
+                          'verificacoes': 0, 'divergencias': 0}
+
+    def _contar(self, nome, valor=1):
+        with self._lock:
+            self._counters[nome] += valor
+
+    def _guardar(self, jogo_id, estado):
+        with self._lock:
+            self._jogos[jogo_id] = estado
+            self._jogos.move_to_end(jogo_id)
+            while len(self._jogos) > self.max_jogos:
+                self._jogos.popitem(last=False)
+
+    def invalidar(self, jogo_id):
+        with self._lock:
+            self._jogos.pop(jogo_id, None)
+
+    def carregar(self, cursor, jogo_id):
+        """Construir o estado de um jogo a partir das tacadas gravadas"""
+        cursor.execute("""
+        SELECT jogador_id FROM jogo_participantes
+        WHERE jogo_id = %s
+        ORDER BY ordem_jogador
+        """, (jogo_id,))
+        jogadores = [row[0] for row in cursor.fetchall()]
+        cursor.execute("""
+        SELECT p.id FROM pistas p
+        JOIN jogos j ON p.campo_id = j.campo_id
+        WHERE j.id = %s
+        ORDER BY p.numero_pista
+        """, (jogo_id,))
+        estado = EstadoJogo(jogadores, [row[0] for row in cursor.fetchall()])
+        cursor.execute("""
+        SELECT jogador_id, pista_id, numero_tacadas FROM tacadas
+        WHERE jogo_id = %s
+        """, (jogo_id,))
+        for jogador_id, pista_id, numero_tacadas in cursor.fetchall():
+            estado.definir(jogador_id, pista_id, numero_tacadas or 0)
+        estado.classificar()
+        self._contar('recargas')
+        return estado
+
+    def registrar(self, cursor, jogo_id, celulas, gravar):
+        """Gravar tacadas de um jogo e atualizar os participantes afetados.
+
+        `celulas` são os pares (jogador_id, pista_id) que `gravar()` pode alterar;
+        `gravar()` executa o INSERT e devolve as tacadas efetivamente aplicadas
+        como (jogador_id, pista_id, numero_tacadas). Deve correr numa transação.
+        """
+        jogo_id = int(jogo_id)
+        cursor.execute("""
+        SELECT jogador_id, total_tacadas, posicao_final FROM jogo_participantes
+        WHERE jogo_id = %s
+        FOR UPDATE
+        """, (jogo_id,))
+        gravados = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+        with self._lock:
+            estado = self._jogos.get(jogo_id)
+        if estado is None or any(
+            gravados.get(jogador_id, (None,))[0] != estado.totais[i]
+            for i, jogador_id in enumerate(estado.jogadores)
+        ) or len(gravados) != len(estado.jogadores):
+            estado = self.carregar(cursor, jogo_id)
+
+        # O cache só é válido se as células a alterar coincidirem com a base de dados
+        celulas = [(int(jogador_id), int(pista_id)) for jogador_id, pista_id in celulas]
+        pistas = sorted({pista_id for _, pista_id in celulas})
+        if pistas:
+            cursor.execute(f"""
+            SELECT jogador_id, pista_id, numero_tacadas FROM tacadas
+            WHERE jogo_id = %s AND pista_id IN ({", ".join(["%s"] * len(pistas))})
+            """, [jogo_id] + pistas)
+            antigos = {(row[0], row[1]): row[2] or 0 for row in cursor.fetchall()}
+            if any(estado.valor(jogador_id, pista_id) != antigos.get((jogador_id, pista_id), 0)
+                   for jogador_id, pista_id in celulas):
+                estado = self.carregar(cursor, jogo_id)
+
+        try:
+            alterados = []
+            for jogador_id, pista_id, numero_tacadas in gravar():
+                i = estado.indice_jogador.get(int(jogador_id))
+                if i is None:
+                    continue
+                total_antigo = estado.totais[i]
+                estado.definir(int(jogador_id), int(pista_id), int(numero_tacadas or 0))
+                alterados.append((i, total_antigo))
+            if len(alterados) == 1:
+                estado.reclassificar(*alterados[0])
+            elif alterados:
+                estado.classificar()
+
+            linhas = [
+                (estado.totais[i], estado.posicoes[i], jogo_id, jogador_id)
+                for i, jogador_id in enumerate(estado.jogadores)
+                if gravados.get(jogador_id) != (estado.totais[i], estado.posicoes[i])
+            ]
+            if linhas:
+                cursor.executemany("""
+                UPDATE jogo_participantes SET total_tacadas = %s, posicao_final = %s
+                WHERE jogo_id = %s AND jogador_id = %s
+                """, linhas)
+        except Exception:
+            self.invalidar(jogo_id)
+            raise
+
+        self._guardar(jogo_id, estado)
+        self._contar('atualizacoes')
+        self._contar('linhas_gravadas', len(linhas))
+        return linhas
+
+    def verificar(self, cursor, jogo_id):
+        """Comparar o motor com CalcularEstatisticasJogo sobre os mesmos dados.
+
+        Executa o procedimento no cursor dado (quem chama decide commit ou rollback)
+        e devolve a lista de divergências por jogador.
+        """
+        jogo_id = int(jogo_id)
+        estado = self.carregar(cursor, jogo_id)
+        cursor.callproc('CalcularEstatisticasJogo', [jogo_id])
+        for resultado in cursor.stored_results():
+            resultado.fetchall()
+        cursor.execute("""
+        SELECT jogador_id, total_tacadas, posicao_final FROM jogo_participantes
+        WHERE jogo_id = %s
+        """, (jogo_id,))
+        procedimento = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+        divergencias = []
+        for i, jogador_id in enumerate(estado.jogadores):
+            esperado = procedimento.get(jogador_id)
+            obtido = (estado.totais[i], estado.posicoes[i])
+            if esperado is None or (esperado[0] or 0, esperado[1]) != obtido:
+                divergencias.append({
+                    'jogador_id': jogador_id,
+                    'procedimento': {'total_tacadas': esperado and esperado[0], 'posicao_final': esperado and esperado[1]},
+                    'motor': {'total_tacadas': obtido[0], 'posicao_final': obtido[1]}
+                })
+        self._contar('verificacoes')
+        if divergencias:
+            self._contar('divergencias', len(divergencias))
+            print(f"Motor de pontuação diverge do procedimento no jogo {jogo_id}: {divergencias}")
+        else:
+            self._guardar(jogo_id, estado)
+        return divergencias
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters['jogos_em_cache'] = len(self._jogos)
+        counters['modo'] = MOTOR_PONTUACAO_MODO
+        return counters
+
+motor_pontuacao = MotorPontuacao(int(os.getenv('SCORING_ENGINE_CACHE', 512)))
+
+# ==================== TEMPO REAL (SSE) ====================
+
+class Subscription:
+    """Subscrição de um canal com buffer limitado (os eventos mais antigos são descartados)"""
+
+    def __init__(self, channel, maxsize):
+        self.channel = channel
+        self.maxsize = maxsize
+        self._events = deque()
+        self._cond = threading.Condition()
+        self._dropped = 0
+
+    def put(self, message):
+        with self._cond:
+            if len(self._events) >= self.maxsize:
+                self._events.popleft()
+                self._dropped += 1
+            self._events.append(message)
+            self._cond.notify()
+
+    def get(self, timeout):
+        """Esperar por eventos; devolve (eventos, descartados desde a última leitura)"""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            dropped, self._dropped = self._dropped, 0
+        return events, dropped
+
+class UnixSocketBroker:
+    """Distribui mensagens pelos workers do mesmo host com sockets Unix de datagramas.
+
+    Cada worker cria <diretório>/<pid>.sock e uma thread que entrega localmente o
+    que recebe; publicar envia o datagrama para os sockets dos outros workers.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._pid = None
+        self._path = None
+        self.dropped = 0
+
+    def start(self, deliver):
+        if self._pid == os.getpid():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._path = os.path.join(self.directory, f'{os.getpid()}.sock')
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        self._recv = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._recv.bind(self._path)
+        self._send = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._send.setblocking(False)
+        self._pid = os.getpid()
+        atexit.register(self._cleanup, self._path)
+
+        def receive():
+            while True:
+                try:
+                    deliver(json.loads(self._recv.recv(262144)))
+                except (OSError, ValueError) as e:
+                    print(f"Erro ao receber mensagem de outro worker: {e}")
+
+        threading.Thread(target=receive, name='pubsub-broker', daemon=True).start()
+
+    @staticmethod
+    def _cleanup(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def publish(self, message):
+        payload = json.dumps(message, default=serialize_data).encode('utf-8')
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith('.sock') or path == self._path:
+                continue
+            try:
+                self._send.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker que já terminou
+                self._cleanup(path)
+            except BlockingIOError:
+                self.dropped += 1
+            except OSError as e:
+                # Ex.: EMSGSIZE (mensagem maior que o limite de datagramas do sistema)
+                self.dropped += 1
+                print(f"Erro ao enviar mensagem para outro worker: {e}")
+
+class PubSub:
+    """Publicação/subscrição em memória por canal, com broker opcional entre workers"""
+
+    def __init__(self, broker=None, buffer_size=64, max_subscribers=500):
+        self.broker = broker
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._subscribers = 0
+        self._counters = {'publicados': 0, 'entregues': 0, 'recusados': 0}
+
+    def _ensure_broker(self):
+        if self.broker is not None:
+            self.broker.start(self._deliver)
+
+    def subscribe(self, channel):
+        """Nova subscrição, ou None se o worker já tiver max_subscribers"""
+        self._ensure_broker()
+        with self._lock:
+            if self._subscribers >= self.max_subscribers:
+                self._counters['recusados'] += 1
+                return None
+            subscription = Subscription(channel, self.buffer_size)
+            self._channels.setdefault(channel, set()).add(subscription)
+            self._subscribers += 1
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._subscribers -= 1
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def active(self, channel):
+        """Se vale a pena publicar (há subscritores locais ou um broker entre workers)"""
+        return self.broker is not None or channel in self._channels
+
+    def publish(self, channel, event, data):
+        message = {'channel': channel, 'event': event, 'data': data}
+        with self._lock:
+            self._counters['publicados'] += 1
+        self._deliver(message)
+        if self.broker is not None:
+            self._ensure_broker()
+            self.broker.publish(message)
+
+    def _deliver(self, message):
+        with self._lock:
+            subscribers = list(self._channels.get(message['channel'], ()))
+            self._counters['entregues'] += len(subscribers)
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['subscritores'] = self._subscribers
+            stats['canais'] = len(self._channels)
+        stats['broker'] = type(self.broker).__name__ if self.broker else None
+        return stats
+
+SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', 15))
+
+pubsub = PubSub(
+    UnixSocketBroker(os.getenv('PUBSUB_SOCKET_DIR')) if os.getenv('PUBSUB_SOCKET_DIR') else None,
+    buffer_size=int(os.getenv('SSE_BUFFER_SIZE', 64)),
+    max_subscribers=int(os.getenv('SSE_MAX_SUBSCRIBERS', 500))
+)
+
+def publicar_classificacao(cursor, jogo_id, versao):
+    """Publicar totais e posições de um jogo depois de recalculados (listener)"""
+    canal = f'jogo:{int(jogo_id)}'
+    if not pubsub.active(canal):
+        return
+    cursor.execute("""
+    SELECT jogador_id, total_tacadas, posicao_final FROM jogo_participantes
+    WHERE jogo_id = %s
+    ORDER BY ordem_jogador
+    """, (jogo_id,))
+    pubsub.publish(canal, 'classificacao', fetchall_dicts(cursor))
+
+participantes_listeners.append(publicar_classificacao)
+
+def publicar_tacadas(jogo_id, tacadas):
+    """Publicar tacadas gravadas de um jogo: lista de (jogador_id, pista_id, numero_tacadas)"""
+    canal = f'jogo:{int(jogo_id)}'
+    if not pubsub.active(canal):
+        return
+    pubsub.publish(canal, 'tacadas', [
+        {'jogador_id': int(jogador_id), 'pista_id': int(pista_id), 'numero_tacadas': numero_tacadas}
+        for jogador_id, pista_id, numero_tacadas in tacadas
+    ])
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {app.json.dumps(data, separators=(',', ':'))}\n\n"
+
+@app.route('/api/jogos/<int:jogo_id>/stream', methods=['GET'])
+def stream_jogo(jogo_id):
+    """Server-Sent Events com as tacadas e a classificação de um jogo em tempo real"""
+    subscription = pubsub.subscribe(f'jogo:{jogo_id}')
+    if subscription is None:
+        return jsonify({'error': 'Demasiados espectadores neste servidor'}), 503
+    
+    # Subscrever antes de ler o cartão para não perder eventos entretanto publicados
+    recalculo_estatisticas.flush(jogo_id)
     connection = get_db_connection()
     if not connection:
+        pubsub.unsubscribe(subscription)
         return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
-    
     try:
         cursor = connection.cursor()
-        cursor.execute("SELECT * FROM vw_ranking_jogadores LIMIT 20")
-        ranking = [dict_factory(cursor, row) for row in cursor.fetchall()]
-        return jsonify(ranking)
+        cartao = carregar_cartao(cursor, jogo_id)
     except Error as e:
+        pubsub.unsubscribe(subscription)
         return jsonify({'error': str(e)}), 500
     finally:
         if connection.is_connected():
             cursor.close()
             connection.close()
+    if cartao is None:
+        pubsub.unsubscribe(subscription)
+        return jsonify({'error': 'Jogo não encontrado'}), 404
+    
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            yield _sse('cartao', cartao)
+            while True:
+                events, dropped = subscription.get(SSE_HEARTBEAT)
+                if dropped:
+                    # Buffer cheio (cliente lento): pedir ao cliente que recarregue o cartão
+                    yield _sse('reset', {'descartados': dropped})
+                    continue
+                if not events:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield ''.join(_sse(message['event'], message['data']) for message in events)
+        finally:
+            pubsub.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
-@app.route('/api/estatisticas/jogador/<int:jogador_id>', methods=['GET'])
-def get_estatisticas_jogador(jogador_id):
-    """Obter estatísticas de um jogador específico"""
+# ==================== TACADAS ====================
+
+@app.route('/api/tacadas', methods=['POST'])
+def registrar_tacada():
+    """Registrar tacada de um jogador numa pista"""
+    data = request.get_json()
+    required_fields = ['jogo_id', 'jogador_id', 'pista_id', 'numero_tacadas']
+    
+    if not data or not all(field in data for field in required_fields):
+        return jsonify({'error': 'jogo_id, jogador_id, pista_id e numero_tacadas são obrigatórios'}), 400
+    
+    try:
+        data = dict(data, **{campo: _inteiro(data[campo], campo, obrigatorio=True) for campo in required_fields})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
@@ -574,27 +3669,1263 @@ def get_estatisticas_jogador(jogador_id):
     try:
         cursor = connection.cursor()
         query = """
-        SELECT 
-            j.nome,
-            COUNT(DISTINCT jp.jogo_id) as total_jogos,
-            AVG(jp.total_tacadas) as media_tacadas,
-            MIN(jp.total_tacadas) as melhor_score,
-            MAX(jp.total_tacadas) as pior_score,
-            COUNT(CASE WHEN jp.posicao_final = 1 THEN 1 END) as vitorias,
-            MAX(jg.data_jogo) as ultimo_jogo
-        FROM jogadores j
-        LEFT JOIN jogo_participantes jp ON j.id = jp.jogador_id
-        LEFT JOIN jogos jg ON jp.jogo_id = jg.id
-        WHERE j.id = %s
-        GROUP BY j.id, j.nome
-        """
-        cursor.execute(query, (jogador_id,))
-        stats = cursor.fetchone()
+        INSERT INTO tacadas (jogo_id, jogador_id, pista_id, numero_tacadas, tempo_pista, observacoes)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+        numero_tacadas = VALUES(numero_tacadas),
+        tempo_pista = VALUES(tempo_pista),
+        observacoes = VALUES(observacoes)
+        """
+        values = (
+            data['jogo_id'], data['jogador_id'], data['pista_id'], data['numero_tacadas'],
+            data.get('tempo_pista'), data.get('observacoes')
+        )
+        if MOTOR_PONTUACAO_MODO == 'python':
+            # Totais e posições atualizados pelo motor na mesma transação
+            def gravar():
+                cursor.execute(query, values)
+                return [values[1:4]]
+            
+            connection.start_transaction()
+            corrigida = corrige_tacadas(cursor, [values])
+            motor_pontuacao.registrar(cursor, data['jogo_id'], [(data['jogador_id'], data['pista_id'])], gravar)
+            connection.commit()
+            tacadas_gravadas(corrigida)
+            publicar_tacadas(data['jogo_id'], [values[1:4]])
+            participantes_alterados(cursor, data['jogo_id'])
+        else:
+            corrigida = corrige_tacadas(cursor, [values])
+            cursor.execute(query, values)
+            recalculo_estatisticas.marcar(cursor, [data['jogo_id']])
+            connection.commit()
+            tacadas_gravadas(corrigida)
+            publicar_tacadas(data['jogo_id'], [values[1:4]])
+            
+            # Recalcular estatísticas do jogo (agregado em segundo plano)
+            recalculo_estatisticas.agendar(data['jogo_id'])
+        
+        return jsonify({'message': 'Tacada registrada com sucesso'}), 201
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+TACADAS_BATCH_MAX = int(os.getenv('TACADAS_BATCH_MAX', 2000))
+TACADAS_BATCH_CHUNK = 500
+
+def _upsert_tacadas_sql(num_linhas):
+    """INSERT multi-linha de tacadas com ON DUPLICATE KEY UPDATE"""
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * num_linhas)
+    return f"""
+    INSERT INTO tacadas (jogo_id, jogador_id, pista_id, numero_tacadas, tempo_pista, observacoes)
+    VALUES {placeholders}
+    ON DUPLICATE KEY UPDATE
+    numero_tacadas = VALUES(numero_tacadas),
+    tempo_pista = VALUES(tempo_pista),
+    observacoes = VALUES(observacoes)
+    """
+
+def corrige_tacadas(cursor, linhas):
+    """Se alguma linha (jogo_id, jogador_id, pista_id, numero_tacadas, ...) muda o valor de uma tacada já gravada"""
+    jogos = sorted({values[0] for values in linhas})
+    placeholders = ', '.join(['%s'] * len(jogos))
+    cursor.execute(f"""
+    SELECT jogo_id, jogador_id, pista_id, numero_tacadas FROM tacadas WHERE jogo_id IN ({placeholders})
+    """, jogos)
+    gravadas = {tuple(row[:3]): row[3] for row in cursor.fetchall()}
+    return any(gravadas.get(tuple(values[:3]), values[3]) != values[3] for values in linhas)
+
+def tacadas_gravadas(corrigida=False):
+    """Invalidar o que depende de tacadas depois do commit (com corrigida, também os histogramas por pista)"""
+    if corrigida:
+        table_versions.bump('tacadas', 'tacadas_corrigidas')
+    else:
+        table_versions.bump('tacadas')
+
+def _gravar_tacadas(cursor, linhas, resultados):
+    """Gravar tacadas em blocos multi-linha; devolve as linhas aplicadas com sucesso"""
+    todas_aplicadas = []
+    for inicio in range(0, len(linhas), TACADAS_BATCH_CHUNK):
+        bloco = linhas[inicio:inicio + TACADAS_BATCH_CHUNK]
+        cursor.execute("SAVEPOINT lote_tacadas")
+        try:
+            cursor.execute(_upsert_tacadas_sql(len(bloco)),
+                           [valor for _, values in bloco for valor in values])
+            aplicadas = bloco
+        except Error:
+            # Uma linha inválida (ex.: chave estrangeira) falha o bloco inteiro:
+            # repetir linha a linha para identificar quais falharam
+            cursor.execute("ROLLBACK TO SAVEPOINT lote_tacadas")
+            aplicadas = []
+            for i, values in bloco:
+                try:
+                    cursor.execute("SAVEPOINT tacada")
+                    cursor.execute(_upsert_tacadas_sql(1), values)
+                    aplicadas.append((i, values))
+                except Error as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT tacada")
+                    resultados[i] = {'index': i, 'status': 'error', 'error': str(e)}
+        for i, values in aplicadas:
+            resultados[i] = {'index': i, 'status': 'ok', 'jogo_id': values[0]}
+        todas_aplicadas.extend(aplicadas)
+    return todas_aplicadas
+
+@app.route('/api/tacadas/batch', methods=['POST'])
+def registrar_tacadas_batch():
+    """Registrar várias tacadas (de um ou mais jogos) numa só transação"""
+    data = request.get_json()
+    tacadas = data.get('tacadas') if isinstance(data, dict) else data
+    required_fields = ['jogo_id', 'jogador_id', 'pista_id', 'numero_tacadas']
+
+    if not isinstance(tacadas, list) or len(tacadas) == 0:
+        return jsonify({'error': 'Lista de tacadas é obrigatória'}), 400
+    if len(tacadas) > TACADAS_BATCH_MAX:
+        return jsonify({'error': f'Máximo de {TACADAS_BATCH_MAX} tacadas por pedido'}), 400
+
+    resultados = [None] * len(tacadas)
+    validas = []  # (índice, valores)
+    for i, tacada in enumerate(tacadas):
+        if not isinstance(tacada, dict) or not all(field in tacada for field in required_fields):
+            resultados[i] = {'index': i, 'status': 'error',
+                             'error': 'jogo_id, jogador_id, pista_id e numero_tacadas são obrigatórios'}
+            continue
+        try:
+            ids = [_inteiro(tacada[campo], campo, obrigatorio=True) for campo in required_fields]
+        except ValueError as e:
+            resultados[i] = {'index': i, 'status': 'error', 'error': str(e)}
+            continue
+        validas.append((i, (*ids, tacada.get('tempo_pista'), tacada.get('observacoes'))))
+
+    if not validas:
+        return jsonify({'results': resultados, 'registradas': 0, 'erros': len(tacadas)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+
+    try:
+        cursor = connection.cursor()
+        connection.start_transaction()
+        corrigida = corrige_tacadas(cursor, [values for _, values in validas])
+
+        grupos = OrderedDict()
+        for i, values in validas:
+            grupos.setdefault(values[0], []).append((i, values))
+        
+        if MOTOR_PONTUACAO_MODO == 'python':
+            for jogo_id, linhas in grupos.items():
+                def gravar(linhas=linhas):
+                    return [values[1:4] for _, values in _gravar_tacadas(cursor, linhas, resultados)]
+                motor_pontuacao.registrar(cursor, jogo_id, [values[1:3] for _, values in linhas], gravar)
+        else:
+            _gravar_tacadas(cursor, validas, resultados)
+            recalculo_estatisticas.marcar(cursor, {resultado['jogo_id'] for resultado in resultados
+                                                   if resultado['status'] == 'ok'})
+        connection.commit()
+        tacadas_gravadas(corrigida)
+        
+        for jogo_id, linhas in grupos.items():
+            publicar_tacadas(jogo_id, [values[1:4] for i, values in linhas if resultados[i]['status'] == 'ok'])
+            if MOTOR_PONTUACAO_MODO == 'python':
+                participantes_alterados(cursor, jogo_id)
+
+        # Recalcular estatísticas uma única vez por jogo afetado
+        jogos_afetados = []
+        for resultado in resultados:
+            if resultado['status'] == 'ok' and resultado['jogo_id'] not in jogos_afetados:
+                jogos_afetados.append(resultado['jogo_id'])
+        if MOTOR_PONTUACAO_MODO != 'python':
+            for jogo_id in jogos_afetados:
+                recalculo_estatisticas.agendar(jogo_id)
+
+        erros = sum(1 for r in resultados if r['status'] == 'error')
+        return jsonify({
+            'results': resultados,
+            'registradas': len(resultados) - erros,
+            'erros': erros,
+            'jogos_recalculados': jogos_afetados
+        })
+    except Error as e:
+        connection.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def versao_cartao(celulas):
+    """Versão de um cartão: soma de verificação das células (jogador, pista) -> tacadas"""
+    texto = ';'.join(f'{jogador_id}:{pista_id}:{numero}' for (jogador_id, pista_id), numero in sorted(celulas.items()))
+    return zlib.crc32(texto.encode('ascii'))
+
+@app.route('/api/jogos/<int:jogo_id>/sync', methods=['POST'])
+def sincronizar_jogo(jogo_id):
+    """Sincronizar o cartão de um cliente (offline) com o servidor.
+
+    O cliente envia {"versao": <versão do último sync ou null>, "tacadas": [...]}
+    (o cartão completo ou só as células alteradas). Só as células diferentes das
+    gravadas são escritas, numa transação; a resposta traz a nova versão e as
+    células do servidor que o cliente não tem. Uma célula pode trazer "anterior"
+    (o valor no último sync): se o servidor entretanto mudou esse valor, a célula
+    é reportada em "conflitos" (prevalece o valor do cliente).
+    """
+    data = request.get_json()
+    if not isinstance(data, dict) or not isinstance(data.get('tacadas'), list):
+        return jsonify({'error': 'Lista de tacadas é obrigatória'}), 400
+    if len(data['tacadas']) > TACADAS_BATCH_MAX:
+        return jsonify({'error': f'Máximo de {TACADAS_BATCH_MAX} tacadas por pedido'}), 400
+    versao_cliente = data.get('versao')
+    
+    cliente = {}
+    erros = []
+    for i, tacada in enumerate(data['tacadas']):
+        try:
+            celula = (int(tacada['jogador_id']), int(tacada['pista_id']))
+            numero = int(tacada['numero_tacadas'])
+            anterior = int(tacada['anterior']) if tacada.get('anterior') is not None else None
+        except (TypeError, KeyError, ValueError):
+            erros.append({'index': i, 'error': 'jogador_id, pista_id e numero_tacadas são obrigatórios'})
+            continue
+        # 0 = pista ainda não jogada no cliente: nunca apaga o valor do servidor
+        if numero > 0:
+            cliente[celula] = (i, numero, anterior, tacada.get('tempo_pista'), tacada.get('observacoes'))
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        cursor = connection.cursor()
+        connection.start_transaction()
+        # Bloquear o jogo: syncs concorrentes do mesmo jogo são serializados
+        cursor.execute("""
+        SELECT jogador_id FROM jogo_participantes WHERE jogo_id = %s FOR UPDATE
+        """, (jogo_id,))
+        participantes = {row[0] for row in cursor.fetchall()}
+        if not participantes:
+            connection.rollback()
+            return jsonify({'error': 'Jogo não encontrado'}), 404
+        cursor.execute("""
+        SELECT jogador_id, pista_id, numero_tacadas FROM tacadas WHERE jogo_id = %s
+        """, (jogo_id,))
+        servidor = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+        versao_servidor = versao_cartao(servidor)
+        
+        linhas = []
+        conflitos = []
+        inalteradas = 0
+        for (jogador_id, pista_id), (i, numero, anterior, tempo_pista, observacoes) in cliente.items():
+            if jogador_id not in participantes:
+                erros.append({'index': i, 'error': 'Jogador não participa neste jogo'})
+                continue
+            atual = servidor.get((jogador_id, pista_id))
+            if atual == numero:
+                inalteradas += 1
+                continue
+            if anterior is not None and versao_cliente != versao_servidor and (atual or 0) != anterior:
+                conflitos.append({'jogador_id': jogador_id, 'pista_id': pista_id,
+                                  'servidor': atual, 'cliente': numero})
+            linhas.append((i, (jogo_id, jogador_id, pista_id, numero, tempo_pista, observacoes)))
+        
+        resultados = {}
+        aplicadas = []
+        if linhas:
+            def gravar():
+                aplicadas.extend(values[1:4] for _, values in _gravar_tacadas(cursor, linhas, resultados))
+                return aplicadas
+            if MOTOR_PONTUACAO_MODO == 'python':
+                motor_pontuacao.registrar(cursor, jogo_id, [values[1:3] for _, values in linhas], gravar)
+            elif gravar():
+                recalculo_estatisticas.marcar(cursor, [jogo_id])
+            erros.extend(r for r in resultados.values() if r['status'] == 'error')
+            connection.commit()
+        else:
+            connection.rollback()
+        
+        # Células que já tinham valor no servidor foram corrigidas
+        corrigida = any((jogador_id, pista_id) in servidor for jogador_id, pista_id, _ in aplicadas)
+        for jogador_id, pista_id, numero in aplicadas:
+            servidor[(jogador_id, pista_id)] = numero
+        if aplicadas:
+            tacadas_gravadas(corrigida)
+            publicar_tacadas(jogo_id, aplicadas)
+            if MOTOR_PONTUACAO_MODO == 'python':
+                participantes_alterados(cursor, jogo_id)
+            else:
+                recalculo_estatisticas.agendar(jogo_id)
+        
+        # Delta: células do servidor que o cliente não enviou ou tem com outro valor
+        if versao_cliente is not None and versao_cliente == versao_servidor:
+            delta = []
+        else:
+            delta = [
+                {'jogador_id': jogador_id, 'pista_id': pista_id, 'numero_tacadas': numero}
+                for (jogador_id, pista_id), numero in sorted(servidor.items())
+                if cliente.get((jogador_id, pista_id), (None, None))[1] != numero
+            ]
+        
+        return jsonify({
+            'versao': versao_cartao(servidor),
+            'aplicadas': len(aplicadas),
+            'inalteradas': inalteradas,
+            'conflitos': conflitos,
+            'erros': erros,
+            'delta': delta
+        })
+    except Error as e:
+        connection.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+# ==================== RANKING ====================
+
+# 'view': vw_ranking_jogadores; 'memory': RankingJogadores mantido em memória
+RANKING_SOURCE = os.getenv('RANKING_SOURCE', 'view')
+
+class _SkipNode:
+    __slots__ = ('key', 'value', 'next', 'width')
+
+    def __init__(self, key, value, level):
+        self.key = key
+        self.value = value
+        self.next = [None] * level
+        self.width = [1] * level
+
+class IndexableSkipList:
+    """Lista ordenada por chave com inserção, remoção, posição e acesso por índice em O(log n)"""
+
+    MAX_LEVEL = 24
+
+    def __init__(self):
+        self._head = _SkipNode(None, None, self.MAX_LEVEL)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _chain(self, key):
+        """Último nó com chave < key em cada nível e a sua posição (1-based; 0 = cabeça)"""
+        chain = [None] * self.MAX_LEVEL
+        steps = [0] * self.MAX_LEVEL
+        node = self._head
+        position = 0
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            steps[level] = position
+        return chain, steps
+
+    def insert(self, key, value):
+        chain, steps = self._chain(key)
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        new = _SkipNode(key, value, level)
+        position = steps[0]
+        for lvl in range(level):
+            prev = chain[lvl]
+            distance = position - steps[lvl]
+            new.next[lvl] = prev.next[lvl]
+            new.width[lvl] = prev.width[lvl] - distance
+            prev.next[lvl] = new
+            prev.width[lvl] = distance + 1
+        for lvl in range(level, self.MAX_LEVEL):
+            chain[lvl].width[lvl] += 1
+        self._size += 1
+
+    def remove(self, key):
+        chain, _ = self._chain(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for lvl in range(len(target.next)):
+            prev = chain[lvl]
+            prev.width[lvl] += target.width[lvl] - 1
+            prev.next[lvl] = target.next[lvl]
+        for lvl in range(len(target.next), self.MAX_LEVEL):
+            chain[lvl].width[lvl] -= 1
+        self._size -= 1
+
+    def index(self, key):
+        """Posição (0-based) de uma chave existente"""
+        chain, steps = self._chain(key)
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        return steps[0]
+
+    def _node_at(self, index):
+        remaining = index + 1
+        node = self._head
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def slice(self, start, stop):
+        """Valores nas posições [start, stop)"""
+        start = max(0, start)
+        stop = min(stop, self._size)
+        if start >= stop:
+            return []
+        node = self._node_at(start)
+        values = []
+        for _ in range(stop - start):
+            values.append(node.value)
+            node = node.next[0]
+        return values
+
+class RankingJogadores:
+    """Ranking de jogadores mantido em memória e atualizado jogo a jogo.
+
+    Construído com uma agregação de jogo_participantes; depois de cada recálculo
+    só os participantes do jogo são reagregados. As alterações de outro worker
+    só mudam a versão com CACHE_SHARED_FILE (o ranking é então reconstruído na
+    leitura); sem ele aparecem apenas ao fim de max_age segundos.
+    """
+
+    QUERY = """
+    SELECT j.id, j.nome,
+           COUNT(DISTINCT jp.jogo_id) as total_jogos,
+           AVG(jp.total_tacadas) as media_tacadas,
+           MIN(jp.total_tacadas) as melhor_score,
+           COUNT(CASE WHEN jp.posicao_final = 1 THEN 1 END) as vitorias
+    FROM jogadores j
+    JOIN jogo_participantes jp ON j.id = jp.jogador_id
+    WHERE jp.total_tacadas IS NOT NULL
+    """
+
+    def __init__(self, max_age=300.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._lista = IndexableSkipList()
+        self._chaves = {}  # jogador_id -> chave na lista
+        self._versao = None
+        self._construido_em = 0.0
+        self._counters = {'reconstrucoes': 0, 'atualizacoes': 0}
+
+    @staticmethod
+    def _entrada(row):
+        jogador_id, nome, total_jogos, media, melhor, vitorias = row
+        media = float(media)
+        entrada = {
+            'id': jogador_id,
+            'nome': nome,
+            'total_jogos': total_jogos,
+            'media_tacadas': media,
+            'melhor_score': melhor,
+            'vitorias': vitorias
+        }
+        # Menor média primeiro; em empate, mais jogos; depois id
+        return (media, -total_jogos, jogador_id), entrada
+
+    def reconstruir(self, cursor):
+        """Construir o ranking completo a partir de jogo_participantes"""
+        versao = table_versions.get('jogo_participantes')[0]
+        cursor.execute(self.QUERY + " GROUP BY j.id, j.nome")
+        lista = IndexableSkipList()
+        chaves = {}
+        for row in cursor.fetchall():
+            chave, entrada = self._entrada(row)
+            lista.insert(chave, entrada)
+            chaves[entrada['id']] = chave
+        with self._lock:
+            self._lista = lista
+            self._chaves = chaves
+            self._versao = versao
+            self._construido_em = time.monotonic()
+            self._counters['reconstrucoes'] += 1
+
+    def atualizar(self, cursor, jogo_id, versao):
+        """Reagregar os participantes de um jogo (listener de participantes_alterados)"""
+        with self._lock:
+            if self._versao is None or self._versao != versao - 1:
+                # Houve alterações que este processo não viu: reconstruir na próxima leitura
+                self._versao = None
+                return
+        cursor.execute(self.QUERY + """
+        AND j.id IN (SELECT jogador_id FROM jogo_participantes WHERE jogo_id = %s)
+        GROUP BY j.id, j.nome
+        """, (jogo_id,))
+        rows = cursor.fetchall()
+        with self._lock:
+            if self._versao != versao - 1:
+                self._versao = None
+                return
+            for row in rows:
+                chave, entrada = self._entrada(row)
+                antiga = self._chaves.get(entrada['id'])
+                if antiga is not None:
+                    self._lista.remove(antiga)
+                self._lista.insert(chave, entrada)
+                self._chaves[entrada['id']] = chave
+            self._versao = versao
+            self._counters['atualizacoes'] += 1
+
+    def garantir_atual(self):
+        """Reconstruir o ranking se estiver desatualizado; False se a base de dados falhar"""
+        with self._lock:
+            atual = (self._versao == table_versions.get('jogo_participantes')[0]
+                     and time.monotonic() - self._construido_em < self.max_age)
+        if atual:
+            return True
+        with self._rebuild_lock:
+            with self._lock:
+                if (self._versao == table_versions.get('jogo_participantes')[0]
+                        and time.monotonic() - self._construido_em < self.max_age):
+                    return True
+            connection = get_db_connection()
+            if not connection:
+                return False
+            try:
+                cursor = connection.cursor()
+                self.reconstruir(cursor)
+                return True
+            except Error as e:
+                print(f"Erro ao reconstruir ranking: {e}")
+                return False
+            finally:
+                if connection.is_connected():
+                    cursor.close()
+                    connection.close()
+
+    def _com_posicoes(self, inicio, entradas):
+        return [dict(entrada, posicao=inicio + i + 1) for i, entrada in enumerate(entradas)]
+
+    def top(self, n):
+        if not self.garantir_atual():
+            return None
+        with self._lock:
+            return self._com_posicoes(0, self._lista.slice(0, n))
+
+    def posicao(self, jogador_id):
+        """Entrada de um jogador com a sua posição (None se não estiver no ranking)"""
+        if not self.garantir_atual():
+            return None
+        with self._lock:
+            chave = self._chaves.get(jogador_id)
+            if chave is None:
+                return {}
+            indice = self._lista.index(chave)
+            return self._com_posicoes(indice, self._lista.slice(indice, indice + 1))[0]
+
+    def vizinhos(self, jogador_id, raio):
+        """Janela de `raio` jogadores acima e abaixo de um jogador"""
+        if not self.garantir_atual():
+            return None
+        with self._lock:
+            chave = self._chaves.get(jogador_id)
+            if chave is None:
+                return []
+            inicio = max(0, self._lista.index(chave) - raio)
+            return self._com_posicoes(inicio, self._lista.slice(inicio, inicio + 2 * raio + 1))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['jogadores'] = len(self._lista)
+            stats['versao'] = self._versao
+        stats['fonte'] = RANKING_SOURCE
+        return stats
+
+ranking_jogadores = RankingJogadores(float(os.getenv('RANKING_MAX_AGE', 300)))
+if RANKING_SOURCE == 'memory':
+    participantes_listeners.append(ranking_jogadores.atualizar)
+
+# ==================== ESTATÍSTICAS POR JOGADOR ====================
+
+# 'query': agregação sobre todo o histórico a cada pedido; 'table': leitura por
+# chave primária de jogador_estatisticas (correr reconstruir-estatisticas-jogadores antes)
+JOGADOR_STATS_SOURCE = os.getenv('JOGADOR_STATS_SOURCE', 'query')
+
+class EstatisticasJogadores:
+    """Agregados por jogador (jogos, soma de tacadas, melhor, pior, vitórias,
+    último jogo) guardados em jogador_estatisticas.
+
+    jogador_estatisticas_jogos guarda a contribuição de cada participação já
+    somada; quando as estatísticas de um jogo são recalculadas (listener de
+    participantes_alterados) só a diferença entre a contribuição antiga e a nova
+    é aplicada aos jogadores desse jogo. Melhor, pior e último jogo só são
+    reagregados (a partir das contribuições) quando o valor retirado era o
+    extremo atual. reconstruir() refaz as duas tabelas a partir do histórico;
+    no MySQL são criadas por `flask migrar-bd`.
+    """
+
+    QUERY = """
+    SELECT 
+        j.nome,
+        COUNT(DISTINCT jp.jogo_id) as total_jogos,
+        AVG(jp.total_tacadas) as media_tacadas,
+        MIN(jp.total_tacadas) as melhor_score,
+        MAX(jp.total_tacadas) as pior_score,
+        COUNT(CASE WHEN jp.posicao_final = 1 THEN 1 END) as vitorias,
+        MAX(jg.data_jogo) as ultimo_jogo
+    FROM jogadores j
+    LEFT JOIN jogo_participantes jp ON j.id = jp.jogador_id
+    LEFT JOIN jogos jg ON jp.jogo_id = jg.id
+    WHERE j.id = %s
+    GROUP BY j.id, j.nome
+    """
+
+    # A divisão dá o mesmo resultado que AVG em cada backend (DECIMAL com 4 casas no MySQL)
+    MEDIA = ("CAST(e.soma_tacadas AS REAL) / NULLIF(e.jogos_pontuados, 0)" if DB_BACKEND == 'sqlite'
+             else "e.soma_tacadas / NULLIF(e.jogos_pontuados, 0)")
+
+    QUERY_TABELA = f"""
+    SELECT 
+        j.nome,
+        COALESCE(e.total_jogos, 0) as total_jogos,
+        {MEDIA} as media_tacadas,
+        e.melhor_score,
+        e.pior_score,
+        COALESCE(e.vitorias, 0) as vitorias,
+        e.ultimo_jogo
+    FROM jogadores j
+    LEFT JOIN jogador_estatisticas e ON e.jogador_id = j.id
+    WHERE j.id = %s
+    """
+
+    AGREGADOS = """
+    SELECT jp.jogador_id,
+           COUNT(DISTINCT jp.jogo_id),
+           COUNT(jp.total_tacadas),
+           COALESCE(SUM(jp.total_tacadas), 0),
+           MIN(jp.total_tacadas),
+           MAX(jp.total_tacadas),
+           COUNT(CASE WHEN jp.posicao_final = 1 THEN 1 END),
+           MAX(jg.data_jogo)
+    FROM jogo_participantes jp
+    LEFT JOIN jogos jg ON jp.jogo_id = jg.id
+    """
+
+    COLUNAS = "jogador_id, total_jogos, jogos_pontuados, soma_tacadas, melhor_score, pior_score, vitorias, ultimo_jogo"
+
+    CONTRIBUICOES = """
+    SELECT jp.jogo_id, jp.jogador_id, jp.total_tacadas,
+           CASE WHEN jp.posicao_final = 1 THEN 1 ELSE 0 END,
+           jg.data_jogo
+    FROM jogo_participantes jp
+    LEFT JOIN jogos jg ON jp.jogo_id = jg.id
+    """
+
+    UPSERT = f"""
+    INSERT INTO jogador_estatisticas ({COLUNAS})
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        total_jogos = VALUES(total_jogos),
+        jogos_pontuados = VALUES(jogos_pontuados),
+        soma_tacadas = VALUES(soma_tacadas),
+        melhor_score = VALUES(melhor_score),
+        pior_score = VALUES(pior_score),
+        vitorias = VALUES(vitorias),
+        ultimo_jogo = VALUES(ultimo_jogo)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {'atualizacoes': 0, 'jogadores_atualizados': 0, 'extremos_reagregados': 0,
+                          'reconstrucoes': 0}
+
+    def atualizar(self, cursor, jogo_id, versao):
+        """Aplicar a diferença das contribuições de um jogo (listener de participantes_alterados).
+
+        Corre depois do commit de quem alterou o jogo, numa transação própria.
+        """
+        connection = get_db_connection()
+        if not connection:
+            raise Error('Erro de conexão com a base de dados')
+        try:
+            cursor = connection.cursor()
+            connection.start_transaction()
+            cursor.execute("""
+            SELECT jogador_id, total_tacadas, vitoria, data_jogo FROM jogador_estatisticas_jogos
+            WHERE jogo_id = %s
+            FOR UPDATE
+            """, (jogo_id,))
+            antigas = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+            cursor.execute(self.CONTRIBUICOES + " WHERE jp.jogo_id = %s", (jogo_id,))
+            novas = {row[1]: tuple(row[2:]) for row in cursor.fetchall()}
+            alterados = sorted(j for j in antigas.keys() | novas.keys() if antigas.get(j) != novas.get(j))
+            if not alterados:
+                connection.rollback()
+                return
+            
+            # Garantir a linha de cada jogador antes de a bloquear
+            cursor.executemany("""
+            INSERT INTO jogador_estatisticas (jogador_id) VALUES (%s)
+            ON DUPLICATE KEY UPDATE jogador_id = jogador_id
+            """, [(jogador_id,) for jogador_id in alterados])
+            placeholders = ', '.join(['%s'] * len(alterados))
+            cursor.execute(f"SELECT {self.COLUNAS} FROM jogador_estatisticas "
+                           f"WHERE jogador_id IN ({placeholders}) FOR UPDATE", alterados)
+            atuais = {row[0]: list(row[1:]) for row in cursor.fetchall()}
+            
+            linhas, reagregar = [], []
+            for jogador_id in alterados:
+                jogos, pontuados, soma, melhor, pior, vitorias, ultimo = atuais[jogador_id]
+                antiga, nova = antigas.get(jogador_id), novas.get(jogador_id)
+                if antiga is not None:
+                    total, vitoria, data_jogo = antiga
+                    jogos, vitorias = jogos - 1, vitorias - vitoria
+                    if total is not None:
+                        pontuados, soma = pontuados - 1, soma - total
+                    # Retirar um extremo só obriga a reagregar se o novo valor não o substituir
+                    novo_total, _, nova_data = nova or (None, 0, None)
+                    if (total is not None and total == melhor and (novo_total is None or novo_total > total)
+                            or total is not None and total == pior and (novo_total is None or novo_total < total)
+                            or data_jogo is not None and data_jogo == ultimo
+                            and (nova_data is None or nova_data < data_jogo)):
+                        reagregar.append(jogador_id)
+                if nova is not None:
+                    total, vitoria, data_jogo = nova
+                    jogos, vitorias = jogos + 1, vitorias + vitoria
+                    if total is not None:
+                        pontuados, soma = pontuados + 1, soma + total
+                        melhor = total if melhor is None else min(melhor, total)
+                        pior = total if pior is None else max(pior, total)
+                    if data_jogo is not None:
+                        ultimo = data_jogo if ultimo is None else max(ultimo, data_jogo)
+                linhas.append((jogador_id, jogos, pontuados, soma, melhor, pior, vitorias, ultimo))
+            cursor.executemany(self.UPSERT, linhas)
+            
+            cursor.execute("DELETE FROM jogador_estatisticas_jogos WHERE jogo_id = %s", (jogo_id,))
+            if novas:
+                cursor.executemany("""
+                INSERT INTO jogador_estatisticas_jogos (jogo_id, jogador_id, total_tacadas, vitoria, data_jogo)
+                VALUES (%s, %s, %s, %s, %s)
+                """, [(jogo_id, jogador_id) + nova for jogador_id, nova in novas.items()])
+            for jogador_id in reagregar:
+                # O extremo retirado pode não ser o novo extremo: reagregar só estes três valores
+                cursor.execute("""
+                SELECT MIN(total_tacadas), MAX(total_tacadas), MAX(data_jogo)
+                FROM jogador_estatisticas_jogos WHERE jogador_id = %s
+                """, (jogador_id,))
+                melhor, pior, ultimo = cursor.fetchone()
+                cursor.execute("""
+                UPDATE jogador_estatisticas SET melhor_score = %s, pior_score = %s, ultimo_jogo = %s
+                WHERE jogador_id = %s
+                """, (melhor, pior, ultimo, jogador_id))
+            connection.commit()
+        except Error:
+            connection.rollback()
+            raise
+        finally:
+            if connection.is_connected():
+                cursor.close()
+                connection.close()
+        with self._lock:
+            self._counters['atualizacoes'] += 1
+            self._counters['jogadores_atualizados'] += len(alterados)
+            self._counters['extremos_reagregados'] += len(reagregar)
+
+    def reconstruir(self, connection):
+        """Refazer jogador_estatisticas a partir de todo o histórico; devolve o número de jogadores"""
+        cursor = connection.cursor()
+        try:
+            connection.start_transaction()
+            cursor.execute("DELETE FROM jogador_estatisticas")
+            cursor.execute(f"INSERT INTO jogador_estatisticas ({self.COLUNAS})"
+                           + self.AGREGADOS + " GROUP BY jp.jogador_id")
+            total = cursor.rowcount
+            cursor.execute("DELETE FROM jogador_estatisticas_jogos")
+            cursor.execute("INSERT INTO jogador_estatisticas_jogos "
+                           "(jogo_id, jogador_id, total_tacadas, vitoria, data_jogo)" + self.CONTRIBUICOES)
+            connection.commit()
+        finally:
+            cursor.close()
+        with self._lock:
+            self._counters['reconstrucoes'] += 1
+        return total
+
+    def obter(self, cursor, jogador_id, fonte=None):
+        """Estatísticas de um jogador (None se não existir)"""
+        cursor.execute(self.QUERY_TABELA if (fonte or JOGADOR_STATS_SOURCE) == 'table' else self.QUERY,
+                       (jogador_id,))
+        return fetchone_dict(cursor)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['fonte'] = JOGADOR_STATS_SOURCE
+        return stats
+
+estatisticas_jogadores = EstatisticasJogadores()
+if JOGADOR_STATS_SOURCE == 'table':
+    participantes_listeners.append(estatisticas_jogadores.atualizar)
+
+@app.cli.command('reconstruir-estatisticas-jogadores')
+def reconstruir_estatisticas_jogadores_cli():
+    """Recalcular jogador_estatisticas a partir de todo o histórico (backfill)"""
+    connection = get_db_connection()
+    if not connection:
+        raise SystemExit('Erro de conexão com a base de dados')
+    try:
+        total = estatisticas_jogadores.reconstruir(connection)
+        print(f"Estatísticas reconstruídas para {total} jogadores")
+    finally:
+        connection.close()
+
+# ==================== RATING ====================
+
+def _elo_pares(ratings, totais, grupo_inicio, tamanhos, k):
+    """Variação Elo de cada participação contra todos os adversários do mesmo jogo.
+
+    As participações vêm agrupadas por jogo; grupo_inicio e tamanhos dão, para
+    cada uma, o índice onde começa o seu jogo e quantos jogadores tem. Menos
+    tacadas vence (1), empate vale 0.5.
+    """
+    n = len(ratings)
+    i = np.repeat(np.arange(n), tamanhos)
+    deslocamento = np.arange(len(i)) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+    j = np.repeat(grupo_inicio, tamanhos) + deslocamento
+    pares = i != j
+    i, j = i[pares], j[pares]
+    esperado = 1.0 / (1.0 + 10.0 ** ((ratings[j] - ratings[i]) / 400.0))
+    resultado = np.where(totais[i] < totais[j], 1.0, np.where(totais[i] == totais[j], 0.5, 0.0))
+    return np.bincount(i, weights=resultado - esperado, minlength=n) * (k / (tamanhos - 1))
+
+def calcular_ratings(jogo, jogador, total, num_jogadores, k=32.0, inicial=1500.0):
+    """Elo multijogador pela ordem cronológica dos jogos, em passagens vetorizadas.
+
+    jogo (id do jogo; participações do mesmo jogo seguidas, jogos por ordem
+    cronológica), jogador (0..num_jogadores-1) e total são arrays de
+    participações. Cada passagem processa de uma vez todos
+    os jogos cujos jogadores não têm jogos anteriores por processar, por isso
+    cada jogador vê os seus jogos pela ordem certa. Devolve (ratings, jogos por
+    jogador, número de passagens, variação de cada participação), com NaN na
+    variação das participações que não contam (jogos com um só jogador).
+    """
+    jogo, jogador, total = np.asarray(jogo), np.asarray(jogador), np.asarray(total, dtype=np.float64)
+    ratings = np.full(num_jogadores, inicial, dtype=np.float64)
+    contagem = np.zeros(num_jogadores, dtype=np.int64)
+    variacoes = np.full(len(jogo), np.nan)
+    if len(jogo):
+        # Jogos com um só jogador não alteram ratings
+        manter = np.flatnonzero(np.bincount(jogo)[jogo] >= 2)
+        jogo, jogador, total = jogo[manter], jogador[manter], total[manter]
+    n = len(jogo)
+    if not n:
+        return ratings, contagem, 0, variacoes
+    variacao = np.empty(n)
+    jogo = np.cumsum(np.r_[True, jogo[1:] != jogo[:-1]]) - 1
+    tamanho = np.bincount(jogo)
+    inicio = np.cumsum(tamanho) - tamanho
+    
+    # Próxima participação de cada jogador (pela ordem cronológica)
+    ordem = np.lexsort((np.arange(n), jogador))
+    mesmo = jogador[ordem[1:]] == jogador[ordem[:-1]]
+    seguinte = np.full(n, -1, dtype=np.int64)
+    seguinte[ordem[:-1][mesmo]] = ordem[1:][mesmo]
+    
+    # faltam[g]: jogadores de g que ainda têm jogos anteriores por processar
+    faltam = tamanho - np.bincount(jogo[ordem[np.r_[True, ~mesmo]]], minlength=len(tamanho))
+    prontos = np.flatnonzero(faltam == 0)
+    
+    passagens = 0
+    while prontos.size:
+        tamanhos = tamanho[prontos]
+        grupo_inicio = np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+        parte = np.repeat(inicio[prontos], tamanhos) + np.arange(len(grupo_inicio)) - grupo_inicio
+        jogadores = jogador[parte]
+        variacao[parte] = _elo_pares(ratings[jogadores], total[parte], grupo_inicio,
+                                     np.repeat(tamanhos, tamanhos), k)
+        ratings[jogadores] += variacao[parte]
+        contagem[jogadores] += 1
+        proximas = seguinte[parte]
+        jogos, libertados = np.unique(jogo[proximas[proximas >= 0]], return_counts=True)
+        faltam[jogos] -= libertados
+        prontos = jogos[faltam[jogos] == 0]
+        passagens += 1
+    variacoes[manter] = variacao
+    return ratings, contagem, passagens, variacoes
+
+class MotorRating:
+    """Ratings Elo dos jogadores calculados em memória sobre todo o histórico.
+
+    A reconstrução carrega jogo_participantes em arrays NumPy e chama
+    calcular_ratings, guardando a variação de cada participação; depois disso
+    cada jogo recalculado neste worker atualiza só os seus jogadores (listener
+    de participantes_alterados), desfazendo a variação anterior desse jogo.
+    A primeira construção e as seguintes (ao fim de max_age segundos) correm
+    numa thread de fundo, servindo entretanto os ratings atuais.
+    """
+
+    QUERY = """
+    SELECT jp.jogo_id, jp.jogador_id, jp.total_tacadas
+    FROM jogo_participantes jp
+    JOIN jogos jg ON jp.jogo_id = jg.id
+    WHERE jp.total_tacadas IS NOT NULL
+    ORDER BY jg.data_jogo, jg.id
+    """
+
+    def __init__(self, k=32.0, inicial=1500.0, max_age=3600.0, chunk_size=50000):
+        self.k = k
+        self.inicial = inicial
+        self.max_age = max_age
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._ratings = None    # jogador_id -> [rating, jogos]
+        self._base = None       # (jogo_id, jogador_id, variação) da reconstrução, por jogo_id
+        self._aplicados = {}    # jogo_id -> {jogador_id: variação} desde a reconstrução
+        self._versao = 0
+        self._construido_em = 0.0
+        self._thread = None
+        self._counters = {'reconstrucoes': 0, 'atualizacoes': 0, 'participacoes': 0,
+                          'passagens': 0, 'duracao_ms': 0.0}
+
+    @property
+    def disponivel(self):
+        return np is not None
+
+    def _carregar(self, cursor):
+        cursor.execute(self.QUERY)
+        blocos = []
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            blocos.append(np.array(rows, dtype=np.int64))
+        return np.concatenate(blocos) if blocos else np.empty((0, 3), dtype=np.int64)
+
+    def reconstruir(self, cursor):
+        """Recalcular os ratings de todos os jogadores a partir do histórico"""
+        versao = table_versions.get('jogo_participantes')[0]
+        inicio = time.perf_counter()
+        dados = self._carregar(cursor)
+        ids, jogador = np.unique(dados[:, 1], return_inverse=True)
+        ratings, contagem, passagens, variacoes = calcular_ratings(
+            dados[:, 0], jogador.ravel(), dados[:, 2], len(ids), self.k, self.inicial)
+        novos = {int(jogador_id): [float(rating), int(jogos)]
+                 for jogador_id, rating, jogos in zip(ids, ratings, contagem)}
+        contam = ~np.isnan(variacoes)
+        ordem = np.argsort(dados[contam, 0], kind='stable')
+        base = (dados[contam, 0][ordem], dados[contam, 1][ordem], variacoes[contam][ordem])
+        with self._lock:
+            self._ratings = novos
+            self._base = base
+            self._aplicados = {}
+            self._versao = versao
+            self._construido_em = time.monotonic()
+            self._counters['reconstrucoes'] += 1
+            self._counters['participacoes'] = len(dados)
+            self._counters['passagens'] = passagens
+            self._counters['duracao_ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    def _variacoes_anteriores(self, jogo_id):
+        """Variações atualmente aplicadas de um jogo (chamado com _lock)"""
+        if jogo_id in self._aplicados:
+            return self._aplicados[jogo_id]
+        jogos, jogadores, variacoes = self._base
+        inicio, fim = np.searchsorted(jogos, [jogo_id, jogo_id + 1])
+        return dict(zip(jogadores[inicio:fim].tolist(), variacoes[inicio:fim].tolist()))
+
+    def atualizar(self, cursor, jogo_id, versao):
+        """Reaplicar a variação de um jogo com os totais atuais (listener de participantes_alterados)"""
+        with self._lock:
+            if self._ratings is None or versao <= self._versao:
+                # Ainda não construído, ou a reconstrução já incluiu esta alteração
+                return
+        cursor.execute("""
+        SELECT jogador_id, total_tacadas FROM jogo_participantes
+        WHERE jogo_id = %s AND total_tacadas IS NOT NULL
+        """, (jogo_id,))
+        rows = cursor.fetchall()
+        with self._lock:
+            if self._ratings is None:
+                return
+            for jogador_id, variacao in self._variacoes_anteriores(jogo_id).items():
+                self._ratings[jogador_id][0] -= variacao
+                self._ratings[jogador_id][1] -= 1
+            self._aplicados[jogo_id] = {}
+            if len(rows) >= 2:
+                jogadores = [int(row[0]) for row in rows]
+                antes = np.array([self._ratings.get(j, [self.inicial])[0] for j in jogadores])
+                totais = np.array([row[1] for row in rows], dtype=np.float64)
+                variacoes = _elo_pares(antes, totais, np.zeros(len(rows), dtype=np.int64),
+                                       np.full(len(rows), len(rows)), self.k)
+                for jogador_id, variacao in zip(jogadores, variacoes.tolist()):
+                    entrada = self._ratings.setdefault(jogador_id, [self.inicial, 0])
+                    entrada[0] += variacao
+                    entrada[1] += 1
+                self._aplicados[jogo_id] = dict(zip(jogadores, variacoes.tolist()))
+            self._counters['atualizacoes'] += 1
+
+    def _reconstruir_com_conexao(self):
+        with self._rebuild_lock:
+            connection = get_db_connection()
+            if not connection:
+                return False
+            try:
+                cursor = connection.cursor()
+                self.reconstruir(cursor)
+                return True
+            except Error as e:
+                print(f"Erro ao calcular ratings: {e}")
+                return False
+            finally:
+                if connection.is_connected():
+                    cursor.close()
+                    connection.close()
+
+    def _reconstruir_em_fundo(self):
+        """Lançar a reconstrução numa thread, se não houver já uma a correr (chamado com _lock)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._reconstruir_com_conexao,
+                                            name='reconstrucao-ratings', daemon=True)
+            self._thread.start()
+
+    def iniciar(self):
+        """Começar a primeira construção em fundo (no arranque do worker)"""
+        with self._lock:
+            if self._ratings is None:
+                self._reconstruir_em_fundo()
+
+    def garantir_atual(self):
+        """False enquanto a primeira construção não terminar (que é lançada em fundo se preciso)"""
+        with self._lock:
+            construido = self._ratings is not None
+            if not construido or time.monotonic() - self._construido_em >= self.max_age:
+                self._reconstruir_em_fundo()
+        return construido
+
+    def expirar(self):
+        """Forçar a reconstrução em fundo na próxima leitura (ex.: depois de uma importação)"""
+        with self._lock:
+            self._construido_em = 0.0
+
+    def anotar(self, entradas):
+        """Acrescentar rating e jogos_rating a entradas com 'id' (ex.: ranking)"""
+        if not self.garantir_atual():
+            return entradas
+        with self._lock:
+            for entrada in entradas:
+                rating, jogos = self._ratings.get(entrada['id'], (self.inicial, 0))
+                entrada['rating'] = round(rating, 1)
+                entrada['jogos_rating'] = jogos
+        return entradas
+
+    def top(self, n):
+        """Os n jogadores com rating mais alto: [(jogador_id, rating, jogos)]"""
+        if not self.garantir_atual():
+            return None
+        with self._lock:
+            melhores = heapq.nlargest(n, self._ratings.items(), key=lambda item: (item[1][0], -item[0]))
+        return [(jogador_id, round(rating, 1), jogos) for jogador_id, (rating, jogos) in melhores]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['jogadores'] = len(self._ratings) if self._ratings is not None else 0
+            stats['jogos_incrementais'] = len(self._aplicados)
+        stats['disponivel'] = self.disponivel
+        return stats
+
+motor_rating = MotorRating(
+    k=float(os.getenv('RATING_K', 32)),
+    inicial=float(os.getenv('RATING_INICIAL', 1500)),
+    max_age=float(os.getenv('RATING_MAX_AGE', 3600))
+)
+if motor_rating.disponivel:
+    participantes_listeners.append(motor_rating.atualizar)
+
+# ==================== ESTATÍSTICAS ====================
+
+@app.route('/api/estatisticas/campos', methods=['GET'])
+@conditional_get('campos', 'cidades', 'pistas', 'jogos', 'jogo_participantes', 'tacadas',
+                 before=recalculo_estatisticas.flush_all)
+def get_estatisticas_campos():
+    """Obter estatísticas dos campos"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT * FROM vw_estatisticas_campo")
+        stats = fetchall_dicts(cursor)
+        return jsonify(stats)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+@app.route('/api/estatisticas/jogadores', methods=['GET'])
+@conditional_get('jogadores', 'jogos', 'jogo_participantes', before=recalculo_estatisticas.flush_all)
+def get_ranking_jogadores():
+    """Obter ranking dos jogadores (?ordem=rating ordena pelo rating Elo)"""
+    limit = min(get_page_size(20), 100)
+    
+    if request.args.get('ordem') == 'rating':
+        return get_ranking_rating(limit)
+    
+    if RANKING_SOURCE == 'memory':
+        ranking = ranking_jogadores.top(limit)
+        if ranking is None:
+            return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+        if motor_rating.disponivel:
+            motor_rating.anotar(ranking)
+        return jsonify(ranking)
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT * FROM vw_ranking_jogadores LIMIT %s", (limit,))
+        ranking = fetchall_dicts(cursor)
+        if motor_rating.disponivel:
+            motor_rating.anotar(ranking)
+        return jsonify(ranking)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def get_ranking_rating(limit):
+    """Top de jogadores pelo rating Elo"""
+    if not motor_rating.disponivel:
+        return jsonify({'error': 'Ratings indisponíveis (numpy não instalado)'}), 501
+    top = motor_rating.top(limit)
+    if top is None:
+        response = jsonify({'error': 'Ratings em cálculo, tentar novamente dentro de instantes'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    if not top:
+        return jsonify([])
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        cursor = connection.cursor()
+        placeholders = ', '.join(['%s'] * len(top))
+        cursor.execute(f"SELECT id, nome FROM jogadores WHERE id IN ({placeholders})",
+                       [jogador_id for jogador_id, _, _ in top])
+        nomes = dict(cursor.fetchall())
+        return jsonify([
+            {'posicao': posicao, 'id': jogador_id, 'nome': nomes.get(jogador_id),
+             'rating': rating, 'jogos_rating': jogos}
+            for posicao, (jogador_id, rating, jogos) in enumerate(top, 1)
+        ])
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+@app.route('/api/estatisticas/jogadores/<int:jogador_id>/posicao', methods=['GET'])
+@conditional_get('jogadores', 'jogos', 'jogo_participantes',
+                 before=lambda **_: recalculo_estatisticas.flush_all())
+def get_posicao_jogador(jogador_id):
+    """Posição de um jogador no ranking e janela de jogadores à sua volta (?raio=)"""
+    try:
+        raio = max(0, min(int(request.args.get('raio', 0)), 50))
+    except ValueError:
+        return jsonify({'error': 'raio deve ser um número inteiro'}), 400
+    
+    entrada = ranking_jogadores.posicao(jogador_id)
+    if entrada is None:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    if not entrada:
+        return jsonify({'error': 'Jogador não está no ranking'}), 404
+    
+    resultado = dict(entrada)
+    if raio:
+        resultado['vizinhos'] = ranking_jogadores.vizinhos(jogador_id, raio)
+    return jsonify(resultado)
+
+@app.route('/api/estatisticas/jogadores/verificar', methods=['GET'])
+def verificar_ranking_jogadores():
+    """Comparar o ranking em memória com vw_ranking_jogadores"""
+    limit = min(get_page_size(20), 100)
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT * FROM vw_ranking_jogadores LIMIT %s", (limit,))
+        vista = fetchall_dicts(cursor)
+        ranking_jogadores.reconstruir(cursor)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+    
+    memoria = ranking_jogadores.top(limit) or []
+    
+    def normalizar(entrada):
+        if entrada is None:
+            return None
+        media = entrada.get('media_tacadas')
+        return (entrada.get('nome'), entrada.get('total_jogos'), round(media, 4) if media is not None else None)
+    
+    divergencias = []
+    for posicao in range(max(len(vista), len(memoria))):
+        esperado = vista[posicao] if posicao < len(vista) else None
+        obtido = memoria[posicao] if posicao < len(memoria) else None
+        if esperado is None or obtido is None or normalizar(esperado) != normalizar(obtido):
+            divergencias.append({'posicao': posicao + 1, 'vista': esperado, 'memoria': obtido})
+    return jsonify({'ok': not divergencias, 'divergencias': divergencias})
+
+@app.route('/api/estatisticas/jogador/<int:jogador_id>', methods=['GET'])
+@conditional_get('jogadores', 'jogos', 'jogo_participantes', before=recalculo_estatisticas.flush_jogador)
+def get_estatisticas_jogador(jogador_id):
+    """Obter estatísticas de um jogador específico"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        cursor = connection.cursor()
+        stats = estatisticas_jogadores.obter(cursor, jogador_id)
         
         if not stats:
             return jsonify({'error': 'Jogador não encontrado'}), 404
         
-        return jsonify(dict_factory(cursor, stats))
+        return jsonify(stats)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+@app.route('/api/estatisticas/jogador/<int:jogador_id>/verificar', methods=['GET'])
+def verificar_estatisticas_jogador(jogador_id):
+    """Comparar jogador_estatisticas com a agregação sobre o histórico"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        cursor = connection.cursor()
+        historico = estatisticas_jogadores.obter(cursor, jogador_id, 'query')
+        if not historico:
+            return jsonify({'error': 'Jogador não encontrado'}), 404
+        tabela = estatisticas_jogadores.obter(cursor, jogador_id, 'table')
+        divergencias = {campo: {'historico': valor, 'tabela': tabela.get(campo)}
+                        for campo, valor in historico.items() if tabela.get(campo) != valor}
+        return jsonify({'jogador_id': jogador_id, 'ok': not divergencias, 'divergencias': divergencias})
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -602,6 +4933,501 @@ def get_estatisticas_jogador(jogador_id):
             cursor.close()
             connection.close()
 
+# ==================== EXPORTAÇÃO ====================
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+def filtros_exportacao():
+    """Condições e parâmetros de ?desde=&ate= (datas AAAA-MM-DD, inclusivas) e ?campo_id=.
+
+    ValueError se algum filtro for inválido.
+    """
+    conditions = []
+    params = []
+    try:
+        if request.args.get('desde'):
+            conditions.append("jg.data_jogo >= %s")
+            params.append(date.fromisoformat(request.args['desde']))
+        if request.args.get('ate'):
+            conditions.append("jg.data_jogo < %s")
+            params.append(date.fromisoformat(request.args['ate']) + timedelta(days=1))
+    except ValueError:
+        raise ValueError('desde e ate devem ser datas AAAA-MM-DD')
+    if request.args.get('campo_id'):
+        try:
+            params.append(int(request.args['campo_id']))
+        except ValueError:
+            raise ValueError('campo_id deve ser um número inteiro')
+        conditions.append("jg.campo_id = %s")
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+def exportar(nome, query, order_by):
+    """Enviar uma exportação em CSV (omissão) ou NDJSON (?formato=), comprimida se o cliente aceitar gzip"""
+    formato = request.args.get('formato', 'csv').lower()
+    if formato not in ('csv', 'ndjson'):
+        return jsonify({'error': 'formato deve ser csv ou ndjson'}), 400
+    try:
+        where, params = filtros_exportacao()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+    filename = f"{nome}-{datetime.now():%Y%m%d}.{formato}"
+    return stream_query(query + where + order_by, params, formato, compress=compress,
+                        filename=filename, chunk_size=EXPORT_CHUNK_SIZE)
+
+@app.route('/api/export/jogos', methods=['GET'])
+def export_jogos():
+    """Exportar jogos (?desde=&ate=&campo_id=&formato=csv|ndjson) em streaming"""
+    query = """
+    SELECT jg.id, jg.campo_id, c.nome as campo_nome, jg.data_jogo, jg.num_jogadores, jg.observacoes
+    FROM jogos jg
+    JOIN campos c ON jg.campo_id = c.id
+    """
+    return exportar('jogos', query, " ORDER BY jg.data_jogo, jg.id")
+
+@app.route('/api/export/tacadas', methods=['GET'])
+def export_tacadas():
+    """Exportar tacadas com jogo, jogador e pista (?desde=&ate=&campo_id=&formato=csv|ndjson) em streaming"""
+    query = """
+    SELECT t.jogo_id, jg.data_jogo, jg.campo_id, t.jogador_id, jo.nome as jogador_nome,
+           t.pista_id, p.numero_pista, p.par, t.numero_tacadas, t.tempo_pista
+    FROM tacadas t
+    JOIN jogos jg ON t.jogo_id = jg.id
+    JOIN jogadores jo ON t.jogador_id = jo.id
+    JOIN pistas p ON t.pista_id = p.id
+    """
+    return exportar('tacadas', query, " ORDER BY jg.data_jogo, t.jogo_id, t.jogador_id, t.pista_id")
+
+# ==================== IMPORTAÇÃO EM MASSA ====================
+
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 500))      # linhas por INSERT
+IMPORT_COMMIT_ROWS = int(os.getenv('IMPORT_COMMIT_ROWS', 5000))   # linhas por transação
+IMPORT_MAX_ERROS = int(os.getenv('IMPORT_MAX_ERROS', 1000))       # erros detalhados na resposta
+
+def ler_registos(linhas, formato):
+    """(número da linha, registo ou None, erro ou None) de um ficheiro CSV ou NDJSON lido linha a linha"""
+    if formato == 'csv':
+        reader = csv.DictReader(linhas)
+        for row in reader:
+            yield reader.line_num, {k: (v if v != '' else None) for k, v in row.items() if k}, None
+        return
+    for numero, linha in enumerate(linhas, 1):
+        if not linha.strip():
+            continue
+        try:
+            registo = json.loads(linha)
+        except ValueError:
+            yield numero, None, 'JSON inválido'
+            continue
+        if isinstance(registo, dict):
+            yield numero, registo, None
+        else:
+            yield numero, None, 'Cada linha deve ser um objeto JSON'
+
+def _inteiro(valor, campo, obrigatorio=False):
+    if valor is None or valor == '':
+        if obrigatorio:
+            raise ValueError(f'{campo} é obrigatório')
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'{campo} deve ser um número inteiro')
+
+class ImportacaoEmMassa:
+    """Importação de cidades, jogadores, campos, pistas ou jogos históricos (com tacadas).
+
+    Os registos chegam em streaming e as chaves estrangeiras são validadas contra
+    conjuntos de ids carregados no início, sem consultas por linha. As linhas
+    válidas são inseridas em INSERTs de várias linhas (IMPORT_BATCH_SIZE) e
+    confirmadas a cada IMPORT_COMMIT_ROWS; se um lote falhar, é repetido linha a
+    linha para identificar as linhas com erro. Nos jogos, os ids são reservados
+    na transação (os jogos também vão em INSERTs de várias linhas) e os totais e
+    posições calculados durante a importação (EstadoJogo), por isso no fim só é
+    preciso invalidar uma vez as versões e os dados derivados, depois do último
+    commit.
+    """
+
+    # entidade: (tabela, colunas, obrigatórios, {coluna: tabela referenciada}, colunas inteiras, valores por omissão)
+    ENTIDADES = {
+        'cidades': ('cidades', ['nome', 'distrito', 'codigo_postal'], ['nome', 'distrito'], {}, [], {}),
+        'jogadores': ('jogadores', ['nome', 'email', 'telefone', 'data_nascimento', 'cidade_id', 'avatar_url'],
+                      ['nome'], {'cidade_id': 'cidades'}, ['cidade_id'], {}),
+        'campos': ('campos', ['nome', 'cidade_id', 'tipo', 'endereco', 'telefone', 'website', 'email',
+                              'latitude', 'longitude', 'preco_adulto', 'preco_crianca',
+                              'horario_abertura', 'horario_fecho'],
+                   ['nome', 'cidade_id', 'tipo'], {'cidade_id': 'cidades'}, ['cidade_id'], {}),
+        'pistas': ('pistas', ['campo_id', 'numero_pista', 'nome', 'dificuldade', 'par', 'descricao'],
+                   ['campo_id', 'numero_pista'], {'campo_id': 'campos'}, ['campo_id', 'numero_pista', 'par'],
+                   {'dificuldade': 'medio', 'par': 3}),
+    }
+
+    TIPOS_CAMPO = ('petergolfe', 'feltgolfe', 'minigolfe')
+
+    def __init__(self, connection, entidade, lote=None, por_transacao=None):
+        if entidade not in self.ENTIDADES and entidade != 'jogos':
+            raise ValueError(f'Entidade desconhecida: {entidade}')
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.entidade = entidade
+        self.lote = lote or IMPORT_BATCH_SIZE
+        self.por_transacao = por_transacao or IMPORT_COMMIT_ROWS
+        self._ids = {}
+        self._pendentes = 0
+        self._proximo_jogo = None
+        self.resumo = {'entidade': entidade, 'lidas': 0, 'inseridas': 0, 'erros': 0, 'detalhes_erros': []}
+
+    def _erro(self, linha, mensagem):
+        self.resumo['erros'] += 1
+        if len(self.resumo['detalhes_erros']) < IMPORT_MAX_ERROS:
+            self.resumo['detalhes_erros'].append({'linha': linha, 'erro': mensagem})
+
+    def _carregar_ids(self, tabela):
+        if tabela not in self._ids:
+            self.cursor.execute(f"SELECT id FROM {tabela}")
+            self._ids[tabela] = {row[0] for row in self.cursor.fetchall()}
+        return self._ids[tabela]
+
+    def _inserir(self, tabela, colunas, linhas):
+        """INSERT de várias linhas; devolve o número de linhas"""
+        marcadores = '(' + ', '.join(['%s'] * len(colunas)) + ')'
+        self.cursor.execute(f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES "
+                            + ', '.join([marcadores] * len(linhas)),
+                            [valor for linha in linhas for valor in linha])
+        return len(linhas)
+
+    def _confirmar(self, linhas, forcar=False):
+        self._pendentes += linhas
+        if forcar or self._pendentes >= self.por_transacao:
+            self.connection.commit()
+            self._pendentes = 0
+
+    def executar(self, registos):
+        """Importar os registos (de ler_registos); devolve o resumo"""
+        concluida = False
+        try:
+            if self.entidade == 'jogos':
+                self._importar_jogos(registos)
+            else:
+                self._importar_simples(registos)
+            self._confirmar(0, forcar=True)
+            concluida = True
+        finally:
+            if not concluida:
+                # O que ficou por confirmar é desfeito; o já confirmado é invalidado na mesma
+                self.connection.rollback()
+            self._finalizar()
+        return self.resumo
+
+    # ---- cidades, jogadores, campos, pistas ----
+
+    def _validar(self, registo, colunas, obrigatorios, referencias, inteiras, omissao):
+        for campo in obrigatorios:
+            if registo.get(campo) in (None, ''):
+                raise ValueError(f'{campo} é obrigatório')
+        valores = {coluna: registo.get(coluna, omissao.get(coluna)) for coluna in colunas}
+        for coluna in inteiras:
+            valores[coluna] = _inteiro(valores[coluna], coluna)
+        for coluna, tabela in referencias.items():
+            if valores[coluna] is not None and valores[coluna] not in self._carregar_ids(tabela):
+                raise ValueError(f'{coluna} {valores[coluna]} não existe')
+        if self.entidade == 'campos' and valores['tipo'] not in self.TIPOS_CAMPO:
+            raise ValueError('Tipo deve ser: petergolfe, feltgolfe ou minigolfe')
+        return valores
+
+    def _importar_simples(self, registos):
+        tabela, colunas, obrigatorios, referencias, inteiras, omissao = self.ENTIDADES[self.entidade]
+        existentes = self._carregar_ids(tabela)
+        unicas = set()
+        if self.entidade == 'pistas':
+            self.cursor.execute("SELECT campo_id, numero_pista FROM pistas")
+            unicas = set(self.cursor.fetchall())
+        lote = []  # (linha, colunas, valores)
+        for linha, registo, erro in registos:
+            self.resumo['lidas'] += 1
+            if erro:
+                self._erro(linha, erro)
+                continue
+            try:
+                valores = self._validar(registo, colunas, obrigatorios, referencias, inteiras, omissao)
+                # Id explícito (ex.: migração de outro sistema) para referências em importações seguintes
+                registo_id = _inteiro(registo.get('id'), 'id')
+                if registo_id is not None and registo_id in existentes:
+                    raise ValueError(f'id {registo_id} já existe')
+                if self.entidade == 'pistas':
+                    chave = (valores['campo_id'], valores['numero_pista'])
+                    if chave in unicas:
+                        raise ValueError(f"Pista {chave[1]} já existe no campo {chave[0]}")
+                    unicas.add(chave)
+            except ValueError as e:
+                self._erro(linha, str(e))
+                continue
+            if registo_id is not None:
+                existentes.add(registo_id)
+            nomes = (['id'] if registo_id is not None else []) + colunas
+            lote.append((linha, tuple(nomes), ([registo_id] if registo_id is not None else [])
+                         + [valores[coluna] for coluna in colunas]))
+            if len(lote) >= self.lote:
+                self._gravar_lote(tabela, lote)
+                lote = []
+        if lote:
+            self._gravar_lote(tabela, lote)
+
+    def _gravar_lote(self, tabela, lote):
+        # Linhas com e sem id explícito vão em INSERTs separados
+        grupos = {}
+        for linha, nomes, valores in lote:
+            grupos.setdefault(nomes, []).append((linha, valores))
+        for nomes, linhas in grupos.items():
+            try:
+                inseridas = self._inserir(tabela, nomes, [valores for _, valores in linhas])
+            except Error:
+                # Repetir linha a linha para saber quais falham (um INSERT falhado não desfaz os outros)
+                inseridas = 0
+                for linha, valores in linhas:
+                    try:
+                        inseridas += self._inserir(tabela, nomes, [valores])
+                    except Error as e:
+                        self._erro(linha, str(e))
+            self.resumo['inseridas'] += inseridas
+            self._confirmar(inseridas)
+
+    # ---- jogos históricos ----
+
+    @staticmethod
+    def _agrupar_jogos(registos):
+        """Jogos (linha, dicionário, erro) a partir de registos aninhados (com 'tacadas') ou
+        planos (uma tacada por linha, agrupadas pela coluna 'jogo' em linhas seguidas)"""
+        atual, chave = None, None
+        for linha, registo, erro in registos:
+            if erro or 'tacadas' in registo:
+                if atual:
+                    yield atual
+                    atual, chave = None, None
+                yield (linha, registo, erro)
+                continue
+            chave_registo = registo.get('jogo') or registo.get('id')
+            if atual is None or chave_registo != chave or chave_registo is None:
+                if atual:
+                    yield atual
+                jogo = {k: registo.get(k) for k in ('id', 'campo_id', 'data_jogo', 'observacoes')}
+                jogo['tacadas'] = []
+                atual, chave = (linha, jogo, None), chave_registo
+            atual[1]['tacadas'].append({k: registo.get(k) for k in
+                                        ('jogador_id', 'pista_id', 'numero_tacadas', 'tempo_pista')})
+        if atual:
+            yield atual
+
+    def _validar_jogo(self, jogo, pistas):
+        jogo_id = _inteiro(jogo.get('id'), 'id')
+        if jogo_id is not None and jogo_id in self._carregar_ids('jogos'):
+            raise ValueError(f'id {jogo_id} já existe')
+        campo_id = _inteiro(jogo.get('campo_id'), 'campo_id', obrigatorio=True)
+        if campo_id not in self._carregar_ids('campos'):
+            raise ValueError(f'campo_id {campo_id} não existe')
+        if not jogo.get('data_jogo'):
+            raise ValueError('data_jogo é obrigatório')
+        try:
+            data_jogo = datetime.fromisoformat(str(jogo['data_jogo']))
+        except ValueError:
+            raise ValueError('data_jogo inválida')
+        tacadas = jogo.get('tacadas')
+        if not isinstance(tacadas, list) or not tacadas:
+            raise ValueError('O jogo não tem tacadas')
+        
+        jogadores_ids = self._carregar_ids('jogadores')
+        jogadores = [_inteiro(j, 'jogadores') for j in jogo.get('jogadores') or []]
+        celulas = []
+        vistas = set()
+        for tacada in tacadas:
+            if not isinstance(tacada, dict):
+                raise ValueError('Cada tacada deve ser um objeto')
+            jogador_id = _inteiro(tacada.get('jogador_id'), 'jogador_id', obrigatorio=True)
+            pista_id = _inteiro(tacada.get('pista_id'), 'pista_id', obrigatorio=True)
+            numero = _inteiro(tacada.get('numero_tacadas'), 'numero_tacadas', obrigatorio=True)
+            if jogador_id not in jogadores_ids:
+                raise ValueError(f'jogador_id {jogador_id} não existe')
+            if pistas.get(pista_id) != campo_id:
+                raise ValueError(f'pista_id {pista_id} não pertence ao campo {campo_id}')
+            if numero < 1:
+                raise ValueError('numero_tacadas deve ser positivo')
+            if (jogador_id, pista_id) in vistas:
+                raise ValueError(f'Tacada repetida: jogador {jogador_id}, pista {pista_id}')
+            vistas.add((jogador_id, pista_id))
+            if jogador_id not in jogadores:
+                jogadores.append(jogador_id)
+            celulas.append((jogador_id, pista_id, numero, tacada.get('tempo_pista')))
+        for jogador_id in jogadores:
+            if jogador_id not in jogadores_ids:
+                raise ValueError(f'jogador_id {jogador_id} não existe')
+        return jogo_id, campo_id, data_jogo, jogadores, celulas
+
+    def _reservar_jogo(self, ids):
+        """Id para um jogo sem id explícito, sem o inserir sozinho para obter lastrowid.
+
+        A primeira reserva de cada transação lê MAX(id) com FOR UPDATE, que impede
+        inserções concorrentes acima desse id até ao commit ou rollback. Como o
+        AUTO_INCREMENT, os ids seguem o maior já usado (incluindo ids explícitos).
+        """
+        if self._proximo_jogo is None:
+            self.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM jogos FOR UPDATE")
+            self._proximo_jogo = max(self.cursor.fetchone()[0], max(ids, default=0)) + 1
+        while self._proximo_jogo in ids:
+            self._proximo_jogo += 1
+        self._proximo_jogo += 1
+        return self._proximo_jogo - 1
+
+    def _importar_jogos(self, registos):
+        self.cursor.execute("SELECT id, campo_id FROM pistas")
+        pistas = dict(self.cursor.fetchall())
+        jogos_ids = self._carregar_ids('jogos')
+        jogos, participantes, tacadas, linhas_lote, jogos_lote = [], [], [], [], []
+        
+        def gravar():
+            try:
+                for inicio in range(0, len(jogos), self.lote):
+                    self._inserir('jogos', ('id', 'campo_id', 'data_jogo', 'num_jogadores', 'observacoes'),
+                                  jogos[inicio:inicio + self.lote])
+                for inicio in range(0, len(participantes), self.lote):
+                    self._inserir('jogo_participantes',
+                                  ('jogo_id', 'jogador_id', 'ordem_jogador', 'total_tacadas', 'posicao_final'),
+                                  participantes[inicio:inicio + self.lote])
+                for inicio in range(0, len(tacadas), self.lote):
+                    self._inserir('tacadas', ('jogo_id', 'jogador_id', 'pista_id', 'numero_tacadas', 'tempo_pista'),
+                                  tacadas[inicio:inicio + self.lote])
+                self._pontuar(jogos_lote)
+                self.connection.commit()
+                self.resumo['inseridas'] += len(linhas_lote)
+            except Error as e:
+                # Os jogos desta transação são todos desfeitos, e os seus ids voltam a estar livres
+                self.connection.rollback()
+                jogos_ids.difference_update(jogos_lote)
+                for linha in linhas_lote:
+                    self._erro(linha, f'Lote rejeitado: {e}')
+            self._proximo_jogo = None
+            for lista in (jogos, participantes, tacadas, linhas_lote, jogos_lote):
+                lista.clear()
+        
+        for linha, jogo, erro in self._agrupar_jogos(registos):
+            self.resumo['lidas'] += 1
+            if erro:
+                self._erro(linha, erro)
+                continue
+            try:
+                jogo_id, campo_id, data_jogo, jogadores, celulas = self._validar_jogo(jogo, pistas)
+            except ValueError as e:
+                self._erro(linha, str(e))
+                continue
+            
+            if jogo_id is None:
+                jogo_id = self._reservar_jogo(jogos_ids)
+            jogos_ids.add(jogo_id)
+            jogos.append((jogo_id, campo_id, data_jogo, len(jogadores), jogo.get('observacoes')))
+            
+            estado = EstadoJogo(jogadores, sorted({celula[1] for celula in celulas}))
+            for jogador_id, pista_id, numero, tempo in celulas:
+                estado.definir(jogador_id, pista_id, numero)
+                tacadas.append((jogo_id, jogador_id, pista_id, numero, tempo))
+            estado.classificar()
+            participantes.extend((jogo_id, jogador_id, ordem, estado.totais[i], estado.posicoes[i])
+                                 for i, (ordem, jogador_id) in enumerate(enumerate(jogadores, 1)))
+            linhas_lote.append(linha)
+            jogos_lote.append(jogo_id)
+            if len(tacadas) + len(linhas_lote) >= self.por_transacao:
+                gravar()
+        if linhas_lote:
+            gravar()
+
+    def _pontuar(self, jogos):
+        """Totais e posições dos jogos importados pelo modo de pontuação configurado.
+
+        No modo python ficam os de EstadoJogo (os mesmos do motor); nos outros
+        corre CalcularEstatisticasJogo (em verify comparado com o motor), como
+        o recálculo depois das tacadas.
+        """
+        if MOTOR_PONTUACAO_MODO == 'python':
+            return
+        for jogo_id in jogos:
+            if MOTOR_PONTUACAO_MODO == 'verify':
+                motor_pontuacao.verificar(self.cursor, jogo_id)
+            else:
+                self.cursor.callproc('CalcularEstatisticasJogo', [jogo_id])
+                for resultado in self.cursor.stored_results():
+                    resultado.fetchall()
+
+    def _finalizar(self):
+        """Invalidar uma vez, depois do último commit, as versões e os dados derivados
+        (caches, índices, ranking, estatísticas, ratings)"""
+        if not self.resumo['inseridas']:
+            return
+        if self.entidade != 'jogos':
+            table_versions.bump(self.ENTIDADES[self.entidade][0])
+            return
+        table_versions.bump('jogos', 'tacadas')
+        table_versions.bump('jogo_participantes')
+        if JOGADOR_STATS_SOURCE == 'table':
+            estatisticas_jogadores.reconstruir(self.connection)
+        if motor_rating.disponivel:
+            motor_rating.expirar()
+
+def _ficheiro_importacao(corpo, gzip_comprimido):
+    """Texto linha a linha de um corpo binário (opcionalmente gzip)"""
+    if gzip_comprimido:
+        corpo = gzip.GzipFile(fileobj=corpo)
+    return io.TextIOWrapper(corpo, encoding='utf-8-sig', newline='')
+
+@app.route('/api/import/<entidade>', methods=['POST'])
+def importar(entidade):
+    """Importação em massa (CSV ou NDJSON em streaming, ?formato= ou Content-Type)"""
+    if not admin_autorizado():
+        return jsonify({'error': 'Não autorizado'}), 403
+    if entidade not in ImportacaoEmMassa.ENTIDADES and entidade != 'jogos':
+        return jsonify({'error': 'Entidade deve ser cidades, jogadores, campos, pistas ou jogos'}), 404
+    formato = request.args.get('formato') or ('ndjson' if 'ndjson' in (request.content_type or '') else 'csv')
+    if formato not in ('csv', 'ndjson'):
+        return jsonify({'error': 'formato deve ser csv ou ndjson'}), 400
+    
+    # Com Idempotency-Key o corpo já foi lido (e guardado) para a impressão digital
+    corpo = io.BytesIO(request.get_data()) if 'minigolf.idempotency' in request.environ else request.stream
+    linhas = _ficheiro_importacao(corpo, request.headers.get('Content-Encoding') == 'gzip')
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        importacao = ImportacaoEmMassa(connection, entidade)
+        return jsonify(importacao.executar(ler_registos(linhas, formato)))
+    except (ValueError, csv.Error, OSError, zlib.error) as e:
+        connection.rollback()
+        return jsonify({'error': f'Ficheiro inválido: {e}'}), 400
+    except Error as e:
+        connection.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            connection.close()
+
+@app.cli.command('importar')
+@click.argument('entidade', type=click.Choice(['cidades', 'jogadores', 'campos', 'pistas', 'jogos']))
+@click.argument('ficheiro', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(['csv', 'ndjson']), help='Por omissão, pela extensão do ficheiro')
+def importar_cli(entidade, ficheiro, formato):
+    """Importar um ficheiro CSV ou NDJSON (.gz aceite) de cidades, jogadores, campos, pistas ou jogos"""
+    nome = ficheiro[:-3] if ficheiro.endswith('.gz') else ficheiro
+    formato = formato or ('ndjson' if nome.endswith(('.ndjson', '.jsonl')) else 'csv')
+    connection = get_db_connection()
+    if not connection:
+        raise SystemExit('Erro de conexão com a base de dados')
+    try:
+        with open(ficheiro, 'rb') as corpo:
+            resumo = ImportacaoEmMassa(connection, entidade).executar(
+                ler_registos(_ficheiro_importacao(corpo, ficheiro.endswith('.gz')), formato))
+        print(json.dumps(resumo, ensure_ascii=False, indent=2))
+    finally:
+        connection.close()
+
 # ==================== ENDPOINTS DE UTILIDADE ====================
 
 @app.route('/api/health', methods=['GET'])
@@ -610,9 +5436,83 @@ def health_check():
     connection = get_db_connection()
     if connection:
         connection.close()
-        return jsonify({'status': 'OK', 'database': 'Connected'})
+        return jsonify({'status': 'OK', 'database': 'Connected', 'backend': DB_BACKEND, 'pool': db_pool.stats()})
     else:
-        return jsonify({'status': 'ERROR', 'database': 'Disconnected'}), 500
+        return jsonify({'status': 'ERROR', 'database': 'Disconnected', 'backend': DB_BACKEND,
+                        'pool': db_pool.stats()}), 500
+
+@app.route('/api/pool', methods=['GET'])
+def pool_stats():
+    """Estatísticas do pool de conexões deste worker"""
+    return jsonify(db_pool.stats())
+
+@app.route('/api/cache', methods=['GET'])
+def cache_stats():
+    """Contadores da cache de dados de referência deste worker"""
+    stats = reference_cache.stats()
+    stats['shared'] = isinstance(table_versions, SharedTableVersions)
+    stats['idempotencia'] = idempotency_store.stats()
+    return jsonify(stats)
+
+@app.route('/api/recalculo', methods=['GET'])
+def recalculo_stats():
+    """Métricas da fila de recálculo de estatísticas deste worker"""
+    stats = recalculo_estatisticas.stats()
+    stats['motor'] = motor_pontuacao.stats()
+    stats['ranking'] = ranking_jogadores.stats()
+    stats['pubsub'] = pubsub.stats()
+    stats['indice_campos'] = indice_campos.stats()
+    stats['indice_jogadores'] = indice_jogadores.stats()
+    stats['estatisticas_jogadores'] = estatisticas_jogadores.stats()
+    stats['rating'] = motor_rating.stats()
+    stats['dificuldade_pistas'] = dificuldade_pistas.stats()
+    return jsonify(stats)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Métricas por rota no formato de texto do Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+def admin_autorizado():
+    """Endpoints de administração exigem X-Admin-Token; sem ADMIN_TOKEN definido ficam fechados"""
+    return bool(ADMIN_TOKEN) and request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+
+@app.route('/api/admin/consultas-lentas', methods=['GET', 'DELETE'])
+def consultas_lentas():
+    """Top-K das consultas mais lentas deste worker (?ordem=total|max|execucoes)"""
+    if not admin_autorizado():
+        return jsonify({'error': 'Não autorizado'}), 403
+    if not query_profiler.enabled:
+        return jsonify({'error': 'Perfil de consultas desativado (definir SLOW_QUERY_MS)'}), 404
+    if request.method == 'DELETE':
+        query_profiler.reset()
+        return jsonify({'message': 'Registo de consultas lentas limpo'})
+    return jsonify({
+        'limiar_ms': query_profiler.threshold_ms,
+        'consultas': query_profiler.top(request.args.get('limit', type=int), request.args.get('ordem', 'total'))
+    })
+
+@app.route('/api/admin/estatisticas-jogadores/reconstruir', methods=['POST'])
+def reconstruir_estatisticas_jogadores():
+    """Refazer jogador_estatisticas a partir de todo o histórico"""
+    if not admin_autorizado():
+        return jsonify({'error': 'Não autorizado'}), 403
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com a base de dados'}), 500
+    
+    try:
+        total = estatisticas_jogadores.reconstruir(connection)
+        table_versions.bump('jogo_participantes')
+        return jsonify({'jogadores': total, 'message': 'Estatísticas reconstruídas'})
+    except Error as e:
+        connection.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            connection.close()
 
 @app.route('/api/info', methods=['GET'])
 def api_info():
@@ -628,7 +5528,8 @@ def api_info():
             'jogadores': '/api/jogadores',
             'jogos': '/api/jogos',
             'tacadas': '/api/tacadas',
-            'estatisticas': '/api/estatisticas'
+            'estatisticas': '/api/estatisticas',
+            'export': '/api/export'
         }
     })
 
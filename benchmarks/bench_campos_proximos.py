@@ -0,0 +1,59 @@
+"""Micro-benchmark: /api/campos/proximos via árvore k-d vs. varrimento linear.
+
+Gera N campos aleatórios em Portugal continental e mede o tempo médio por
+consulta dos 10 mais próximos, com e sem raio, no IndiceEspacial e numa
+varredura com haversine sobre todos os campos (o que faria um SELECT sem índice).
+
+    python benchmarks/bench_campos_proximos.py [num_campos]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Minigolf import IndiceEspacial
+
+
+def make_campos(n, seed=42):
+    rnd = random.Random(seed)
+    return [
+        {'id': i, 'nome': f'Campo {i}', 'latitude': rnd.uniform(37.0, 42.1), 'longitude': rnd.uniform(-9.5, -6.2)}
+        for i in range(n)
+    ]
+
+
+def linear(indice, campos, lat, lon, k, raio_km=None):
+    distancias = ((indice.distancia_km(lat, lon, c['latitude'], c['longitude']), c) for c in campos)
+    return sorted((d, c['id']) for d, c in distancias if raio_km is None or d <= raio_km)[:k]
+
+
+def bench(label, fn, consultas):
+    start = time.perf_counter()
+    for lat, lon in consultas:
+        fn(lat, lon)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed / len(consultas) * 1e6:9.1f} us/consulta")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    campos = make_campos(n)
+    rnd = random.Random(7)
+    consultas = [(rnd.uniform(37.0, 42.1), rnd.uniform(-9.5, -6.2)) for _ in range(2000)]
+
+    indice = IndiceEspacial()
+    start = time.perf_counter()
+    indice.carregar(campos)
+    print(f"{n} campos, construção do índice: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    bench('k-d, 10 mais próximos', lambda lat, lon: indice.proximos(lat, lon, 10), consultas)
+    bench('k-d, 10 até 25 km', lambda lat, lon: indice.proximos(lat, lon, 10, 25), consultas)
+    amostra = consultas[:50]
+    bench('linear, 10 mais próximos', lambda lat, lon: linear(indice, campos, lat, lon, 10), amostra)
+    bench('linear, 10 até 25 km', lambda lat, lon: linear(indice, campos, lat, lon, 10, 25), amostra)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark: cálculo dos ratings Elo com calcular_ratings (NumPy) vs. ciclo Python.
+
+Gera N jogos sintéticos de 2 a 4 jogadores, escolhidos entre M jogadores com
+uma habilidade escondida (total = 18 pistas x par 3 - habilidade + ruído), e
+mede o débito do motor vetorizado sobre o histórico completo. O ciclo Python
+jogo a jogo corre só sobre uma amostra e é extrapolado. No fim mostra a
+correlação entre rating e habilidade, como verificação de sanidade.
+
+    python benchmarks/bench_rating.py [num_jogos] [num_jogadores]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Minigolf import calcular_ratings
+
+
+def make_history(num_jogos, num_jogadores, seed=42):
+    rng = np.random.default_rng(seed)
+    habilidade = rng.normal(0, 6, num_jogadores)
+    tamanhos = rng.integers(2, 5, num_jogos)
+    jogo = np.repeat(np.arange(num_jogos), tamanhos)
+    # Jogadores distintos dentro de cada jogo: passos positivos cuja soma é menor que M
+    passos = rng.integers(1, num_jogadores // 4, (num_jogos, 4))
+    passos[:, 0] = rng.integers(0, num_jogadores, num_jogos)
+    escolhidos = np.cumsum(passos, axis=1) % num_jogadores
+    jogador = escolhidos[np.arange(4) < tamanhos[:, None]]
+    total = np.rint(54 - habilidade[jogador] + rng.normal(0, 4, len(jogador))).astype(np.int64)
+    return jogo, jogador, total, habilidade
+
+
+def python_loop(jogo, jogador, total, num_jogadores, k=32.0, inicial=1500.0):
+    ratings = [inicial] * num_jogadores
+    inicio = 0
+    n = len(jogo)
+    while inicio < n:
+        fim = inicio
+        while fim < n and jogo[fim] == jogo[inicio]:
+            fim += 1
+        jogadores = jogador[inicio:fim].tolist()
+        totais = total[inicio:fim].tolist()
+        antes = [ratings[j] for j in jogadores]
+        for i, j in enumerate(jogadores):
+            soma = 0.0
+            for o in range(len(jogadores)):
+                if o != i:
+                    esperado = 1.0 / (1.0 + 10.0 ** ((antes[o] - antes[i]) / 400.0))
+                    soma += (1.0 if totais[i] < totais[o] else 0.5 if totais[i] == totais[o] else 0.0) - esperado
+            ratings[j] += soma * k / (len(jogadores) - 1)
+        inicio = fim
+    return ratings
+
+
+def main():
+    num_jogos = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    num_jogadores = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    jogo, jogador, total, habilidade = make_history(num_jogos, num_jogadores)
+    print(f"{num_jogos} jogos, {len(jogo)} participações, {num_jogadores} jogadores")
+
+    start = time.perf_counter()
+    ratings, contagem, passagens, _ = calcular_ratings(jogo, jogador, total, num_jogadores)
+    elapsed = time.perf_counter() - start
+    print(f"{'numpy':<12} {elapsed:8.2f} s  {num_jogos / elapsed:12,.0f} jogos/s  ({passagens} passagens)")
+
+    amostra = min(num_jogos, 50_000)
+    corte = np.searchsorted(jogo, amostra)
+    start = time.perf_counter()
+    referencia = python_loop(jogo[:corte], jogador[:corte], total[:corte], num_jogadores)
+    elapsed_py = (time.perf_counter() - start) * num_jogos / amostra
+    print(f"{'python':<12} {elapsed_py:8.2f} s  {num_jogos / elapsed_py:12,.0f} jogos/s  (extrapolado de {amostra} jogos)")
+
+    parcial, _, _, _ = calcular_ratings(jogo[:corte], jogador[:corte], total[:corte], num_jogadores)
+    print(f"diferença máxima numpy/python na amostra: {np.abs(parcial - np.array(referencia)).max():.2e}")
+    jogou = contagem > 0
+    print(f"correlação rating/habilidade: {np.corrcoef(ratings[jogou], habilidade[jogou])[0, 1]:.3f}")
+
+
+if __name__ == '__main__':
+    main()
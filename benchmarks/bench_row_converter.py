@@ -0,0 +1,105 @@
+"""Micro-benchmark: dict_factory por linha vs. row_converter por resultado.
+
+Simula resultados de 100k linhas com as colunas de /api/jogos (inteiros,
+texto, DATETIME, DECIMAL e TIME) e de /api/jogadores (só inteiros e texto) e
+mede o tempo de conversão em dicionários.
+
+    python benchmarks/bench_row_converter.py [num_linhas]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mysql.connector.constants import FieldType
+
+from Minigolf import dict_factory, row_converter
+
+
+class FakeCursor:
+    """Cursor com description no formato do mysql.connector"""
+
+    def __init__(self, columns):
+        self.description = [(name, type_code, None, None, None, None, True, 0, 63) for name, type_code in columns]
+
+
+
+COLUMNS_JOGOS = [
+    ('id', FieldType.LONG),
+    ('campo_id', FieldType.LONG),
+    ('data_jogo', FieldType.DATETIME),
+    ('num_jogadores', FieldType.TINY),
+    ('duracao', FieldType.TIME),
+    ('preco', FieldType.NEWDECIMAL),
+    ('observacoes', FieldType.VAR_STRING),
+    ('campo_nome', FieldType.VAR_STRING),
+    ('cidade_nome', FieldType.VAR_STRING),
+]
+
+COLUMNS_JOGADORES = [
+    ('id', FieldType.LONG),
+    ('nome', FieldType.VAR_STRING),
+    ('email', FieldType.VAR_STRING),
+    ('telefone', FieldType.VAR_STRING),
+    ('cidade_id', FieldType.LONG),
+    ('avatar_url', FieldType.VAR_STRING),
+    ('cidade_nome', FieldType.VAR_STRING),
+]
+
+
+def make_rows_jogos(n):
+    base = datetime(2024, 1, 1, 10, 0, 0)
+    return [
+        (i, i % 50, base + timedelta(minutes=i), 4, timedelta(minutes=45 + i % 30),
+         Decimal('7.50'), None if i % 3 else 'Jogo de torneio', 'Campo do Parque', 'Lisboa')
+        for i in range(n)
+    ]
+
+
+def make_rows_jogadores(n):
+    return [
+        (i, f'Jogador {i}', f'jogador{i}@exemplo.pt', None, i % 20, None, 'Porto')
+        for i in range(n)
+    ]
+
+
+def bench(label, fn, repeat=5):
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{label:<32} {best * 1000:9.1f} ms")
+    return best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(label, columns, rows):
+    cursor = FakeCursor(columns)
+
+    def legacy():
+        return [dict_factory(cursor, row) for row in rows]
+
+    def compiled():
+        convert = row_converter(cursor)
+        return [convert(row) for row in rows]
+
+    assert legacy() == compiled()
+    print(f"{label}: {len(rows)} linhas, {len(columns)} colunas")
+    t_legacy = bench('  dict_factory (por linha)', legacy)
+    t_compiled = bench('  row_converter (por consulta)', compiled)
+    print(f"  speedup: {t_legacy / t_compiled:.2f}x")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    run('jogos', COLUMNS_JOGOS, make_rows_jogos(n))
+    run('jogadores', COLUMNS_JOGADORES, make_rows_jogadores(n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+"""Teste de carga de um dia de torneio.
+
+Cria N jogos em simultâneo (POST /api/jogos), envia tacadas para
+/api/tacadas a um ritmo configurável e põe espectadores a consultar
+/api/jogos/<id> e o ranking. No fim mostra, por rota, o débito e as latências
+p50/p95/p99 e grava os resultados em JSON para comparar entre execuções.
+
+Por omissão a app Flask corre no próprio processo com DB_BACKEND=sqlite numa
+base de dados temporária; com --url o teste corre contra um servidor em
+execução (usar uma base de dados de teste: são criados cidades, campos,
+jogadores e jogos).
+
+    python benchmarks/loadtest.py --jogos 20 --ritmo 50 --espectadores 10 --duracao 30
+    python benchmarks/loadtest.py --comparar benchmarks/results/anterior.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+
+class InProcessClient:
+    """Cliente sobre o test_client do Flask (um por thread)"""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self._client.open(path, method=method, json=body)
+        data = response.get_data()
+        return response.status_code, json.loads(data) if data else None
+
+
+class HttpClient:
+    """Cliente HTTP com conexão persistente (um por thread)"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self._prefix = parts.path.rstrip('/')
+        self._connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload else {}
+        try:
+            self._connection.request(method, self._prefix + path, payload, headers)
+            response = self._connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self._connection.close()
+            raise
+        return response.status, json.loads(data) if data else None
+
+
+class Recorder:
+    """Latências por rota (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.erros = defaultdict(int)
+        self.respostas_4xx = defaultdict(int)
+
+    def call(self, client, route, method, path, body=None):
+        start = time.perf_counter()
+        try:
+            status, data = client.request(method, path, body)
+        except Exception:
+            status, data = None, None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencias[route].append(elapsed)
+            if status is None or status >= 500:
+                self.erros[route] += 1
+            elif status >= 400:
+                self.respostas_4xx[route] += 1
+        return status, data
+
+
+def percentil(ordenados, p):
+    """Percentil pelo método nearest-rank"""
+    if not ordenados:
+        return None
+    k = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[k]
+
+
+def resumo(recorder, duracao, duracoes=None):
+    """Estatísticas por rota; `duracoes` dá a duração própria de rotas fora da fase principal"""
+    rotas = {}
+    for route, latencias in sorted(recorder.latencias.items()):
+        ordenados = sorted(latencias)
+        rotas[route] = {
+            'pedidos': len(ordenados),
+            'erros': recorder.erros[route],
+            'respostas_4xx': recorder.respostas_4xx[route],
+            'debito_rps': round(len(ordenados) / (duracoes or {}).get(route, duracao), 2),
+            'media_ms': round(sum(ordenados) * 1000 / len(ordenados), 3),
+            'p50_ms': round(percentil(ordenados, 50) * 1000, 3),
+            'p95_ms': round(percentil(ordenados, 95) * 1000, 3),
+            'p99_ms': round(percentil(ordenados, 99) * 1000, 3),
+            'max_ms': round(ordenados[-1] * 1000, 3),
+        }
+    return rotas
+
+
+def preparar(client, args):
+    """Criar cidade, campo com pistas e jogadores através da API"""
+    status, data = client.request('POST', '/api/cidades', {'nome': 'Loadtest', 'distrito': 'Lisboa'})
+    if status != 201:
+        raise SystemExit(f'Falha ao criar cidade ({status}): {data}')
+    cidade_id = data['id']
+    status, data = client.request('POST', '/api/campos', {
+        'nome': f'Campo loadtest {int(time.time())}', 'cidade_id': cidade_id, 'tipo': 'minigolfe',
+        'latitude': 38.72, 'longitude': -9.14
+    })
+    if status != 201:
+        raise SystemExit(f'Falha ao criar campo ({status}): {data}')
+    campo_id = data['id']
+    pistas = []
+    for numero in range(1, args.pistas + 1):
+        status, data = client.request('POST', '/api/pistas', {
+            'campo_id': campo_id, 'numero_pista': numero, 'par': random.choice((2, 3, 3, 4)),
+            'dificuldade': random.choice(('facil', 'medio', 'dificil'))
+        })
+        if status != 201:
+            raise SystemExit(f'Falha ao criar pista ({status}): {data}')
+        pistas.append(data['id'])
+    jogadores = []
+    for numero in range(args.jogos * args.jogadores):
+        status, data = client.request('POST', '/api/jogadores', {
+            'nome': f'Jogador {numero + 1}', 'cidade_id': cidade_id
+        })
+        if status != 201:
+            raise SystemExit(f'Falha ao criar jogador ({status}): {data}')
+        jogadores.append(data['id'])
+    return campo_id, pistas, jogadores
+
+
+def criar_jogos(make_client, recorder, args, campo_id, jogadores):
+    """Criar os jogos em simultâneo, um por thread"""
+    jogos = [None] * args.jogos
+
+    def criar(i):
+        participantes = jogadores[i * args.jogadores:(i + 1) * args.jogadores]
+        status, data = recorder.call(make_client(), 'POST /api/jogos', 'POST', '/api/jogos',
+                                     {'campo_id': campo_id, 'jogadores': participantes})
+        if status == 201:
+            jogos[i] = (data['id'], participantes)
+
+    threads = [threading.Thread(target=criar, args=(i,)) for i in range(args.jogos)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [jogo for jogo in jogos if jogo is not None]
+
+
+def plano_tacadas(jogos, pistas):
+    """Tacadas por ordem de jogo: pista a pista, todos os jogos intercalados"""
+    for pista_id in pistas:
+        for jogador_ordem in range(max(len(p) for _, p in jogos)):
+            for jogo_id, participantes in jogos:
+                if jogador_ordem < len(participantes):
+                    yield jogo_id, participantes[jogador_ordem], pista_id
+
+
+def executar(args):
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        os.environ['DB_BACKEND'] = 'sqlite'
+        os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='minigolf-loadtest-'), 'minigolf.db')
+        import Minigolf
+        make_client = lambda: InProcessClient(Minigolf.app)
+
+    recorder = Recorder()
+    campo_id, pistas, jogadores = preparar(make_client(), args)
+    inicio_jogos = time.perf_counter()
+    jogos = criar_jogos(make_client, recorder, args, campo_id, jogadores)
+    duracao_jogos = time.perf_counter() - inicio_jogos
+    if not jogos:
+        raise SystemExit('Nenhum jogo criado')
+
+    plano = plano_tacadas(jogos, pistas)
+    plano_lock = threading.Lock()
+    parar = threading.Event()
+    inicio = time.perf_counter()
+    enviadas = [0]
+
+    def jogador_thread():
+        client = make_client()
+        while not parar.is_set():
+            with plano_lock:
+                tacada = next(plano, None)
+                k = enviadas[0]
+                enviadas[0] += 1
+            if tacada is None:
+                return
+            # Ritmo global: a tacada k sai em inicio + k / ritmo
+            espera = inicio + k / args.ritmo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            jogo_id, jogador_id, pista_id = tacada
+            recorder.call(client, 'POST /api/tacadas', 'POST', '/api/tacadas', {
+                'jogo_id': jogo_id, 'jogador_id': jogador_id, 'pista_id': pista_id,
+                'numero_tacadas': random.choices((1, 2, 3, 4, 5, 6), (10, 30, 30, 15, 10, 5))[0]
+            })
+
+    def espectador_thread():
+        client = make_client()
+        while not parar.is_set():
+            acao = random.random()
+            if acao < 0.7:
+                jogo_id = random.choice(jogos)[0]
+                recorder.call(client, 'GET /api/jogos/<id>', 'GET', f'/api/jogos/{jogo_id}')
+            elif acao < 0.85:
+                recorder.call(client, 'GET /api/estatisticas/jogadores', 'GET', '/api/estatisticas/jogadores')
+            else:
+                jogador_id = random.choice(jogadores)
+                recorder.call(client, 'GET /api/estatisticas/jogadores/<id>/posicao', 'GET',
+                              f'/api/estatisticas/jogadores/{jogador_id}/posicao?raio=2')
+            time.sleep(args.intervalo_espectador)
+
+    threads = [threading.Thread(target=jogador_thread) for _ in range(args.threads_tacadas)]
+    threads += [threading.Thread(target=espectador_thread, daemon=True) for _ in range(args.espectadores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads[:args.threads_tacadas]:
+        thread.join(max(0, args.duracao - (time.perf_counter() - inicio)))
+    parar.set()
+    for thread in threads:
+        thread.join(5)
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'config': vars(args),
+        'ambiente': ambiente(),
+        'jogos_criados': len(jogos),
+        'tacadas_enviadas': len(recorder.latencias.get('POST /api/tacadas', ())),
+        'duracao_s': round(duracao, 3),
+        'rotas': resumo(recorder, duracao, {'POST /api/jogos': duracao_jogos}),
+    }
+
+
+def ambiente():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'SCORING_ENGINE': os.getenv('SCORING_ENGINE'),
+        'RANKING_SOURCE': os.getenv('RANKING_SOURCE'),
+        'DB_BACKEND': os.getenv('DB_BACKEND'),
+    }
+
+
+def mostrar(resultados, anterior=None):
+    print(f"{resultados['jogos_criados']} jogos, {resultados['tacadas_enviadas']} tacadas "
+          f"em {resultados['duracao_s']} s")
+    print(f"{'rota':<48} {'pedidos':>8} {'erros':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, r in resultados['rotas'].items():
+        linha = (f"{route:<48} {r['pedidos']:>8} {r['erros']:>6} {r['debito_rps']:>8} "
+                 f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+        antes = (anterior or {}).get('rotas', {}).get(route)
+        if antes:
+            delta = (r['p95_ms'] - antes['p95_ms']) / antes['p95_ms'] * 100 if antes['p95_ms'] else 0.0
+            linha += f"  (p95 {delta:+.1f}% vs {antes['p95_ms']} ms)"
+        print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='servidor a testar (por omissão: app no processo com SQLite)')
+    parser.add_argument('--jogos', type=int, default=20, help='jogos em simultâneo')
+    parser.add_argument('--jogadores', type=int, default=4, help='jogadores por jogo')
+    parser.add_argument('--pistas', type=int, default=18)
+    parser.add_argument('--ritmo', type=float, default=50, help='tacadas por segundo (total)')
+    parser.add_argument('--threads-tacadas', type=int, default=8)
+    parser.add_argument('--espectadores', type=int, default=10)
+    parser.add_argument('--intervalo-espectador', type=float, default=0.2, help='segundos entre pedidos')
+    parser.add_argument('--duracao', type=float, default=30, help='duração máxima em segundos')
+    parser.add_argument('--saida', help='ficheiro JSON (por omissão benchmarks/results/loadtest-<data>.json)')
+    parser.add_argument('--comparar', help='resultados JSON de uma execução anterior')
+    args = parser.parse_args()
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar) as f:
+            anterior = json.load(f)
+
+    resultados = executar(args)
+    mostrar(resultados, anterior)
+
+    saida = args.saida or os.path.join(
+        BENCH_DIR, 'results', f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(saida), exist_ok=True)
+    with open(saida, 'w') as f:
+        json.dump(resultados, f, indent=2)
+    print(f"Resultados gravados em {saida}")
+
+
+if __name__ == '__main__':
+    main()
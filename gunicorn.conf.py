@@ -0,0 +1,56 @@
+# Configuração do gunicorn
+# Cada worker tem o seu próprio pool de DB_POOL_SIZE conexões, portanto o total
+# de conexões abertas à base de dados é workers * DB_POOL_SIZE. Definindo
+# DB_MAX_CONNECTIONS, o tamanho do pool é calculado automaticamente.
+import os
+import tempfile
+
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+
+# Cada espectador de /api/jogos/<id>/stream fica ligado enquanto vê o jogo. Com
+# workers gevent (por omissão) cada espectador é um greenlet e não uma thread:
+# cada worker aceita SSE_MAX_SUBSCRIBERS espectadores (500 por omissão, no máximo
+# metade de worker_connections, para sobrarem ligações para a API), ou seja
+# workers * SSE_MAX_SUBSCRIBERS no total; os restantes recebem 503. O driver
+# MySQL corre em Python puro (DB_USE_PURE) para as consultas não bloquearem o worker.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Com workers de threads cada espectador ocupa uma thread: ficam limitados a
+# metade das threads de cada worker (por omissão; nunca todas), ou seja só
+# threads // 2 espectadores por worker. Workers sync não servem streams.
+if worker_class == 'gevent':
+    os.environ.setdefault('DB_USE_PURE', '1')
+    os.environ['SSE_MAX_SUBSCRIBERS'] = str(min(int(os.getenv('SSE_MAX_SUBSCRIBERS', 500)),
+                                                worker_connections // 2))
+elif worker_class == 'gthread':
+    os.environ['SSE_MAX_SUBSCRIBERS'] = str(min(int(os.getenv('SSE_MAX_SUBSCRIBERS', threads // 2)),
+                                                threads - 1))
+elif worker_class == 'sync':
+    os.environ['SSE_MAX_SUBSCRIBERS'] = '0'
+
+# Estado partilhado pelos workers do mesmo host, por omissão em memória (/dev/shm)
+partilhado = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+# Versões das tabelas partilhadas pelos workers (ETags e 304 coerentes entre eles)
+os.environ.setdefault('CACHE_SHARED_FILE', os.path.join(partilhado, f"minigolf-versoes-{os.getenv('PORT', 5000)}"))
+
+# Com mais de um worker as Idempotency-Key têm de ser visíveis a todos: uma
+# repetição atendida por outro worker criaria um segundo jogo
+if workers > 1:
+    os.environ.setdefault('IDEMPOTENCY_DIR', os.path.join(partilhado, f"minigolf-idempotencia-{os.getenv('PORT', 5000)}"))
+    if not os.environ['IDEMPOTENCY_DIR']:
+        raise RuntimeError('IDEMPOTENCY_DIR é obrigatório com mais de um worker')
+    # Os espectadores de um worker recebem as tacadas gravadas noutro
+    os.environ.setdefault('PUBSUB_SOCKET_DIR', os.path.join(partilhado, f"minigolf-pubsub-{os.getenv('PORT', 5000)}"))
+
+def post_worker_init(worker):
+    """Pré-aquecer o pool de conexões (e o ranking e os ratings em memória) no arranque de cada worker"""
+    import Minigolf
+    Minigolf.db_pool.prewarm()
+    if Minigolf.RANKING_SOURCE == 'memory':
+        Minigolf.ranking_jogadores.garantir_atual()
+    if Minigolf.motor_rating.disponivel:
+        Minigolf.motor_rating.iniciar()
@@ -0,0 +1,59 @@
+"""Fixtures comuns: a aplicação sobre uma base de dados SQLite nova em cada teste."""
+import os
+import sys
+import tempfile
+
+# O backend e o caminho são lidos na importação do módulo
+os.environ.setdefault('DB_BACKEND', 'sqlite')
+os.environ.setdefault('SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='minigolf-testes-'), 'minigolf.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import Minigolf
+
+TABELAS = ('cidades', 'campos', 'pistas', 'jogadores', 'jogos', 'jogo_participantes', 'tacadas')
+
+
+@pytest.fixture
+def minigolf(tmp_path, monkeypatch):
+    """Módulo Minigolf com um pool para uma base de dados vazia e recálculos síncronos"""
+    path = str(tmp_path / 'minigolf.db')
+    Minigolf.inicializar_sqlite(path)
+    pool = Minigolf.ConnectionPool({'path': path}, connect=Minigolf.SQLiteConnection, size=4, timeout=5)
+    monkeypatch.setattr(Minigolf, 'db_pool', pool)
+    monkeypatch.setattr(Minigolf.recalculo_estatisticas, 'delay', 0)
+    # Índices e caches em memória de testes anteriores ficam desatualizados
+    Minigolf.table_versions.bump(*TABELAS)
+    Minigolf.reference_cache.clear()
+    yield Minigolf
+    for connection, _, _ in pool._idle:
+        connection.close()
+
+
+@pytest.fixture
+def client(minigolf):
+    return minigolf.app.test_client()
+
+
+def criar(client, url, dados):
+    response = client.post(url, json=dados)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['id']
+
+
+@pytest.fixture
+def jogo(client):
+    """Um campo com três pistas e um jogo com três jogadores (ainda sem tacadas)"""
+    cidade = criar(client, '/api/cidades', {'nome': 'Lisboa', 'distrito': 'Lisboa'})
+    campo = criar(client, '/api/campos', {'nome': 'Campo', 'cidade_id': cidade, 'tipo': 'minigolfe'})
+    pistas = [criar(client, '/api/pistas', {'campo_id': campo, 'numero_pista': n, 'par': 3}) for n in (1, 2, 3)]
+    jogadores = [criar(client, '/api/jogadores', {'nome': nome}) for nome in ('Ana', 'Rui', 'Eva')]
+    jogo_id = criar(client, '/api/jogos', {'campo_id': campo, 'jogadores': jogadores})
+    return {'cidade': cidade, 'campo': campo, 'pistas': pistas, 'jogadores': jogadores, 'id': jogo_id}
+
+
+def tacada(client, jogo, jogador_id, pista_id, numero):
+    response = client.post('/api/tacadas', json={'jogo_id': jogo['id'], 'jogador_id': jogador_id,
+                                                 'pista_id': pista_id, 'numero_tacadas': numero})
+    assert response.status_code == 201, response.get_json()
@@ -0,0 +1,52 @@
+from conftest import criar
+
+
+def nomes(response):
+    return [linha['nome'] for linha in response.get_json()]
+
+
+def test_listagem_servida_da_cache_ate_haver_escrita(client, minigolf):
+    cache = minigolf.reference_cache
+    criar(client, '/api/cidades', {'nome': 'Faro', 'distrito': 'Faro'})
+    assert nomes(client.get('/api/cidades')) == ['Faro']
+    hits = cache.stats()['hits']
+    assert nomes(client.get('/api/cidades')) == ['Faro']
+    assert cache.stats()['hits'] == hits + 1
+
+    # A escrita incrementa a versão: a entrada antiga deixa de servir
+    criar(client, '/api/cidades', {'nome': 'Beja', 'distrito': 'Beja'})
+    stale = cache.stats()['stale']
+    assert nomes(client.get('/api/cidades')) == ['Beja', 'Faro']
+    assert cache.stats()['stale'] == stale + 1
+
+
+def test_cache_por_parametros_e_dependencias(client, jogo, minigolf):
+    campo = jogo['campo']
+    assert len(client.get(f'/api/campos/{campo}').get_json()['pistas']) == 3
+    assert [p['numero_pista'] for p in client.get(f'/api/campos/{campo}/pistas').get_json()] == [1, 2, 3]
+
+    # Uma pista nova invalida o detalhe do campo e a lista de pistas
+    criar(client, '/api/pistas', {'campo_id': campo, 'numero_pista': 4, 'par': 2})
+    assert len(client.get(f'/api/campos/{campo}').get_json()['pistas']) == 4
+    assert [p['numero_pista'] for p in client.get(f'/api/campos/{campo}/pistas').get_json()] == [1, 2, 3, 4]
+
+    # Parâmetros diferentes são entradas diferentes
+    criar(client, '/api/cidades', {'nome': 'Faro', 'distrito': 'Faro'})
+    assert len(client.get('/api/cidades?limit=1').get_json()) == 1
+    assert len(client.get('/api/cidades').get_json()) == 2
+
+
+def test_escrita_sem_versao_fica_na_cache_ate_ao_ttl(client, minigolf, monkeypatch):
+    criar(client, '/api/cidades', {'nome': 'Faro', 'distrito': 'Faro'})
+    assert nomes(client.get('/api/cidades')) == ['Faro']
+    connection = minigolf.get_db_connection()
+    try:
+        connection.cursor().execute("INSERT INTO cidades (nome, distrito) VALUES ('Beja', 'Beja')")
+        connection.commit()
+    finally:
+        connection.close()
+    # Escrita feita fora da aplicação: a cache não a vê
+    assert nomes(client.get('/api/cidades')) == ['Faro']
+    monkeypatch.setattr(minigolf.reference_cache, 'ttl', 0)
+    minigolf.reference_cache.clear()
+    assert nomes(client.get('/api/cidades')) == ['Beja', 'Faro']
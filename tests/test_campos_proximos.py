@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from Minigolf import IndiceEspacial
+from conftest import criar
+
+
+@pytest.fixture
+def campos():
+    aleatorio = random.Random(5)
+    # Concentrados em Portugal continental, mais alguns espalhados pelo globo
+    campos = [{'id': i, 'latitude': aleatorio.uniform(37.0, 42.0), 'longitude': aleatorio.uniform(-9.5, -6.2)}
+              for i in range(450)]
+    campos += [{'id': i, 'latitude': aleatorio.uniform(-89.0, 89.0), 'longitude': aleatorio.uniform(-180.0, 180.0)}
+               for i in range(450, 500)]
+    return campos
+
+
+def forca_bruta(indice, campos, lat, lon, k, raio_km=None):
+    distancias = sorted((indice.distancia_km(lat, lon, c['latitude'], c['longitude']), c['id']) for c in campos)
+    if raio_km is not None:
+        distancias = [(d, i) for d, i in distancias if d <= raio_km]
+    return [i for _, i in distancias[:k]]
+
+
+def test_arvore_kd_igual_a_forca_bruta(campos):
+    indice = IndiceEspacial()
+    indice.carregar(campos, versao=1)
+    aleatorio = random.Random(8)
+    for _ in range(200):
+        lat, lon = aleatorio.uniform(36.0, 43.0), aleatorio.uniform(-10.0, -5.0)
+        k = aleatorio.choice((1, 5, 20))
+        raio_km = aleatorio.choice((None, 10.0, 50.0, 200.0))
+        resultado = indice.proximos(lat, lon, k, raio_km)
+        assert [c['id'] for c in resultado] == forca_bruta(indice, campos, lat, lon, k, raio_km)
+        assert all(a['distancia_km'] <= b['distancia_km'] for a, b in zip(resultado, resultado[1:]))
+
+
+def test_arvore_kd_antimeridiano_e_polos(campos):
+    indice = IndiceEspacial()
+    indice.carregar(campos, versao=1)
+    for lat, lon in ((0.0, 179.9), (0.0, -179.9), (89.9, 0.0), (-89.9, 45.0)):
+        assert [c['id'] for c in indice.proximos(lat, lon, 3)] == forca_bruta(indice, campos, lat, lon, 3)
+
+
+def test_arvore_kd_vazia_e_sem_coordenadas():
+    indice = IndiceEspacial()
+    indice.carregar([{'id': 1, 'latitude': None, 'longitude': None}])
+    assert indice.proximos(38.7, -9.1, 5) == []
+    assert indice.stats()['campos'] == 0
+
+
+def test_rota_campos_proximos(client):
+    cidade = criar(client, '/api/cidades', {'nome': 'Porto', 'distrito': 'Porto'})
+    for nome, lat, lon in (('Foz', 41.15, -8.67), ('Gaia', 41.12, -8.61), ('Braga', 41.55, -8.42)):
+        criar(client, '/api/campos', {'nome': nome, 'cidade_id': cidade, 'tipo': 'minigolfe',
+                                      'latitude': lat, 'longitude': lon})
+
+    response = client.get('/api/campos/proximos?lat=41.14&lon=-8.61&limit=2')
+    assert response.status_code == 200
+    assert [c['nome'] for c in response.get_json()] == ['Gaia', 'Foz']
+    assert response.get_json()[0]['cidade_nome'] == 'Porto'
+
+    response = client.get('/api/campos/proximos?lat=41.14&lon=-8.61&raio_km=10')
+    assert [c['nome'] for c in response.get_json()] == ['Gaia', 'Foz']
+
+    # Um campo novo invalida o índice
+    criar(client, '/api/campos', {'nome': 'Ribeira', 'cidade_id': cidade, 'tipo': 'minigolfe',
+                                  'latitude': 41.14, 'longitude': -8.612})
+    assert client.get('/api/campos/proximos?lat=41.14&lon=-8.61&limit=1').get_json()[0]['nome'] == 'Ribeira'
+
+
+@pytest.mark.parametrize('query', ['', 'lat=41', 'lat=a&lon=1', 'lat=91&lon=0', 'lat=0&lon=181',
+                                   'lat=0&lon=0&raio_km=0'])
+def test_rota_campos_proximos_parametros_invalidos(client, query):
+    assert client.get(f'/api/campos/proximos?{query}').status_code == 400
@@ -0,0 +1,32 @@
+from conftest import tacada
+
+
+def test_cartao_compacto(client, jogo):
+    ana, rui, eva = jogo['jogadores']
+    p1, p2, p3 = jogo['pistas']
+    for jogador_id, pista_id, numero in [(ana, p1, 2), (ana, p3, 4), (rui, p2, 3)]:
+        tacada(client, jogo, jogador_id, pista_id, numero)
+
+    response = client.get(f"/api/jogos/{jogo['id']}?formato=compacto")
+    assert response.status_code == 200
+    assert response.headers['Vary'] == 'Accept'
+    cartao = response.get_json()
+    assert [j['id'] for j in cartao['jogadores']] == [ana, rui, eva]
+    assert [p['id'] for p in cartao['pistas']] == [p1, p2, p3]
+    assert cartao['tacadas'] == [[2, 0, 4], [0, 3, 0], [0, 0, 0]]
+    assert [j['total_tacadas'] for j in cartao['jogadores']] == [6, 3, 0]
+
+    # O mesmo cartão pedido por Accept
+    response = client.get(f"/api/jogos/{jogo['id']}",
+                          headers={'Accept': 'application/vnd.minigolf.scorecard+json'})
+    assert response.get_json() == cartao
+
+
+def test_resposta_completa_tambem_varia_com_accept(client, jogo):
+    response = client.get(f"/api/jogos/{jogo['id']}")
+    assert response.headers['Vary'] == 'Accept'
+    assert 'participantes' in response.get_json()
+
+
+def test_cartao_de_jogo_inexistente(client):
+    assert client.get('/api/jogos/9999?formato=compacto').status_code == 404
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+TOKEN = {'X-Admin-Token': 'segredo'}
+
+
+@pytest.fixture
+def profiler(minigolf, monkeypatch):
+    monkeypatch.setattr(minigolf, 'ADMIN_TOKEN', 'segredo')
+    profiler = minigolf.QueryProfiler(threshold_ms=0)
+    monkeypatch.setattr(minigolf, 'query_profiler', profiler)
+    return profiler
+
+
+def test_normalizacao():
+    from Minigolf import QueryProfiler
+    assert QueryProfiler.normalize("SELECT * FROM jogos\n  WHERE id = 42 AND nome = 'Ana'") == \
+        'SELECT * FROM jogos WHERE id = ? AND nome = ?'
+    assert QueryProfiler.normalize('INSERT INTO t VALUES (%s, %s), (%s, %s)') == 'INSERT INTO t VALUES (...)'
+    assert QueryProfiler.normalize('SELECT 1 FROM t WHERE id IN (%s, %s, %s)') == \
+        QueryProfiler.normalize('SELECT 1 FROM t WHERE id IN (%s)')
+    assert QueryProfiler.params_shape([1, 'a', None]) == ['int', 'str', 'NoneType']
+    assert QueryProfiler.params_shape(list(range(10))) == '10 x int'
+
+
+def test_consultas_agrupadas_por_instrucao_com_explain(client, profiler):
+    for cidade_id in (1, 2, 3):
+        client.get(f'/api/campos/{cidade_id}')
+
+    consultas = client.get('/api/admin/consultas-lentas?ordem=execucoes', headers=TOKEN).get_json()['consultas']
+    campo = next(c for c in consultas if c['rota'] == '/api/campos/<int:campo_id>')
+    assert campo['execucoes'] == 3
+    assert '%s' not in campo['sql'] and campo['params'] == ['int']
+    assert campo['tempo_medio_ms'] <= campo['tempo_max_ms'] <= campo['tempo_total_ms']
+
+    # O EXPLAIN corre numa thread própria, uma vez por instrução
+    limite = time.monotonic() + 5
+    while profiler.top(ordem='execucoes')[0]['plano'] is None and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert isinstance(profiler.top(ordem='execucoes')[0]['plano'], list)
+
+    assert client.delete('/api/admin/consultas-lentas', headers=TOKEN).status_code == 200
+    assert profiler.top() == []
+
+
+def test_acesso(client, minigolf, monkeypatch):
+    assert client.get('/api/admin/consultas-lentas').status_code == 403
+    monkeypatch.setattr(minigolf, 'ADMIN_TOKEN', 'segredo')
+    # Sem SLOW_QUERY_MS o registo está desligado
+    assert client.get('/api/admin/consultas-lentas', headers=TOKEN).status_code == 404
@@ -0,0 +1,25 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from Minigolf import serialize_data
+
+
+def test_serialize_data():
+    assert serialize_data(timedelta(hours=1, minutes=2, seconds=3)) == '01:02:03'
+    assert serialize_data(timedelta(days=1, seconds=5)) == '24:00:05'
+    assert serialize_data(datetime(2024, 5, 1, 10, 30)) == '2024-05-01T10:30:00'
+    assert serialize_data(date(2024, 5, 1)) == '2024-05-01'
+    assert serialize_data(Decimal('2.50')) == 2.5
+    assert serialize_data(b'abc') == 'abc'
+
+
+def test_detalhe_e_lista_formatam_igual(client, jogo):
+    detalhe = client.get(f"/api/jogos/{jogo['id']}").get_json()
+    lista = {j['id']: j for j in client.get('/api/jogos').get_json()}
+    assert detalhe['data_jogo'] == lista[jogo['id']]['data_jogo']
+
+    campo = client.get(f"/api/campos/{jogo['campo']}").get_json()
+    assert campo['cidade_nome'] == 'Lisboa'
+    assert [p['numero_pista'] for p in campo['pistas']] == [1, 2, 3]
+    assert client.get('/api/campos/9999').status_code == 404
+    assert client.get('/api/jogos/9999').status_code == 404
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from conftest import criar, tacada
+
+TOKEN = {'X-Admin-Token': 'segredo'}
+
+
+@pytest.fixture
+def tabela(minigolf, monkeypatch):
+    """Estatísticas lidas de jogador_estatisticas, mantida pelo listener (pedir antes de jogo)"""
+    estatisticas = minigolf.EstatisticasJogadores()
+    monkeypatch.setattr(minigolf, 'estatisticas_jogadores', estatisticas)
+    monkeypatch.setattr(minigolf, 'JOGADOR_STATS_SOURCE', 'table')
+    monkeypatch.setattr(minigolf, 'participantes_listeners',
+                        minigolf.participantes_listeners + [estatisticas.atualizar])
+    return estatisticas
+
+
+def verificar(client, jogador_id):
+    resultado = client.get(f'/api/estatisticas/jogador/{jogador_id}/verificar').get_json()
+    assert resultado['ok'], resultado['divergencias']
+
+
+def test_deltas_por_jogo_iguais_ao_historico(client, tabela, jogo):
+    ana, rui, eva = jogo['jogadores']
+    jogos = [jogo] + [{'id': criar(client, '/api/jogos', {'campo_id': jogo['campo'], 'jogadores': [ana, rui, eva],
+                                                          'data_jogo': f'2024-05-0{n}T10:00:00'})}
+                      for n in (1, 2)]
+    aleatorio = random.Random(7)
+    for _ in range(40):
+        # Inclui correções que retiram o melhor/pior valor de um jogador
+        tacada(client, aleatorio.choice(jogos), aleatorio.choice(jogo['jogadores']),
+               aleatorio.choice(jogo['pistas']), aleatorio.randint(1, 6))
+        verificar(client, aleatorio.choice(jogo['jogadores']))
+    for jogador_id in jogo['jogadores']:
+        verificar(client, jogador_id)
+    assert tabela.stats()['atualizacoes'] > 0
+
+    stats = client.get(f'/api/estatisticas/jogador/{ana}').get_json()
+    assert stats['total_jogos'] == 3 and stats['nome'] == 'Ana'
+
+
+def test_jogador_sem_jogos_e_inexistente(client, tabela):
+    rita = criar(client, '/api/jogadores', {'nome': 'Rita'})
+    stats = client.get(f'/api/estatisticas/jogador/{rita}').get_json()
+    assert (stats['total_jogos'], stats['vitorias'], stats['melhor_score']) == (0, 0, None)
+    verificar(client, rita)
+    assert client.get('/api/estatisticas/jogador/9999').status_code == 404
+
+
+def test_reconstruir(client, tabela, jogo, minigolf, monkeypatch):
+    ana, rui, _ = jogo['jogadores']
+    # Tacadas gravadas sem o listener: a tabela fica para trás
+    monkeypatch.setattr(minigolf, 'participantes_listeners', [])
+    tacada(client, jogo, ana, jogo['pistas'][0], 2)
+    tacada(client, jogo, rui, jogo['pistas'][0], 4)
+    resultado = client.get(f'/api/estatisticas/jogador/{ana}/verificar').get_json()
+    assert not resultado['ok']
+
+    assert client.post('/api/admin/estatisticas-jogadores/reconstruir').status_code == 403
+    monkeypatch.setattr(minigolf, 'ADMIN_TOKEN', 'segredo')
+    response = client.post('/api/admin/estatisticas-jogadores/reconstruir', headers=TOKEN)
+    assert response.get_json()['jogadores'] == 3
+    for jogador_id in jogo['jogadores']:
+        verificar(client, jogador_id)
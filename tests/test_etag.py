@@ -0,0 +1,65 @@
+import pytest
+
+from conftest import criar, tacada
+
+
+@pytest.fixture
+def partilhado(minigolf, monkeypatch, tmp_path):
+    """Versões num ficheiro partilhado, como com CACHE_SHARED_FILE"""
+    versions = minigolf.SharedTableVersions(str(tmp_path / 'versoes'))
+    monkeypatch.setattr(minigolf, 'table_versions', versions)
+    return versions
+
+
+def test_sem_versoes_partilhadas_nao_ha_etag(client, minigolf):
+    assert not minigolf.table_versions.partilhado
+    response = client.get('/api/cidades')
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+
+
+def test_if_none_match_responde_304_ate_haver_escrita(client, partilhado):
+    criar(client, '/api/cidades', {'nome': 'Faro', 'distrito': 'Faro'})
+    response = client.get('/api/cidades')
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    response = client.get('/api/cidades', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag and response.get_data() == b''
+
+    criar(client, '/api/cidades', {'nome': 'Beja', 'distrito': 'Beja'})
+    response = client.get('/api/cidades', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()) == 2
+
+
+def test_escrita_de_outro_worker_invalida(client, minigolf, partilhado, tmp_path):
+    etag = client.get('/api/jogadores').headers['ETag']
+    # Outro processo com o mesmo ficheiro regista uma escrita
+    minigolf.SharedTableVersions(str(tmp_path / 'versoes')).bump('jogadores')
+    assert client.get('/api/jogadores', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_etag_depende_das_tabelas_e_do_formato(client, jogo, partilhado):
+    url = f"/api/campos/{jogo['campo']}/pistas"
+    etag = client.get(url).headers['ETag']
+    # Uma tacada muda a dificuldade das pistas
+    tacada(client, jogo, jogo['jogadores'][0], jogo['pistas'][0], 2)
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]['estatisticas']['tacadas'] == 1
+    etag = response.headers['ETag']
+
+    # A mesma versão noutro formato não é a mesma representação
+    etag = client.get('/api/cidades').headers['ETag']
+    response = client.get('/api/cidades', headers={'If-None-Match': etag, 'Accept': 'application/x-ndjson'})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_erros_nao_levam_etag(client, partilhado):
+    response = client.get('/api/campos/9999')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
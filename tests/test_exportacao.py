@@ -0,0 +1,47 @@
+import gzip
+import json
+
+import pytest
+
+from conftest import criar, tacada
+
+
+@pytest.fixture
+def historico(client, jogo):
+    ana, rui, _ = jogo['jogadores']
+    p1, p2, _ = jogo['pistas']
+    antigo = criar(client, '/api/jogos', {'campo_id': jogo['campo'], 'jogadores': [ana],
+                                          'data_jogo': '2024-05-01T10:00:00'})
+    tacada(client, {'id': antigo}, ana, p1, 4)
+    tacada(client, jogo, ana, p1, 3)
+    tacada(client, jogo, rui, p2, 2)
+    return antigo
+
+
+def test_exportar_csv(client, jogo, historico):
+    response = client.get('/api/export/jogos')
+    assert response.mimetype == 'text/csv'
+    assert 'attachment; filename="jogos-' in response.headers['Content-Disposition']
+    assert 'Content-Encoding' not in response.headers
+    linhas = response.get_data(as_text=True).splitlines()
+    assert linhas[0] == 'id,campo_id,campo_nome,data_jogo,num_jogadores,observacoes'
+    assert [linha.split(',')[0] for linha in linhas[1:]] == [str(historico), str(jogo['id'])]
+
+    # Filtros por data (inclusivos)
+    linhas = client.get('/api/export/tacadas?desde=2024-05-01&ate=2024-05-01').get_data(as_text=True).splitlines()
+    assert len(linhas) == 2 and linhas[1].startswith(f'{historico},')
+
+
+def test_exportar_ndjson_com_gzip(client, jogo, historico):
+    response = client.get('/api/export/tacadas?formato=ndjson', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'application/x-ndjson'
+    tacadas = [json.loads(linha) for linha in gzip.decompress(response.get_data()).decode().splitlines()]
+    assert [(t['jogo_id'], t['numero_tacadas']) for t in tacadas] == [(historico, 4), (jogo['id'], 3), (jogo['id'], 2)]
+    assert tacadas[0]['jogador_nome'] == 'Ana' and tacadas[0]['par'] == 3
+
+
+def test_exportar_pedidos_invalidos(client):
+    assert client.get('/api/export/jogos?formato=xml').status_code == 400
+    assert client.get('/api/export/jogos?desde=ontem').status_code == 400
+    assert client.get('/api/export/tacadas?campo_id=x').status_code == 400
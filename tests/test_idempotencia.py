@@ -0,0 +1,77 @@
+import hashlib
+import json
+
+import pytest
+
+
+@pytest.fixture(params=['memoria', 'diretorio'])
+def store(request, minigolf, monkeypatch, tmp_path):
+    directory = str(tmp_path / 'idempotencia') if request.param == 'diretorio' else None
+    store = minigolf.IdempotencyStore(directory=directory)
+    monkeypatch.setattr(minigolf, 'idempotency_store', store)
+    return store
+
+
+def criar_jogador(client, nome, key):
+    return client.post('/api/jogadores', json={'nome': nome}, headers={'Idempotency-Key': key})
+
+
+def jogadores(client):
+    return sorted(j['nome'] for j in client.get('/api/jogadores').get_json())
+
+
+def test_repeticao_devolve_a_resposta_guardada(client, store):
+    primeira = criar_jogador(client, 'Ana', 'k1')
+    assert primeira.status_code == 201
+    assert 'Idempotent-Replayed' not in primeira.headers
+
+    repetida = criar_jogador(client, 'Ana', 'k1')
+    assert repetida.status_code == 201
+    assert repetida.headers['Idempotent-Replayed'] == 'true'
+    assert repetida.get_json() == primeira.get_json()
+    assert jogadores(client) == ['Ana']
+
+    # A mesma chave noutra rota é outro pedido
+    assert client.post('/api/cidades', json={'nome': 'Faro', 'distrito': 'Faro'},
+                       headers={'Idempotency-Key': 'k1'}).status_code == 201
+    assert store.stats()['repetidos'] == 1
+
+
+def test_chave_com_outro_corpo_responde_422(client, store):
+    assert criar_jogador(client, 'Ana', 'k1').status_code == 201
+    response = criar_jogador(client, 'Rui', 'k1')
+    assert response.status_code == 422
+    assert jogadores(client) == ['Ana']
+
+
+def test_pedido_em_curso_responde_409(client, store):
+    corpo = json.dumps({'nome': 'Ana'}).encode()
+    # Outro pedido com a mesma chave ainda não terminou
+    assert store.begin('/api/jogadores k1', hashlib.sha256(corpo).hexdigest())[0] == 'novo'
+    response = client.post('/api/jogadores', data=corpo, content_type='application/json',
+                           headers={'Idempotency-Key': 'k1'})
+    assert response.status_code == 409
+    assert jogadores(client) == []
+
+    # Sem resposta guardada (erro do servidor) a chave fica livre
+    store.abort('/api/jogadores k1')
+    response = client.post('/api/jogadores', data=corpo, content_type='application/json',
+                           headers={'Idempotency-Key': 'k1'})
+    assert response.status_code == 201
+
+
+def test_chave_invalida(client, store):
+    assert criar_jogador(client, 'Ana', 'x' * 256).status_code == 400
+    assert jogadores(client) == []
+
+
+def test_diretorio_partilhado_entre_workers(client, minigolf, monkeypatch, tmp_path):
+    directory = str(tmp_path / 'idempotencia')
+    monkeypatch.setattr(minigolf, 'idempotency_store', minigolf.IdempotencyStore(directory=directory))
+    assert criar_jogador(client, 'Ana', 'k1').status_code == 201
+
+    # Outro worker: memória vazia, mesmo diretório
+    monkeypatch.setattr(minigolf, 'idempotency_store', minigolf.IdempotencyStore(directory=directory))
+    repetida = criar_jogador(client, 'Ana', 'k1')
+    assert repetida.headers['Idempotent-Replayed'] == 'true'
+    assert jogadores(client) == ['Ana']
@@ -0,0 +1,180 @@
+import gzip
+import json
+
+import pytest
+
+TOKEN = {'X-Admin-Token': 'segredo'}
+
+
+@pytest.fixture
+def admin(minigolf, monkeypatch):
+    monkeypatch.setattr(minigolf, 'ADMIN_TOKEN', 'segredo')
+
+
+def importar(client, entidade, corpo, formato='csv', headers=TOKEN):
+    response = client.post(f'/api/import/{entidade}?formato={formato}', data=corpo, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def ndjson(*registos):
+    return ''.join(json.dumps(registo) + '\n' for registo in registos).encode()
+
+
+def participantes(minigolf, jogo_id):
+    connection = minigolf.get_db_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT jogador_id, total_tacadas, posicao_final FROM jogo_participantes
+        WHERE jogo_id = %s ORDER BY jogador_id
+        """, (jogo_id,))
+        return cursor.fetchall()
+    finally:
+        connection.close()
+
+
+def test_sem_token_configurado_fica_fechado(client):
+    assert client.post('/api/import/cidades', data=b'nome,distrito\nFaro,Faro\n').status_code == 403
+    assert client.post('/api/import/cidades', data=b'nome,distrito\nFaro,Faro\n', headers=TOKEN).status_code == 403
+
+
+def test_token_errado(client, admin):
+    response = client.post('/api/import/cidades', data=b'nome,distrito\nFaro,Faro\n',
+                           headers={'X-Admin-Token': 'outro'})
+    assert response.status_code == 403
+
+
+def test_importar_csv_cidades_e_jogadores(client, admin):
+    resumo = importar(client, 'cidades', 'id,nome,distrito\n10,Faro,Faro\n,Évora,\n11,Beja,Beja\n'.encode())
+    assert (resumo['lidas'], resumo['inseridas'], resumo['erros']) == (3, 2, 1)
+    assert resumo['detalhes_erros'] == [{'linha': 3, 'erro': 'distrito é obrigatório'}]
+
+    resumo = importar(client, 'jogadores', b'nome,cidade_id\nAna,10\nRui,99\nEva,\nLia,x\n')
+    assert (resumo['lidas'], resumo['inseridas'], resumo['erros']) == (4, 2, 2)
+    assert [erro['linha'] for erro in resumo['detalhes_erros']] == [3, 5]
+    assert sorted(j['nome'] for j in client.get('/api/jogadores').get_json()) == ['Ana', 'Eva']
+
+    # O id explícito já existe
+    resumo = importar(client, 'cidades', b'id,nome,distrito\n10,Faro,Faro\n')
+    assert (resumo['inseridas'], resumo['erros']) == (0, 1)
+
+
+def test_entidade_e_formato_invalidos(client, admin):
+    assert client.post('/api/import/tacadas', data=b'', headers=TOKEN).status_code == 404
+    assert client.post('/api/import/cidades?formato=xml', data=b'', headers=TOKEN).status_code == 400
+
+
+@pytest.fixture
+def base(client, jogo, admin):
+    """Campo com três pistas e três jogadores, sem tacadas no jogo do fixture"""
+    return jogo
+
+
+def jogos_historicos(base):
+    ana, rui, eva = base['jogadores']
+    p1, p2, p3 = base['pistas']
+    return [
+        {'id': 100, 'campo_id': base['campo'], 'data_jogo': '2024-05-01T10:00:00',
+         'tacadas': [{'jogador_id': ana, 'pista_id': p1, 'numero_tacadas': 2},
+                     {'jogador_id': ana, 'pista_id': p2, 'numero_tacadas': 3},
+                     {'jogador_id': rui, 'pista_id': p1, 'numero_tacadas': 4},
+                     {'jogador_id': rui, 'pista_id': p2, 'numero_tacadas': 1},
+                     {'jogador_id': eva, 'pista_id': p1, 'numero_tacadas': 6}]},
+        # Formato plano: uma tacada por linha, agrupadas pela coluna jogo
+        {'jogo': 'b', 'campo_id': base['campo'], 'data_jogo': '2024-05-02',
+         'jogador_id': ana, 'pista_id': p3, 'numero_tacadas': 3},
+        {'jogo': 'b', 'campo_id': base['campo'], 'data_jogo': '2024-05-02',
+         'jogador_id': rui, 'pista_id': p3, 'numero_tacadas': 2},
+    ]
+
+
+def test_importar_jogos_ndjson(client, base, minigolf):
+    ana, rui, eva = base['jogadores']
+    p1 = base['pistas'][0]
+    corpo = ndjson(*jogos_historicos(base)) + b'{nao e json\n' + ndjson(
+        {'campo_id': base['campo'], 'data_jogo': '2024-05-03', 'tacadas': [
+            {'jogador_id': ana, 'pista_id': p1, 'numero_tacadas': 2},
+            {'jogador_id': ana, 'pista_id': p1, 'numero_tacadas': 3}]},
+        {'campo_id': 999, 'data_jogo': '2024-05-03', 'tacadas': [
+            {'jogador_id': ana, 'pista_id': p1, 'numero_tacadas': 2}]})
+
+    resumo = importar(client, 'jogos', corpo, formato='ndjson')
+    assert (resumo['lidas'], resumo['inseridas'], resumo['erros']) == (5, 2, 3)
+    assert [erro['linha'] for erro in resumo['detalhes_erros']] == [4, 5, 6]
+    assert 'repetida' in resumo['detalhes_erros'][1]['erro']
+
+    # Totais e posições iguais aos do procedimento
+    assert participantes(minigolf, 100) == [(ana, 5, 1), (rui, 5, 1), (eva, 6, 3)]
+    for jogo_id in (100, 101):
+        resultado = client.get(f'/api/jogos/{jogo_id}/pontuacao/verificar').get_json()
+        assert resultado['ok'], resultado['divergencias']
+    assert participantes(minigolf, 101) == [(ana, 3, 2), (rui, 2, 1)]
+
+    # O mesmo id não é importado duas vezes
+    resumo = importar(client, 'jogos', ndjson(jogos_historicos(base)[0]), formato='ndjson')
+    assert (resumo['inseridas'], resumo['erros']) == (0, 1)
+
+
+def test_importar_jogos_gzip(client, base, minigolf):
+    corpo = gzip.compress(ndjson(*jogos_historicos(base)))
+    resumo = importar(client, 'jogos', corpo, formato='ndjson',
+                      headers=dict(TOKEN, **{'Content-Encoding': 'gzip'}))
+    assert (resumo['inseridas'], resumo['erros']) == (2, 0)
+    ana, rui, eva = base['jogadores']
+    assert participantes(minigolf, 100) == [(ana, 5, 1), (rui, 5, 1), (eva, 6, 3)]
+
+    response = client.post('/api/import/jogos?formato=ndjson', data=b'isto nao e gzip',
+                           headers=dict(TOKEN, **{'Content-Encoding': 'gzip'}))
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('modo', ['verify', 'python'])
+def test_importar_jogos_noutros_modos(client, base, minigolf, monkeypatch, modo):
+    monkeypatch.setattr(minigolf, 'MOTOR_PONTUACAO_MODO', modo)
+    antes = minigolf.motor_pontuacao.stats()
+    resumo = importar(client, 'jogos', ndjson(*jogos_historicos(base)), formato='ndjson')
+    assert (resumo['inseridas'], resumo['erros']) == (2, 0)
+    depois = minigolf.motor_pontuacao.stats()
+    assert depois.get('divergencias', 0) == antes.get('divergencias', 0)
+    if modo == 'verify':
+        assert depois['verificacoes'] == antes.get('verificacoes', 0) + 2
+    ana, rui, eva = base['jogadores']
+    assert participantes(minigolf, 100) == [(ana, 5, 1), (rui, 5, 1), (eva, 6, 3)]
+
+
+def test_versao_incrementada_uma_vez_depois_do_commit(client, admin, minigolf, monkeypatch):
+    monkeypatch.setattr(minigolf, 'IMPORT_BATCH_SIZE', 2)
+    monkeypatch.setattr(minigolf, 'IMPORT_COMMIT_ROWS', 2)
+    antes = minigolf.table_versions.get('cidades')[0]
+    resumo = importar(client, 'cidades', b'nome,distrito\nFaro,Faro\nBeja,Beja\nLagos,Faro\nTavira,Faro\nSines,\n')
+    assert (resumo['inseridas'], resumo['erros']) == (4, 1)
+    assert minigolf.table_versions.get('cidades')[0] == antes + 1
+
+
+def test_lote_rejeitado_liberta_os_ids(base, minigolf, monkeypatch):
+    pontuar = minigolf.ImportacaoEmMassa._pontuar
+    rejeitados = []
+
+    def falhar_primeiro(self, jogos):
+        if not rejeitados:
+            rejeitados.extend(jogos)
+            raise minigolf.Error('falha simulada')
+        pontuar(self, jogos)
+
+    monkeypatch.setattr(minigolf.ImportacaoEmMassa, '_pontuar', falhar_primeiro)
+    primeiro, segundo = jogos_historicos(base)[0], dict(jogos_historicos(base)[0])
+    del primeiro['id']
+    connection = minigolf.get_db_connection()
+    try:
+        importacao = minigolf.ImportacaoEmMassa(connection, 'jogos', por_transacao=1)
+        # O segundo jogo reutiliza o id reservado para o primeiro, que foi desfeito
+        segundo['id'] = base['id'] + 1
+        resumo = importacao.executar(iter([(1, primeiro, None), (2, segundo, None)]))
+    finally:
+        connection.close()
+    assert rejeitados == [base['id'] + 1]
+    assert (resumo['inseridas'], resumo['erros']) == (1, 1)
+    assert 'Lote rejeitado' in resumo['detalhes_erros'][0]['erro']
+    ana, rui, eva = base['jogadores']
+    assert participantes(minigolf, base['id'] + 1) == [(ana, 5, 1), (rui, 5, 1), (eva, 6, 3)]
@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+from conftest import criar
+
+
+@pytest.fixture
+def metricas(minigolf, monkeypatch):
+    metrics = minigolf.Metrics()
+    monkeypatch.setattr(minigolf, 'metrics', metrics)
+    return metrics
+
+
+def amostras(texto):
+    """{linha sem o valor: valor} das amostras do formato de texto do Prometheus"""
+    return {linha.rsplit(' ', 1)[0]: float(linha.rsplit(' ', 1)[1])
+            for linha in texto.splitlines() if linha and not linha.startswith('#')}
+
+
+def test_latencia_e_tempo_de_base_de_dados_por_rota(client, metricas):
+    criar(client, '/api/cidades', {'nome': 'Faro', 'distrito': 'Faro'})
+    client.get('/api/cidades')
+    client.get('/api/cidades?limit=1')
+    client.get('/api/campos/9999')
+
+    response = client.get('/api/metrics')
+    assert response.mimetype == 'text/plain'
+    valores = amostras(response.get_data(as_text=True))
+    assert valores['minigolf_http_request_duration_seconds_count{route="/api/cidades",method="GET",status="200"}'] == 2
+    assert valores['minigolf_http_request_duration_seconds_count{route="/api/cidades",method="POST",status="201"}'] == 1
+    # A rota é a regra do Flask, não o caminho com o id
+    assert valores['minigolf_http_request_duration_seconds_count'
+                   '{route="/api/campos/<int:campo_id>",method="GET",status="404"}'] == 1
+    # Uma observação por pedido para os totais, uma por consulta para a duração
+    assert valores['minigolf_db_time_seconds_count{route="/api/cidades"}'] == 3
+    assert valores['minigolf_db_query_duration_seconds_count{route="/api/cidades"}'] >= 3
+    assert valores['minigolf_db_rows_sum{route="/api/cidades"}'] >= 2
+    assert valores['minigolf_json_serialization_seconds_count{route="/api/cidades"}'] == 3
+    # Os intervalos são cumulativos
+    assert valores['minigolf_http_request_duration_seconds_bucket'
+                   '{route="/api/cidades",method="GET",status="200",le="+Inf"}'] == 2
+
+
+def test_metricas_desativadas(client, minigolf, monkeypatch):
+    monkeypatch.setattr(minigolf, 'metrics', minigolf.Metrics(enabled=False))
+    client.get('/api/cidades')
+    assert amostras(client.get('/api/metrics').get_data(as_text=True)) == {}
+
+
+def test_soma_dos_workers_com_diretorio(client, minigolf, monkeypatch, tmp_path):
+    metrics = minigolf.Metrics(directory=str(tmp_path))
+    monkeypatch.setattr(minigolf, 'metrics', metrics)
+    client.get('/api/cidades')
+    # Estado gravado por outro worker
+    serie = [0] * (len(metrics.request_duration.buckets) + 1) + [0.0]
+    serie[0], serie[-1] = 4, 0.001
+    with open(os.path.join(str(tmp_path), '1.json'), 'w') as f:
+        json.dump({'minigolf_http_request_duration_seconds': [[['/api/cidades', 'GET', '200'], serie]]}, f)
+
+    valores = amostras(client.get('/api/metrics').get_data(as_text=True))
+    assert valores['minigolf_http_request_duration_seconds_count{route="/api/cidades",method="GET",status="200"}'] == 5
+    assert os.path.exists(os.path.join(str(tmp_path), f'{os.getpid()}.json'))
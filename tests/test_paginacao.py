@@ -0,0 +1,49 @@
+from conftest import criar
+
+
+def paginas(client, url):
+    """Todas as páginas de uma listagem, seguindo X-Next-Cursor"""
+    itens, cursor, pedidos = [], None, 0
+    while True:
+        separador = '&' if '?' in url else '?'
+        response = client.get(url + (f'{separador}cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200, response.get_json()
+        itens += response.get_json()
+        pedidos += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return itens, pedidos
+
+
+def test_jogadores_com_nomes_repetidos(client, minigolf):
+    ids = [criar(client, '/api/jogadores', {'nome': nome}) for nome in ('Rui', 'Ana', 'Rui', 'Eva', 'Ana')]
+    itens, pedidos = paginas(client, '/api/jogadores?limit=2')
+    assert [(j['nome'], j['id']) for j in itens] == sorted(
+        zip(('Rui', 'Ana', 'Rui', 'Eva', 'Ana'), ids))
+    assert pedidos == 3
+
+
+def test_jogos_por_data_com_cursor_iso(client, jogo, minigolf):
+    """No SQLite o cursor leva data_jogo em ISO 8601 e compara com a coluna DATETIME"""
+    campo, jogadores = jogo['campo'], jogo['jogadores'][:1]
+    datas = ['2024-05-01T10:00:00', '2024-05-03T09:30:00', '2024-05-03T09:30:00',
+             '2024-05-02T18:00:00', '2024-05-03T09:30:00']
+    ids = [criar(client, '/api/jogos', {'campo_id': campo, 'jogadores': jogadores, 'data_jogo': data})
+           for data in datas]
+
+    itens, pedidos = paginas(client, f'/api/jogos?campo_id={campo}&limit=2')
+    esperado = [jogo['id']] + [i for _, i in sorted(zip(datas, ids), reverse=True)]
+    assert [j['id'] for j in itens] == esperado
+    assert pedidos == 3
+
+    # Página seguinte a meio do empate em data_jogo
+    primeira = client.get(f'/api/jogos?campo_id={campo}&limit=2')
+    cursor = primeira.headers['X-Next-Cursor']
+    assert minigolf.decode_cursor(cursor, 2) == ['2024-05-03T09:30:00', ids[4]]
+    segunda = client.get(f'/api/jogos?campo_id={campo}&limit=2&cursor={cursor}').get_json()
+    assert [j['id'] for j in segunda] == [ids[2], ids[1]]
+
+
+def test_cursor_invalido(client):
+    assert client.get('/api/jogos?cursor=nao-e-cursor').status_code == 400
+    assert client.get('/api/jogadores?cursor=' + 'W10').status_code == 400
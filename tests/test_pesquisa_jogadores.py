@@ -0,0 +1,68 @@
+import pytest
+
+from conftest import criar
+
+
+@pytest.fixture
+def indice(minigolf, monkeypatch):
+    indice = minigolf.IndicePesquisaJogadores()
+    monkeypatch.setattr(minigolf, 'indice_jogadores', indice)
+    return indice
+
+
+def pesquisar(client, termo, **args):
+    response = client.get('/api/jogadores/pesquisa', query_string=dict(args, q=termo))
+    assert response.status_code == 200, response.get_json()
+    return response
+
+
+def nomes(response):
+    return [j['nome'] for j in response.get_json()]
+
+
+@pytest.fixture
+def jogadores(client, indice):
+    for nome, email in [('João Silva', 'js@exemplo.pt'), ('Joana Sousa', None), ('Rui Santos', 'rui@exemplo.pt'),
+                        ('Silvia Costa', None)]:
+        criar(client, '/api/jogadores', {'nome': nome, 'email': email})
+
+
+def test_prefixo_sem_acentos_e_por_email(client, jogadores):
+    assert nomes(pesquisar(client, 'jo')) == ['Joana Sousa', 'João Silva']
+    assert nomes(pesquisar(client, 'JOAO')) == ['João Silva']
+    # Todas as palavras têm de corresponder
+    assert nomes(pesquisar(client, 'jo sil')) == ['João Silva']
+    assert nomes(pesquisar(client, 'rui@')) == ['Rui Santos']
+
+
+def test_aproximada_depois_dos_prefixos(client, jogadores):
+    resultado = pesquisar(client, 'Silvaa').get_json()
+    assert [j['nome'] for j in resultado] == ['João Silva']
+    assert 0.3 <= resultado[0]['semelhanca'] < 1
+    # Exatos primeiro, sem semelhança; aproximados a seguir
+    resultado = pesquisar(client, 'silvi').get_json()
+    assert resultado[0]['nome'] == 'Silvia Costa' and 'semelhanca' not in resultado[0]
+    assert [j['nome'] for j in resultado[1:]] == ['João Silva']
+
+
+def test_paginacao(client, jogadores):
+    primeira = pesquisar(client, 's', limit=2)
+    assert nomes(primeira) == ['Joana Sousa', 'João Silva']
+    segunda = pesquisar(client, 's', limit=2, cursor=primeira.headers['X-Next-Cursor'])
+    assert nomes(segunda) == ['Rui Santos', 'Silvia Costa']
+    assert 'X-Next-Cursor' not in segunda.headers
+
+
+def test_jogador_novo_entra_sem_reconstruir(client, jogadores, indice):
+    pesquisar(client, 'jo')
+    reconstrucoes = indice.stats()['reconstrucoes']
+    criar(client, '/api/jogadores', {'nome': 'Jorge Dias'})
+    assert nomes(pesquisar(client, 'jo')) == ['Joana Sousa', 'Jorge Dias', 'João Silva']
+    assert indice.stats()['reconstrucoes'] == reconstrucoes
+    assert indice.stats()['adicionados'] >= 1
+
+
+def test_pedidos_invalidos(client, indice):
+    assert client.get('/api/jogadores/pesquisa').status_code == 400
+    assert client.get('/api/jogadores/pesquisa?q=%20-%20').status_code == 400
+    assert client.get('/api/jogadores/pesquisa?q=ana&cursor=W10').status_code == 400
@@ -0,0 +1,50 @@
+import pytest
+
+from conftest import tacada
+
+
+@pytest.fixture
+def dificuldade(minigolf, monkeypatch):
+    # Sem janela de releitura: só a correção pode fazer ver o novo valor
+    dificuldade = minigolf.DificuldadePistas(janela_ids=0)
+    monkeypatch.setattr(minigolf, 'dificuldade_pistas', dificuldade)
+    return dificuldade
+
+
+def distribuicao(client, jogo):
+    pistas = client.get(f"/api/campos/{jogo['campo']}/pistas").get_json()
+    return pistas[0]['estatisticas']['distribuicao']
+
+
+def test_correcao_de_tacada_reconstroi_os_histogramas(client, jogo, dificuldade):
+    ana, rui, eva = jogo['jogadores']
+    p1 = jogo['pistas'][0]
+    tacada(client, jogo, ana, p1, 3)
+    tacada(client, jogo, rui, p1, 2)
+    assert distribuicao(client, jogo) == {'2': 1, '3': 1}
+
+    # Tacada nova: entra pelo incremento, sem reconstruir
+    tacada(client, jogo, eva, p1, 2)
+    assert distribuicao(client, jogo) == {'2': 2, '3': 1}
+    assert dificuldade.stats()['reconstrucoes'] == 1
+
+    # Correção individual e em lote de tacadas já contadas
+    tacada(client, jogo, ana, p1, 1)
+    assert distribuicao(client, jogo) == {'1': 1, '2': 2}
+    response = client.post('/api/tacadas/batch', json={'tacadas': [
+        {'jogo_id': jogo['id'], 'jogador_id': rui, 'pista_id': p1, 'numero_tacadas': 4}]})
+    assert response.status_code in (200, 201), response.get_json()
+    assert distribuicao(client, jogo) == {'1': 1, '2': 1, '4': 1}
+    assert dificuldade.stats()['reconstrucoes_correcoes'] == 2
+
+
+def test_correcao_por_sync(client, jogo, dificuldade):
+    ana = jogo['jogadores'][0]
+    p1 = jogo['pistas'][0]
+    tacada(client, jogo, ana, p1, 3)
+    assert distribuicao(client, jogo) == {'3': 1}
+
+    response = client.post(f"/api/jogos/{jogo['id']}/sync", json={'versao': None, 'tacadas': [
+        {'jogador_id': ana, 'pista_id': p1, 'numero_tacadas': 5}]})
+    assert response.status_code == 200
+    assert distribuicao(client, jogo) == {'5': 1}
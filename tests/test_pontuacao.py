@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from Minigolf import EstadoJogo
+from conftest import tacada
+
+
+@pytest.fixture
+def motor_python(minigolf, monkeypatch):
+    monkeypatch.setattr(minigolf, 'MOTOR_PONTUACAO_MODO', 'python')
+    minigolf.motor_pontuacao._jogos.clear()
+    yield minigolf.motor_pontuacao
+    minigolf.motor_pontuacao._jogos.clear()
+
+
+def participantes(minigolf, jogo_id):
+    connection = minigolf.get_db_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT jogador_id, total_tacadas, posicao_final FROM jogo_participantes
+        WHERE jogo_id = %s ORDER BY jogador_id
+        """, (jogo_id,))
+        return cursor.fetchall()
+    finally:
+        connection.close()
+
+
+def verificar(client, jogo):
+    resultado = client.get(f"/api/jogos/{jogo['id']}/pontuacao/verificar").get_json()
+    assert resultado['ok'], resultado['divergencias']
+
+
+def test_empates_partilham_a_posicao():
+    estado = EstadoJogo([1, 2, 3], [10, 11])
+    for jogador_id, pista_id, numero in [(1, 10, 3), (1, 11, 2), (2, 10, 2), (2, 11, 1), (3, 10, 1), (3, 11, 2)]:
+        estado.definir(jogador_id, pista_id, numero)
+    estado.classificar()
+    assert list(estado.totais) == [5, 3, 3]
+    assert list(estado.posicoes) == [3, 1, 1]
+
+
+def test_reclassificar_igual_a_classificar():
+    aleatorio = random.Random(1)
+    estado = EstadoJogo(range(6), range(4))
+    for _ in range(300):
+        jogador, pista = aleatorio.randrange(6), aleatorio.randrange(4)
+        antigo = estado.totais[jogador]
+        estado.definir(jogador, pista, aleatorio.randint(1, 6))
+        estado.reclassificar(jogador, antigo)
+        posicoes = list(estado.posicoes)
+        estado.classificar()
+        assert posicoes == list(estado.posicoes)
+
+
+def test_procedimento_calcula_totais_e_posicoes(client, jogo, minigolf):
+    ana, rui, eva = jogo['jogadores']
+    p1, p2, _ = jogo['pistas']
+    for jogador_id, pista_id, numero in [(ana, p1, 2), (ana, p2, 3), (rui, p1, 4), (rui, p2, 1), (eva, p1, 6)]:
+        tacada(client, jogo, jogador_id, pista_id, numero)
+    assert participantes(minigolf, jogo['id']) == [(ana, 5, 1), (rui, 5, 1), (eva, 6, 3)]
+
+
+def test_motor_python_igual_ao_procedimento(client, jogo, minigolf, motor_python):
+    aleatorio = random.Random(7)
+    for _ in range(40):
+        tacada(client, jogo, aleatorio.choice(jogo['jogadores']), aleatorio.choice(jogo['pistas']),
+               aleatorio.randint(1, 5))
+        verificar(client, jogo)
+    assert motor_python.stats()['atualizacoes'] == 40
+
+
+def test_motor_python_no_batch_e_no_sync(client, jogo, minigolf, motor_python):
+    ana, rui, eva = jogo['jogadores']
+    p1, p2, p3 = jogo['pistas']
+    response = client.post('/api/tacadas/batch', json={'tacadas': [
+        {'jogo_id': jogo['id'], 'jogador_id': ana, 'pista_id': p1, 'numero_tacadas': 3},
+        {'jogo_id': jogo['id'], 'jogador_id': rui, 'pista_id': p1, 'numero_tacadas': 2},
+        {'jogo_id': jogo['id'], 'jogador_id': eva, 'pista_id': p1, 'numero_tacadas': 3},
+    ]})
+    assert response.status_code == 200
+    verificar(client, jogo)
+
+    response = client.post(f"/api/jogos/{jogo['id']}/sync", json={'versao': None, 'tacadas': [
+        {'jogador_id': ana, 'pista_id': p2, 'numero_tacadas': 1},
+        {'jogador_id': rui, 'pista_id': p3, 'numero_tacadas': 5},
+    ]})
+    assert response.get_json()['aplicadas'] == 2
+    verificar(client, jogo)
+    assert participantes(minigolf, jogo['id']) == [(ana, 4, 2), (rui, 7, 3), (eva, 3, 1)]
+
+
+def test_ids_invalidos_dao_400_e_erros_por_item(client, jogo, motor_python):
+    ana = jogo['jogadores'][0]
+    p1 = jogo['pistas'][0]
+    response = client.post('/api/tacadas', json={'jogo_id': 'abc', 'jogador_id': ana,
+                                                 'pista_id': p1, 'numero_tacadas': 3})
+    assert response.status_code == 400
+    assert 'jogo_id' in response.get_json()['error']
+
+    response = client.post('/api/tacadas/batch', json={'tacadas': [
+        {'jogo_id': 'x', 'jogador_id': ana, 'pista_id': p1, 'numero_tacadas': 3},
+        {'jogo_id': str(jogo['id']), 'jogador_id': ana, 'pista_id': p1, 'numero_tacadas': 4},
+    ]})
+    assert response.status_code == 200
+    resultado = response.get_json()
+    assert [r['status'] for r in resultado['results']] == ['error', 'ok']
+    assert resultado['jogos_recalculados'] == [jogo['id']]
@@ -0,0 +1,76 @@
+import pytest
+
+from Minigolf import ConnectionPool, PoolError, SQLiteConnection
+
+
+@pytest.fixture
+def pool(minigolf):
+    return ConnectionPool({'path': minigolf.db_pool.config['path']}, connect=SQLiteConnection,
+                          size=2, timeout=0.05)
+
+
+def contar_cidades(pool):
+    connection = pool.acquire()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM cidades")
+        return cursor.fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_release_faz_rollback_da_transacao_aberta(pool):
+    connection = pool.acquire()
+    connection.start_transaction()
+    connection.cursor().execute("INSERT INTO cidades (nome, distrito) VALUES (%s, %s)", ('Porto', 'Porto'))
+    assert connection.in_transaction
+    connection.close()
+
+    assert contar_cidades(pool) == 0
+    reutilizada = pool.acquire()
+    assert not reutilizada.in_transaction
+    reutilizada.close()
+    assert pool.stats()['created'] == 1
+
+
+def test_commit_fica_gravado(pool):
+    connection = pool.acquire()
+    connection.start_transaction()
+    connection.cursor().execute("INSERT INTO cidades (nome, distrito) VALUES (%s, %s)", ('Porto', 'Porto'))
+    connection.commit()
+    connection.close()
+    assert contar_cidades(pool) == 1
+
+
+def test_discard_fecha_a_conexao_e_liberta_a_vaga(pool):
+    connection = pool.acquire()
+    bruta = connection._connection
+    connection.discard()
+
+    assert not bruta.is_connected()
+    stats = pool.stats()
+    assert (stats['open'], stats['in_use'], stats['idle']) == (0, 0, 0)
+    # A vaga volta a estar disponível com uma conexão nova
+    nova = pool.acquire()
+    assert nova._connection is not bruta
+    nova.close()
+
+
+def test_pool_esgotado_da_timeout(pool):
+    conexoes = [pool.acquire() for _ in range(pool.size)]
+    with pytest.raises(PoolError):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+    for connection in conexoes:
+        connection.close()
+    pool.acquire().close()
+
+
+def test_conexao_expirada_e_reciclada(pool):
+    pool.max_lifetime = 0
+    connection = pool.acquire()
+    bruta = connection._connection
+    connection.close()
+
+    assert not bruta.is_connected()
+    assert pool.stats()['idle'] == 0
@@ -0,0 +1,81 @@
+import random
+
+from Minigolf import IndexableSkipList
+from conftest import criar, tacada
+
+
+def test_skiplist_igual_a_lista_ordenada():
+    aleatorio = random.Random(3)
+    lista = IndexableSkipList()
+    referencia = []
+    for _ in range(2000):
+        if referencia and aleatorio.random() < 0.4:
+            chave = aleatorio.choice(referencia)
+            lista.remove(chave)
+            referencia.remove(chave)
+        else:
+            chave = (aleatorio.random(), aleatorio.randrange(1000))
+            lista.insert(chave, chave)
+            referencia.append(chave)
+        referencia.sort()
+        assert len(lista) == len(referencia)
+    for posicao, chave in enumerate(referencia):
+        assert lista.index(chave) == posicao
+    assert lista.slice(0, len(referencia)) == referencia
+    assert lista.slice(10, 25) == referencia[10:25]
+    assert lista.slice(len(referencia) - 3, len(referencia) + 5) == referencia[-3:]
+
+
+def test_skiplist_chave_inexistente():
+    lista = IndexableSkipList()
+    lista.insert((1.0, 1), 'a')
+    for operacao in (lista.remove, lista.index):
+        try:
+            operacao((2.0, 2))
+        except KeyError:
+            pass
+        else:
+            raise AssertionError('KeyError esperado')
+
+
+def vista(minigolf):
+    connection = minigolf.get_db_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT * FROM vw_ranking_jogadores LIMIT 20")
+        return minigolf.fetchall_dicts(cursor)
+    finally:
+        connection.close()
+
+
+def normalizar(ranking):
+    return [(entrada['id'], entrada['total_jogos'], round(float(entrada['media_tacadas']), 4), entrada['vitorias'])
+            for entrada in ranking]
+
+
+def test_ranking_em_memoria_igual_a_vista(client, jogo, minigolf, monkeypatch):
+    ranking = minigolf.ranking_jogadores
+    monkeypatch.setattr(minigolf, 'participantes_listeners',
+                        minigolf.participantes_listeners + [ranking.atualizar])
+    jogadores = jogo['jogadores'] + [criar(client, '/api/jogadores', {'nome': nome}) for nome in ('Rita', 'Zé')]
+    jogos = [jogo] + [
+        {'id': criar(client, '/api/jogos', {'campo_id': jogo['campo'], 'jogadores': participantes})}
+        for participantes in (jogadores[:2], jogadores[2:], jogadores[1:4])
+    ]
+    assert ranking.garantir_atual()
+    reconstrucoes = ranking.stats()['reconstrucoes']
+
+    aleatorio = random.Random(11)
+    for _ in range(60):
+        alvo = aleatorio.choice(jogos)
+        detalhe = client.get(f"/api/jogos/{alvo['id']}").get_json()
+        jogador_id = aleatorio.choice(detalhe['participantes'])['jogador_id']
+        tacada(client, alvo, jogador_id, aleatorio.choice(jogo['pistas']), aleatorio.randint(1, 6))
+        assert normalizar(ranking.top(20)) == normalizar(vista(minigolf))
+
+    # Atualizado jogo a jogo, sem reconstruir
+    assert ranking.stats()['reconstrucoes'] == reconstrucoes
+    topo = ranking.top(3)
+    assert [ranking.posicao(entrada['id'])['posicao'] for entrada in topo] == [1, 2, 3]
+    assert [entrada['id'] for entrada in ranking.vizinhos(topo[1]['id'], 1)] == \
+        [entrada['id'] for entrada in topo]
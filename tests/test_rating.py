@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from Minigolf import MotorRating, calcular_ratings
+from conftest import criar, tacada
+
+
+def elo_sequencial(jogos, k=32.0, inicial=1500.0):
+    """Referência: um jogo de cada vez, pela ordem dada ([(jogador, total)] por jogo)"""
+    ratings, contagem = {}, {}
+    for participacoes in jogos:
+        if len(participacoes) < 2:
+            continue
+        antes = {jogador: ratings.get(jogador, inicial) for jogador, _ in participacoes}
+        for jogador, total in participacoes:
+            soma = 0.0
+            for adversario, total_adversario in participacoes:
+                if adversario == jogador:
+                    continue
+                esperado = 1.0 / (1.0 + 10.0 ** ((antes[adversario] - antes[jogador]) / 400.0))
+                resultado = 1.0 if total < total_adversario else 0.5 if total == total_adversario else 0.0
+                soma += resultado - esperado
+            ratings[jogador] = antes[jogador] + soma * k / (len(participacoes) - 1)
+            contagem[jogador] = contagem.get(jogador, 0) + 1
+    return ratings, contagem
+
+
+def test_calcular_ratings_igual_a_elo_sequencial():
+    aleatorio = random.Random(21)
+    num_jogadores = 40
+    jogos = [[(jogador, aleatorio.randint(20, 60))
+              for jogador in aleatorio.sample(range(num_jogadores), aleatorio.randint(1, 5))]
+             for _ in range(300)]
+    jogo = [g for g, participacoes in enumerate(jogos) for _ in participacoes]
+    jogador = [j for participacoes in jogos for j, _ in participacoes]
+    total = [t for participacoes in jogos for _, t in participacoes]
+
+    ratings, contagem, passagens, variacoes = calcular_ratings(jogo, jogador, total, num_jogadores)
+
+    esperado, jogos_esperados = elo_sequencial(jogos)
+    for j in range(num_jogadores):
+        assert ratings[j] == pytest.approx(esperado.get(j, 1500.0))
+        assert contagem[j] == jogos_esperados.get(j, 0)
+    assert 1 <= passagens <= len(jogos)
+    # Só as participações em jogos com um só jogador ficam sem variação
+    sozinhos = np.array([len(jogos[g]) == 1 for g in jogo])
+    assert np.array_equal(np.isnan(variacoes), sozinhos)
+    soma = np.zeros(num_jogadores)
+    np.add.at(soma, np.array(jogador)[~sozinhos], variacoes[~sozinhos])
+    assert np.allclose(1500.0 + soma, ratings)
+
+
+def test_calcular_ratings_sem_participacoes():
+    ratings, contagem, passagens, variacoes = calcular_ratings([], [], [], 3)
+    assert ratings.tolist() == [1500.0] * 3 and contagem.tolist() == [0] * 3
+    assert passagens == 0 and len(variacoes) == 0
+
+
+def construido(minigolf):
+    motor = MotorRating()
+    connection = minigolf.get_db_connection()
+    try:
+        motor.reconstruir(connection.cursor())
+    finally:
+        connection.close()
+    return motor
+
+
+def test_atualizacao_depois_de_reconstruir_substitui_variacao(client, jogo, minigolf, monkeypatch):
+    ana, rui, eva = jogo['jogadores']
+    pistas = jogo['pistas']
+    dois = {'id': criar(client, '/api/jogos', {'campo_id': jogo['campo'], 'jogadores': [ana, rui]})}
+    tacada(client, dois, ana, pistas[0], 2)
+    tacada(client, dois, rui, pistas[0], 3)
+
+    motor = construido(minigolf)
+    monkeypatch.setattr(minigolf, 'participantes_listeners',
+                        minigolf.participantes_listeners + [motor.atualizar])
+    assert [(jogador_id, rating, jogos) for jogador_id, rating, jogos in motor.top(2)] == \
+        [(ana, 1516.0, 1), (rui, 1484.0, 1)]
+
+    # Outra tacada no mesmo jogo: a variação da reconstrução é desfeita, não somada
+    tacada(client, dois, ana, pistas[1], 4)
+    assert motor.top(2) == [(rui, 1516.0, 1), (ana, 1484.0, 1)]
+    assert motor.top(2) == construido(minigolf).top(2)
+    assert motor.stats()['reconstrucoes'] == 1
+
+    # Alterar jogos antigos não repete as variações dos seguintes: os jogos contam
+    # igual a uma reconstrução, a soma dos ratings conserva-se e a diferença é pequena
+    aleatorio = random.Random(4)
+    tres = {'id': criar(client, '/api/jogos', {'campo_id': jogo['campo'], 'jogadores': [rui, eva, ana]})}
+    for _ in range(30):
+        alvo = aleatorio.choice((jogo, dois, tres))
+        participantes = [ana, rui] if alvo is dois else [ana, rui, eva]
+        tacada(client, alvo, aleatorio.choice(participantes), aleatorio.choice(pistas), aleatorio.randint(1, 6))
+    incremental = {jogador_id: (rating, jogos) for jogador_id, rating, jogos in motor.top(3)}
+    reconstruido = {jogador_id: (rating, jogos) for jogador_id, rating, jogos in construido(minigolf).top(3)}
+    assert {j: jogos for j, (_, jogos) in incremental.items()} == {j: jogos for j, (_, jogos) in reconstruido.items()}
+    assert sum(rating for rating, _ in incremental.values()) == pytest.approx(3 * 1500.0, abs=0.2)
+    for jogador_id, (rating, _) in incremental.items():
+        assert rating == pytest.approx(reconstruido[jogador_id][0], abs=5)
+
+def test_ranking_por_rating_responde_503_ate_construir(client, jogo, minigolf, monkeypatch):
+    ana, rui, eva = jogo['jogadores']
+    for jogador_id, numero in ((ana, 2), (rui, 3), (eva, 3)):
+        tacada(client, jogo, jogador_id, jogo['pistas'][0], numero)
+    motor = MotorRating()
+    monkeypatch.setattr(minigolf, 'motor_rating', motor)
+
+    response = client.get('/api/estatisticas/jogadores?ordem=rating')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+    motor._thread.join(timeout=10)
+    response = client.get('/api/estatisticas/jogadores?ordem=rating')
+    assert response.status_code == 200
+    ranking = response.get_json()
+    assert [(entrada['posicao'], entrada['nome'], entrada['jogos_rating']) for entrada in ranking] == \
+        [(1, 'Ana', 1), (2, 'Rui', 1), (3, 'Eva', 1)]
+    assert ranking[1]['rating'] == ranking[2]['rating'] < 1500 < ranking[0]['rating']
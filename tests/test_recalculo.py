@@ -0,0 +1,74 @@
+from conftest import criar, tacada
+
+
+def executar(minigolf, query, params=()):
+    connection = minigolf.get_db_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        linhas = cursor.fetchall() if query.lstrip().upper().startswith('SELECT') else None
+        connection.commit()
+        return linhas
+    finally:
+        connection.close()
+
+
+def totais(client, jogo):
+    detalhe = client.get(f"/api/jogos/{jogo['id']}").get_json()
+    return {p['jogador_id']: p['total_tacadas'] for p in detalhe['participantes']}
+
+
+def test_pedidos_agregados_ate_a_leitura(client, jogo, minigolf, monkeypatch):
+    recalculo = minigolf.recalculo_estatisticas
+    monkeypatch.setattr(recalculo, 'delay', 60)
+    ana, rui, _ = jogo['jogadores']
+    executados = recalculo.stats()['executados']
+    tacada(client, jogo, ana, jogo['pistas'][0], 3)
+    tacada(client, jogo, rui, jogo['pistas'][0], 2)
+    assert recalculo.stats()['executados'] == executados
+    assert executar(minigolf, "SELECT jogo_id, pedidos FROM recalculo_pendente") == [(jogo['id'], 2)]
+
+    # A leitura do jogo não espera pelo delay
+    assert totais(client, jogo)[ana] == 3
+    assert recalculo.stats()['executados'] == executados + 1
+    assert executar(minigolf, "SELECT jogo_id FROM recalculo_pendente") == []
+
+
+def test_jogo_marcado_por_outro_worker(client, jogo, minigolf):
+    ana = jogo['jogadores'][0]
+    # Tacada gravada e marcada por outro processo, que não chegou a recalcular
+    executar(minigolf, "INSERT INTO tacadas (jogo_id, jogador_id, pista_id, numero_tacadas) VALUES (%s, %s, %s, %s)",
+             (jogo['id'], ana, jogo['pistas'][0], 4))
+    executar(minigolf, "INSERT INTO recalculo_pendente (jogo_id) VALUES (%s)", (jogo['id'],))
+
+    antes = minigolf.recalculo_estatisticas.stats()['pendentes_bd']
+    assert totais(client, jogo)[ana] == 4
+    assert minigolf.recalculo_estatisticas.stats()['pendentes_bd'] == antes + 1
+    assert executar(minigolf, "SELECT jogo_id FROM recalculo_pendente") == []
+
+
+def test_saida_sem_fila_nao_liga_a_base_de_dados(minigolf, monkeypatch):
+    def sem_ligacao():
+        raise AssertionError('flush_locais não deve ligar-se à base de dados')
+
+    monkeypatch.setattr(minigolf, 'get_db_connection', sem_ligacao)
+    minigolf.recalculo_estatisticas.flush_locais()
+
+
+def test_migrar_bd_no_sqlite(minigolf):
+    resultado = minigolf.app.test_cli_runner().invoke(args=['migrar-bd'])
+    assert resultado.exit_code == 0
+    assert 'SQLite' in resultado.output
+
+
+def test_estatisticas_do_jogador_so_aplicam_os_seus_jogos(client, jogo, minigolf, monkeypatch):
+    monkeypatch.setattr(minigolf.recalculo_estatisticas, 'delay', 60)
+    ana = jogo['jogadores'][0]
+    rita = criar(client, '/api/jogadores', {'nome': 'Rita'})
+    outro = {'id': criar(client, '/api/jogos', {'campo_id': jogo['campo'], 'jogadores': [rita]})}
+    tacada(client, jogo, ana, jogo['pistas'][0], 3)
+    tacada(client, outro, rita, jogo['pistas'][0], 5)
+
+    stats = client.get(f'/api/estatisticas/jogador/{ana}').get_json()
+    assert stats['melhor_score'] == 3
+    assert executar(minigolf, "SELECT jogo_id FROM recalculo_pendente") == [(outro['id'],)]
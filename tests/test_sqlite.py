@@ -0,0 +1,48 @@
+import pytest
+
+from Minigolf import traduzir_sql
+
+
+@pytest.mark.parametrize('mysql, sqlite', [
+    ("SELECT * FROM jogos WHERE id = %s AND campo_id = %s", "SELECT * FROM jogos WHERE id = ? AND campo_id = ?"),
+    ("SELECT * FROM tacadas WHERE jogo_id = %s FOR UPDATE", "SELECT * FROM tacadas WHERE jogo_id = ? "),
+    ("SELECT * FROM campos WHERE ativo = TRUE", "SELECT * FROM campos WHERE ativo = 1"),
+    ("UPDATE pistas SET ativa = FALSE", "UPDATE pistas SET ativa = 0"),
+    ("EXPLAIN SELECT * FROM jogos", "EXPLAIN QUERY PLAN SELECT * FROM jogos"),
+    ("EXPLAIN QUERY PLAN SELECT 1", "EXPLAIN QUERY PLAN SELECT 1"),
+])
+def test_traducao(mysql, sqlite):
+    assert traduzir_sql(mysql) == sqlite
+
+
+def test_on_duplicate_key_usa_a_chave_unica_da_tabela():
+    sql = traduzir_sql("""
+    INSERT INTO tacadas (jogo_id, jogador_id, pista_id, numero_tacadas) VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE numero_tacadas = VALUES(numero_tacadas)
+    """)
+    assert 'ON CONFLICT (jogo_id, jogador_id, pista_id) DO UPDATE SET' in sql
+    assert 'numero_tacadas = excluded.numero_tacadas' in sql
+    assert '%s' not in sql and 'VALUES(' not in sql
+
+
+def test_palavras_dentro_de_identificadores_nao_sao_traduzidas():
+    assert traduzir_sql("SELECT TRUE_VALUE, FALSEY FROM t") == "SELECT TRUE_VALUE, FALSEY FROM t"
+
+
+def test_upsert_executado_no_sqlite(client, jogo, minigolf):
+    jogador, pista = jogo['jogadores'][0], jogo['pistas'][0]
+    connection = minigolf.get_db_connection()
+    try:
+        cursor = connection.cursor()
+        query = """
+        INSERT INTO tacadas (jogo_id, jogador_id, pista_id, numero_tacadas) VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE numero_tacadas = VALUES(numero_tacadas)
+        """
+        cursor.execute(query, (jogo['id'], jogador, pista, 4))
+        cursor.execute(query, (jogo['id'], jogador, pista, 2))
+        connection.commit()
+        cursor.execute("SELECT numero_tacadas FROM tacadas WHERE jogo_id = %s", (jogo['id'],))
+        assert cursor.fetchall() == [(2,)]
+    finally:
+        connection.close()
+
@@ -0,0 +1,77 @@
+import os
+import runpy
+
+import pytest
+
+from conftest import tacada
+
+GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+@pytest.fixture
+def pubsub(minigolf, monkeypatch):
+    pubsub = minigolf.PubSub(max_subscribers=1)
+    monkeypatch.setattr(minigolf, 'pubsub', pubsub)
+    monkeypatch.setattr(minigolf, 'SSE_HEARTBEAT', 0.01)
+    return pubsub
+
+
+def test_stream_envia_cartao_e_tacadas(client, jogo, pubsub):
+    response = client.get(f"/api/jogos/{jogo['id']}/stream", buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    eventos = iter(response.response)
+    assert next(eventos).startswith(b'retry:')
+    assert next(eventos).startswith(b'event: cartao')
+
+    tacada(client, jogo, jogo['jogadores'][0], jogo['pistas'][0], 3)
+    recebido = b''
+    while b'event: tacadas' not in recebido:
+        recebido += next(eventos)
+    response.close()
+    assert pubsub.stats()['subscritores'] == 0
+
+
+def test_limite_de_espectadores(client, jogo, pubsub):
+    primeiro = client.get(f"/api/jogos/{jogo['id']}/stream", buffered=False)
+    assert primeiro.status_code == 200
+    next(iter(primeiro.response))
+
+    recusado = client.get(f"/api/jogos/{jogo['id']}/stream", buffered=False)
+    assert recusado.status_code == 503
+    assert pubsub.stats()['recusados'] == 1
+
+    # Ao desligar, o lugar fica livre
+    primeiro.close()
+    segundo = client.get(f"/api/jogos/{jogo['id']}/stream", buffered=False)
+    assert segundo.status_code == 200
+    segundo.close()
+
+
+def configuracao(monkeypatch, **env):
+    """Executar gunicorn.conf.py (que escreve no ambiente) sobre uma cópia do ambiente"""
+    ambiente = {nome: valor for nome, valor in os.environ.items()
+                if not nome.startswith(('GUNICORN_', 'SSE_', 'DB_USE_PURE', 'WEB_CONCURRENCY'))}
+    ambiente.update(env)
+    monkeypatch.setattr(os, 'environ', ambiente)
+    return runpy.run_path(GUNICORN_CONF)
+
+
+def test_gunicorn_gevent_por_omissao(monkeypatch):
+    conf = configuracao(monkeypatch)
+    assert conf['worker_class'] == 'gevent'
+    assert os.environ['SSE_MAX_SUBSCRIBERS'] == '500'
+    assert os.environ['DB_USE_PURE'] == '1'
+    assert os.environ['PUBSUB_SOCKET_DIR']
+
+    configuracao(monkeypatch, GUNICORN_WORKER_CONNECTIONS='200', SSE_MAX_SUBSCRIBERS='1000')
+    assert os.environ['SSE_MAX_SUBSCRIBERS'] == '100'
+
+
+def test_gunicorn_gthread_limita_a_metade_das_threads(monkeypatch):
+    configuracao(monkeypatch, GUNICORN_WORKER_CLASS='gthread', GUNICORN_THREADS='8')
+    assert os.environ['SSE_MAX_SUBSCRIBERS'] == '4'
+    configuracao(monkeypatch, GUNICORN_WORKER_CLASS='gthread', GUNICORN_THREADS='8', SSE_MAX_SUBSCRIBERS='50')
+    assert os.environ['SSE_MAX_SUBSCRIBERS'] == '7'
+    configuracao(monkeypatch, GUNICORN_WORKER_CLASS='sync')
+    assert os.environ['SSE_MAX_SUBSCRIBERS'] == '0'
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from conftest import criar
+
+
+@pytest.fixture
+def jogadores(client, minigolf, monkeypatch):
+    # Blocos pequenos para a resposta atravessar vários fetchmany
+    monkeypatch.setattr(minigolf, 'STREAM_CHUNK_SIZE', 2)
+    return [criar(client, '/api/jogadores', {'nome': f'Jogador {n}'}) for n in range(5)]
+
+
+def test_stream_json_e_ndjson(client, minigolf, jogadores):
+    paginado = client.get('/api/jogadores?limit=100').get_json()
+
+    response = client.get('/api/jogadores?stream=1')
+    assert response.mimetype == 'application/json' and response.is_streamed
+    assert 'X-Next-Cursor' not in response.headers
+    assert response.get_json() == paginado
+
+    response = client.get('/api/jogadores', headers={'Accept': 'application/x-ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    linhas = response.get_data(as_text=True).splitlines()
+    assert [json.loads(linha) for linha in linhas] == paginado
+    assert minigolf.db_pool.stats()['in_use'] == 0
+
+
+def test_stream_vazio(client):
+    assert client.get('/api/jogadores?stream=1').get_json() == []
+    assert client.get('/api/jogadores?stream=ndjson').get_data() == b''
+
+
+def test_stream_interrompido_descarta_a_conexao(client, minigolf, jogadores):
+    antes = minigolf.db_pool.stats()
+    response = client.get('/api/jogadores?stream=ndjson', buffered=False)
+    next(iter(response.response))
+    response.close()
+    # Com linhas por ler, a conexão é fechada em vez de voltar ao pool
+    depois = minigolf.db_pool.stats()
+    assert depois['in_use'] == 0
+    assert depois['open'] == antes['open'] - 1
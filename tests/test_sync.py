@@ -0,0 +1,100 @@
+from conftest import criar, tacada
+
+
+def sync(client, jogo, versao, *tacadas):
+    response = client.post(f"/api/jogos/{jogo['id']}/sync", json={'versao': versao, 'tacadas': list(tacadas)})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def celula(jogador_id, pista_id, numero, anterior=None):
+    dados = {'jogador_id': jogador_id, 'pista_id': pista_id, 'numero_tacadas': numero}
+    if anterior is not None:
+        dados['anterior'] = anterior
+    return dados
+
+
+def gravadas(minigolf, jogo):
+    connection = minigolf.get_db_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT jogador_id, pista_id, numero_tacadas FROM tacadas WHERE jogo_id = %s",
+                       (jogo['id'],))
+        return {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+    finally:
+        connection.close()
+
+
+def test_primeiro_sync_grava_cartao(client, jogo, minigolf):
+    ana, rui, _ = jogo['jogadores']
+    p1, p2, _ = jogo['pistas']
+    resultado = sync(client, jogo, None, celula(ana, p1, 3), celula(rui, p1, 2), celula(ana, p2, 4))
+    assert (resultado['aplicadas'], resultado['inalteradas']) == (3, 0)
+    assert resultado['conflitos'] == [] and resultado['erros'] == [] and resultado['delta'] == []
+    assert gravadas(minigolf, jogo) == {(ana, p1): 3, (rui, p1): 2, (ana, p2): 4}
+
+    # Reenviar o mesmo cartão não escreve nada e mantém a versão
+    repetido = sync(client, jogo, resultado['versao'], celula(ana, p1, 3), celula(rui, p1, 2), celula(ana, p2, 4))
+    assert (repetido['aplicadas'], repetido['inalteradas']) == (0, 3)
+    assert repetido['versao'] == resultado['versao'] and repetido['delta'] == []
+
+
+def test_conflito_quando_servidor_mudou_a_celula(client, jogo, minigolf):
+    ana, rui, _ = jogo['jogadores']
+    p1 = jogo['pistas'][0]
+    versao = sync(client, jogo, None, celula(ana, p1, 3), celula(rui, p1, 2))['versao']
+    # Outro cliente altera a mesma célula
+    tacada(client, jogo, ana, p1, 5)
+
+    resultado = sync(client, jogo, versao, celula(ana, p1, 4, anterior=3))
+    assert resultado['conflitos'] == [{'jogador_id': ana, 'pista_id': p1, 'servidor': 5, 'cliente': 4}]
+    assert resultado['aplicadas'] == 1
+    # Prevalece o valor do cliente
+    assert gravadas(minigolf, jogo)[(ana, p1)] == 4
+
+
+def test_sem_conflito_quando_anterior_coincide(client, jogo, minigolf):
+    ana, rui, eva = jogo['jogadores']
+    p1, p2, _ = jogo['pistas']
+    versao = sync(client, jogo, None, celula(ana, p1, 3), celula(rui, p1, 2))['versao']
+    # O servidor mudou outra célula: a do cliente continua com o valor que ele conhecia
+    tacada(client, jogo, eva, p2, 6)
+
+    resultado = sync(client, jogo, versao, celula(ana, p1, 4, anterior=3))
+    assert resultado['conflitos'] == []
+    assert resultado['aplicadas'] == 1
+    # O delta traz as células do servidor que o cliente não enviou
+    assert resultado['delta'] == [
+        {'jogador_id': j, 'pista_id': p, 'numero_tacadas': n}
+        for (j, p), n in sorted({(rui, p1): 2, (eva, p2): 6}.items())
+    ]
+    assert gravadas(minigolf, jogo) == {(ana, p1): 4, (rui, p1): 2, (eva, p2): 6}
+
+
+def test_zero_nao_apaga_e_volta_no_delta(client, jogo, minigolf):
+    ana, _, _ = jogo['jogadores']
+    p1 = jogo['pistas'][0]
+    tacada(client, jogo, ana, p1, 3)
+
+    resultado = sync(client, jogo, None, celula(ana, p1, 0))
+    assert (resultado['aplicadas'], resultado['inalteradas']) == (0, 0)
+    assert resultado['delta'] == [{'jogador_id': ana, 'pista_id': p1, 'numero_tacadas': 3}]
+    assert gravadas(minigolf, jogo) == {(ana, p1): 3}
+
+
+def test_erros_por_celula(client, jogo, minigolf):
+    ana, _, _ = jogo['jogadores']
+    p1 = jogo['pistas'][0]
+    de_fora = criar(client, '/api/jogadores', {'nome': 'Rita'})
+
+    resultado = sync(client, jogo, None, celula(de_fora, p1, 3), {'jogador_id': ana, 'pista_id': p1},
+                     celula(ana, p1, 2))
+    assert sorted(erro['index'] for erro in resultado['erros']) == [0, 1]
+    assert resultado['aplicadas'] == 1
+    assert gravadas(minigolf, jogo) == {(ana, p1): 2}
+
+
+def test_pedidos_invalidos(client, jogo):
+    assert client.post(f"/api/jogos/{jogo['id']}/sync", json={'versao': None}).status_code == 400
+    response = client.post('/api/jogos/9999/sync', json={'versao': None, 'tacadas': [celula(1, 1, 3)]})
+    assert response.status_code == 404
@@ -0,0 +1,57 @@
+from conftest import criar
+
+
+def batch(client, *tacadas):
+    return client.post('/api/tacadas/batch', json={'tacadas': list(tacadas)})
+
+
+def linha(jogo_id, jogador_id, pista_id, numero):
+    return {'jogo_id': jogo_id, 'jogador_id': jogador_id, 'pista_id': pista_id, 'numero_tacadas': numero}
+
+
+def totais(client, jogo_id):
+    detalhe = client.get(f'/api/jogos/{jogo_id}').get_json()
+    return {p['jogador_id']: p['total_tacadas'] for p in detalhe['participantes']}
+
+
+def test_varios_jogos_com_um_recalculo_por_jogo(client, jogo, minigolf):
+    ana, rui, _ = jogo['jogadores']
+    p1, p2, _ = jogo['pistas']
+    outro = criar(client, '/api/jogos', {'campo_id': jogo['campo'], 'jogadores': [ana, rui]})
+    # Pedidos ainda na fila (de testes anteriores) não entram na contagem
+    minigolf.recalculo_estatisticas.flush_all()
+    executados = minigolf.recalculo_estatisticas.stats()['executados']
+
+    response = batch(client, linha(jogo['id'], ana, p1, 3), linha(outro, rui, p1, 2),
+                     linha(jogo['id'], ana, p2, 4), linha(jogo['id'], rui, p1, 5), linha(outro, ana, p2, 1))
+    assert response.status_code == 200
+    resultado = response.get_json()
+    assert (resultado['registradas'], resultado['erros']) == (5, 0)
+    assert resultado['jogos_recalculados'] == [jogo['id'], outro]
+
+    assert totais(client, jogo['id'])[ana] == 7
+    assert totais(client, outro) == {ana: 1, rui: 2}
+    assert minigolf.recalculo_estatisticas.stats()['executados'] == executados + 2
+
+
+def test_erros_por_linha_nao_anulam_as_outras(client, jogo):
+    ana = jogo['jogadores'][0]
+    p1 = jogo['pistas'][0]
+    response = batch(client, linha(jogo['id'], ana, p1, 3), {'jogo_id': jogo['id'], 'jogador_id': ana},
+                     linha(jogo['id'], ana, 9999, 2), linha('x', ana, p1, 2))
+    resultado = response.get_json()
+    assert [r['status'] for r in resultado['results']] == ['ok', 'error', 'error', 'error']
+    assert (resultado['registradas'], resultado['erros']) == (1, 3)
+    assert 'jogo_id' in resultado['results'][3]['error']
+    assert totais(client, jogo['id'])[ana] == 3
+
+
+def test_pedidos_invalidos(client, jogo, minigolf, monkeypatch):
+    assert batch(client).status_code == 400
+    assert client.post('/api/tacadas/batch', json={'tacadas': 'nada'}).status_code == 400
+    # Só linhas inválidas: nada chega à base de dados
+    assert batch(client, {'jogo_id': jogo['id']}).status_code == 400
+
+    monkeypatch.setattr(minigolf, 'TACADAS_BATCH_MAX', 2)
+    ana = jogo['jogadores'][0]
+    assert batch(client, *[linha(jogo['id'], ana, p, 1) for p in jogo['pistas']]).status_code == 400